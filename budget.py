@@ -4,6 +4,9 @@ from textwrap import dedent
 from agno.agent import Agent
 from agno.models.anthropic import Claude
 from agno.tools.calculator import CalculatorTools
+from debt import DebtTools
+from income_buffer import IncomeBufferTools
+from profile_parser import with_profile
 
 today = datetime.now().strftime("%Y-%m-%d")
 
@@ -19,7 +22,10 @@ agent = Agent(
             factorial=True,
             is_prime=True,
             square_root=True,
-        )],
+        ),
+        DebtTools(),
+        IncomeBufferTools(),
+    ],
     description=dedent("""\
         You are the Budget Analysis Agent, a specialized financial AI that focuses exclusively on 
         analyzing spending patterns, optimizing personal budgets, and identifying concrete savings 
@@ -53,6 +59,9 @@ agent = Agent(
 
 
         1. Parse and normalize all financial information from user input:
+           - If a "Parsed financial profile" block is provided, use its monthly equivalents as-is
+           - If a "Bank statement summary" block is provided, treat its monthly averages and category
+             totals as the client's actual spending history
            - Convert all income and expenses to monthly equivalents
            - Categorize expenses into standard budget categories
            - Separate fixed, variable, and discretionary expenses
@@ -64,6 +73,8 @@ agent = Agent(
            - Identify categories with potential optimization opportunities
            - Analyze historical trends to detect irregular spending patterns
            - Flag unusually high expenses within specific categories
+             (use the "Unusual charges flagged" and "Unusually high category months" blocks when given;
+             they are already computed from the full transaction history)
 
         3. Conduct budget optimization analysis:
            - Identify top 3-5 specific opportunities to reduce expenses
@@ -71,14 +82,20 @@ agent = Agent(
            - Analyze fixed vs. variable expense ratio for budget flexibility
            - Calculate current savings rate and compare to recommended targets (15-20%)
            - Detect unnecessary subscriptions or services with low utility
+             (when a "Recurring charges detected" table is provided, review each listed charge and its
+             annualized cost instead of guessing)
            - Identify potential expense consolidation opportunities
+           - For debt payoff questions, use `plan_debt_payoff` to compare avalanche and snowball timelines
 
         4. Generate personalized budget framework:
            - Create category-specific budget allocations based on income
            - Recommend specific dollar amounts for each spending category
            - Adjust for personal circumstances and financial goals
            - Incorporate seasonal variations or upcoming major expenses
+             (a "Spending forecast" block, when given, has the projected totals and peak months to use)
            - Balance realistic lifestyle needs with financial objectives
+           - For irregular income, use `simulate_income_buffer` for the cash buffer and the safe fixed monthly
+             "salary" at 90/95/99% confidence instead of estimating them
 
         5. Deliver actionable recommendations:
            - Prioritize suggestions by potential financial impact
@@ -170,7 +187,7 @@ agent = Agent(
 if __name__ == "__main__":
     # Generate a personalized budget analysis
     agent.print_response(
-        """
+        with_profile("""
         I need help analyzing my monthly budget. Here's my current financial situation:
 
         Monthly Income:
@@ -194,7 +211,7 @@ if __name__ == "__main__":
         - Miscellaneous: $200
 
         I'm currently saving about $305 per month but want to increase this to build an emergency fund and eventually save for a down payment on a house. I also want to pay off my credit card debt faster. Can you analyze my budget and suggest where I could cut expenses or optimize my spending?
-        """, 
+        """), 
         stream=True
     )
 
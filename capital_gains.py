@@ -0,0 +1,525 @@
+import codecs
+import csv
+import json
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import date
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agno.tools import Toolkit
+from agno.utils.log import log_info, log_warning
+
+from profile_parser import format_amount
+from rules import CompiledRules, RulesStore, rules_store
+from statements import MAX_PREAMBLE_LINES, DateParser, parse_amount
+
+ASSET_CLASSES = ("equity", "debt", "other")
+# Slab-taxed gains are set off first by assuming this marginal rate when no slab rate is given
+DEFAULT_SLAB_RATE = 0.30
+# Quantities below this are treated as zero (mutual fund units carry three or four decimals)
+QUANTITY_EPSILON = 1e-6
+TOP_INSTRUMENTS = 10
+
+DATE_HEADERS = ("trade date", "date", "transaction date", "execution date", "order execution time")
+INSTRUMENT_HEADERS = ("symbol", "scrip", "scrip name", "instrument", "security", "security name", "stock", "scheme name", "scheme", "fund", "isin")
+SIDE_HEADERS = ("trade type", "buy/sell", "side", "type", "transaction type", "action")
+QUANTITY_HEADERS = ("quantity", "qty", "qty.", "units")
+PRICE_HEADERS = ("price", "trade price", "rate", "nav", "avg. price", "average price")
+VALUE_HEADERS = ("value", "trade value", "amount", "net amount")
+CHARGES_HEADERS = ("charges", "total charges", "brokerage")
+ASSET_CLASS_HEADERS = ("asset class",)
+
+# Whole words (or word pairs) in a transaction type that mark a sale; "SIP Purchase" or "Switch In" are buys
+SELL_WORDS = frozenset(("s", "sell", "sold", "sale", "redeem", "redemption", "swp", "switchout"))
+SELL_PHRASES = frozenset((("switch", "out"), ("transfer", "out"), ("stp", "out"), ("systematic", "withdrawal")))
+WORD_RE = re.compile(r"[a-z]+")
+
+
+@dataclass
+class Trade:
+    when: date
+    instrument: str
+    side: str
+    quantity: float
+    price: float
+    charges: float = 0.0
+    asset_class: str = "equity"
+
+
+@dataclass
+class Realization:
+    """One sell matched against (part of) one buy lot."""
+
+    instrument: str
+    asset_class: str
+    bought: date
+    sold: date
+    quantity: float
+    cost: float
+    proceeds: float
+    term: str
+    rate: Optional[float]
+    fiscal_year: str
+
+    @property
+    def gain(self) -> float:
+        return self.proceeds - self.cost
+
+
+def fiscal_year(when: date) -> str:
+    """Indian fiscal year (April to March) of a date, e.g. "2024-25"."""
+    start = when.year if when.month >= 4 else when.year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def is_sell(side: str) -> bool:
+    """Whether a broker or fund transaction type describes a sale, matched on whole words."""
+    words = WORD_RE.findall(side.lower())
+    return any(word in SELL_WORDS for word in words) or any(pair in SELL_PHRASES for pair in zip(words, words[1:]))
+
+
+def held_longer_than(bought: date, sold: date, months: int) -> bool:
+    """Whether an asset bought on ``bought`` and sold on ``sold`` was held more than ``months`` months."""
+    elapsed = (sold.year - bought.year) * 12 + sold.month - bought.month
+    return elapsed > months or (elapsed == months and sold.day > bought.day)
+
+
+def chronological(trades: Iterable[Trade]) -> List[Trade]:
+    """Trades oldest first, as the engine needs them.
+
+    Broker exports are often newest first; those are reversed before the stable sort so
+    trades on the same day keep their real order (the buy before the sell it funds).
+    """
+    trades = list(trades)
+    if trades and trades[0].when > trades[-1].when:
+        trades.reverse()
+    return sorted(trades, key=lambda trade: trade.when)
+
+
+class CapitalGainsEngine:
+    """Streaming FIFO matcher of sells to buy lots, aggregating gains as it goes.
+
+    Each instrument keeps a deque of open lots ``[bought, quantity, unit cost]``; a sell
+    consumes lots from the left, so a trade costs O(lots it closes). Realized gains are
+    folded into per (fiscal year, asset class, term, rate) buckets and per-instrument totals
+    as they happen, so memory depends on open lots and instruments, not on history length.
+    Rates and holding periods come from the rules of the sale's fiscal year (the latest loaded
+    rules when that year has none). Trades must arrive oldest first.
+    """
+
+    def __init__(self, store: RulesStore = rules_store):
+        self.store = store
+        self.lots: Dict[str, Deque[List]] = {}
+        self.asset_classes: Dict[str, str] = {}
+        self.last_trade: Dict[str, date] = {}
+        self.buckets: Dict[Tuple[str, str, str, Optional[float]], List[float]] = {}
+        self.instruments: Dict[Tuple[str, str], List[float]] = {}
+        self.unmatched: Dict[str, float] = {}
+        self.trades = 0
+        self.realizations = 0
+        self.out_of_order = 0
+        self._rules: Dict[str, CompiledRules] = {}
+        self._periods: Dict[Tuple[str, str, date], Dict] = {}
+
+    def rules(self, year: str) -> CompiledRules:
+        if year not in self._rules:
+            try:
+                self._rules[year] = self.store.get(year)
+            except KeyError:
+                self._rules[year] = self.store.get()
+                log_warning(f"No rules for FY {year}; using FY {self._rules[year].fiscal_year} capital gains rates")
+        return self._rules[year]
+
+    def period(self, asset_class: str, sold: date, year: str) -> Dict:
+        """Holding period and rates that apply to a sale on ``sold``."""
+        key = (asset_class, year, sold)
+        if key not in self._periods:
+            spec = self.rules(year).capital_gains.get(asset_class)
+            if spec is None:
+                raise ValueError(f"No capital gains rules for asset class {asset_class!r}; choose from {list(ASSET_CLASSES)}")
+            iso = sold.isoformat()
+            applicable = [period for period in spec["periods"] if period["from"] <= iso] or spec["periods"][:1]
+            self._periods[key] = applicable[-1]
+        return self._periods[key]
+
+    def add(self, trade: Trade) -> List[Realization]:
+        """Apply one trade; returns the lot matches a sell produced (empty for buys)."""
+        self.trades += 1
+        instrument = trade.instrument
+        if trade.when < self.last_trade.get(instrument, trade.when):
+            self.out_of_order += 1
+        self.last_trade[instrument] = trade.when
+        self.asset_classes.setdefault(instrument, trade.asset_class)
+        lots = self.lots.setdefault(instrument, deque())
+        if trade.side == "buy":
+            if trade.quantity > QUANTITY_EPSILON:
+                lots.append([trade.when, trade.quantity, (trade.quantity * trade.price + trade.charges) / trade.quantity])
+            return []
+
+        asset_class = self.asset_classes[instrument]
+        year = fiscal_year(trade.when)
+        period = self.period(asset_class, trade.when, year)
+        # Sale charges reduce proceeds in proportion to the quantity each lot supplies
+        net_price = trade.price - trade.charges / trade.quantity if trade.quantity > QUANTITY_EPSILON else trade.price
+        remaining = trade.quantity
+        matched = []
+        while remaining > QUANTITY_EPSILON and lots:
+            lot = lots[0]
+            quantity = min(remaining, lot[1])
+            months = period.get("long_term_months")
+            long_term = months is not None and held_longer_than(lot[0], trade.when, months)
+            term = "long" if long_term else "short"
+            realization = Realization(
+                instrument,
+                asset_class,
+                lot[0],
+                trade.when,
+                quantity,
+                quantity * lot[2],
+                quantity * net_price,
+                term,
+                period.get("ltcg_rate" if long_term else "stcg_rate"),
+                year,
+            )
+            self._record(realization)
+            matched.append(realization)
+            lot[1] -= quantity
+            remaining -= quantity
+            if lot[1] <= QUANTITY_EPSILON:
+                lots.popleft()
+        if remaining > QUANTITY_EPSILON:
+            self.unmatched[instrument] = self.unmatched.get(instrument, 0.0) + remaining
+        return matched
+
+    def _record(self, realization: Realization) -> None:
+        self.realizations += 1
+        gain = realization.gain
+        key = (realization.fiscal_year, realization.asset_class, realization.term, realization.rate)
+        bucket = self.buckets.setdefault(key, [0.0, 0.0, 0.0, 0.0])
+        bucket[0 if gain >= 0 else 1] += gain
+        bucket[2] += realization.proceeds
+        bucket[3] += realization.cost
+        totals = self.instruments.setdefault((realization.fiscal_year, realization.instrument), [0.0, 0.0])
+        totals[0 if realization.term == "short" else 1] += gain
+
+    def process(self, trades: Iterable[Trade]) -> Iterator[Realization]:
+        """Stream trades through the matcher, yielding every realization as it happens."""
+        for trade in trades:
+            yield from self.add(trade)
+
+    @property
+    def fiscal_years(self) -> List[str]:
+        return sorted({key[0] for key in self.buckets})
+
+    def report(self, year: Optional[str] = None, slab_rate: Optional[float] = None) -> Dict:
+        """Gains table for one fiscal year (default: the latest with sales) after set-off and exemptions.
+
+        Gains and losses net within each (asset class, term, rate) bucket. Short-term net losses
+        are then set off against short-term gains and then long-term gains, long-term losses
+        against long-term gains only, highest-taxed gains first; the Section 112A exemption is
+        applied to what remains of equity LTCG. Slab-taxed gains are taxed at ``slab_rate`` when
+        given. Tax includes cess but not surcharge; unabsorbed losses can be carried forward.
+        """
+        year = year or (self.fiscal_years[-1] if self.buckets else None)
+        if year is None:
+            return {"fiscal_year": None, "rows": [], "total_tax": 0.0, **self.stats()}
+        rules = self.rules(year)
+        rows = []
+        for (bucket_year, asset_class, term, rate), (gains, losses, proceeds, cost) in self.buckets.items():
+            if bucket_year == year:
+                rows.append({"asset_class": asset_class, "term": term, "rate": rate, "proceeds": proceeds, "cost": cost, "gains": gains, "losses": losses, "net": gains + losses})
+
+        def effective(row) -> float:
+            return row["rate"] if row["rate"] is not None else (slab_rate if slab_rate is not None else DEFAULT_SLAB_RATE)
+
+        for row in rows:
+            row["set_off"], row["exemption"], row["taxable"] = 0.0, 0.0, max(row["net"], 0.0)
+        short_loss = sum((-row["net"] for row in rows if row["term"] == "short" and row["net"] < 0), 0.0)
+        long_loss = sum((-row["net"] for row in rows if row["term"] == "long" and row["net"] < 0), 0.0)
+        # At equal rates, gains that no exemption would cover absorb the losses first
+        exempt = {name for name, spec in rules.capital_gains.items() if spec.get("ltcg_exemption")}
+        ordered = sorted(rows, key=lambda row: (row["term"] != "short", -effective(row), row["asset_class"] in exempt))
+        for row in ordered:
+            if row["taxable"] <= 0:
+                continue
+            pools = ["short"] if row["term"] == "short" else ["long", "short"]
+            for pool in pools:
+                available = long_loss if pool == "long" else short_loss
+                used = min(available, row["taxable"])
+                row["taxable"] -= used
+                row["set_off"] += used
+                if pool == "long":
+                    long_loss -= used
+                else:
+                    short_loss -= used
+
+        exemption_used = 0.0
+        for asset_class, spec in rules.capital_gains.items():
+            allowance = float(spec.get("ltcg_exemption") or 0.0)
+            for row in sorted(rows, key=lambda row: -effective(row)):
+                if row["asset_class"] == asset_class and row["term"] == "long" and allowance > 0:
+                    used = min(allowance, row["taxable"])
+                    row["taxable"] -= used
+                    row["exemption"] += used
+                    allowance -= used
+                    exemption_used += used
+
+        cess = 1 + next(iter(rules.regimes.values())).cess_rate if rules.regimes else 1.0
+        total_tax = 0.0
+        for row in rows:
+            flat_rate = row.pop("rate")
+            rate = flat_rate if flat_rate is not None else slab_rate
+            row["tax"] = None if rate is None else round(row["taxable"] * rate * cess, 2)
+            total_tax += row["tax"] or 0.0
+            row["rate_percent"] = round(flat_rate * 100, 2) if flat_rate is not None else "slab"
+            for name in ("proceeds", "cost", "gains", "losses", "net", "set_off", "exemption", "taxable"):
+                row[name] = round(row[name], 2)
+        rows.sort(key=lambda row: (ASSET_CLASSES.index(row["asset_class"]) if row["asset_class"] in ASSET_CLASSES else len(ASSET_CLASSES), row["term"] != "short"))
+        top = sorted(
+            ((name, short, long) for (bucket_year, name), (short, long) in self.instruments.items() if bucket_year == year),
+            key=lambda item: -abs(item[1] + item[2]),
+        )[:TOP_INSTRUMENTS]
+        return {
+            "fiscal_year": year,
+            "rules_fiscal_year": rules.fiscal_year,
+            "rows": rows,
+            "exemption_used": round(exemption_used, 2),
+            "short_term_loss_carried_forward": round(short_loss, 2),
+            "long_term_loss_carried_forward": round(long_loss, 2),
+            "total_tax": round(total_tax, 2),
+            "slab_taxed_gains": round(sum(row["taxable"] for row in rows if row["rate_percent"] == "slab"), 2),
+            "slab_rate_percent": round(slab_rate * 100, 2) if slab_rate is not None else None,
+            "top_instruments": [
+                {"instrument": name, "short_term_gain": round(short, 2), "long_term_gain": round(long, 2)} for name, short, long in top
+            ],
+            **self.stats(),
+        }
+
+    def stats(self) -> Dict:
+        return {
+            "trades": self.trades,
+            "lot_matches": self.realizations,
+            "open_lots": sum(len(lots) for lots in self.lots.values()),
+            "unmatched_sells": {name: round(quantity, 4) for name, quantity in sorted(self.unmatched.items())},
+            "out_of_order_trades": self.out_of_order,
+        }
+
+
+def gains_summary(report: Dict, currency: str = "INR") -> str:
+    """Prompt block with the gains table only; individual trades never reach the model.
+
+    Trades that arrived out of date order or sells without matching buys are reported even
+    when no gains were realized, since they usually mean the history is incomplete.
+    """
+    warnings = []
+    if report.get("out_of_order_trades"):
+        warnings.append(f"- {report['out_of_order_trades']} trades were out of date order; gains may be misstated")
+    if report.get("unmatched_sells"):
+        warnings.append(f"- Sells without matching buys (missing history): {', '.join(report['unmatched_sells'])}")
+    if not report.get("rows"):
+        if not warnings:
+            return ""
+        return "\n".join([f"Capital gains: no gains matched from {report['trades']} trades."] + warnings)
+    lines = [
+        f"Capital gains FY {report['fiscal_year']} ({report['trades']} trades, FIFO lot matching; "
+        f"after set-off and exemptions; tax incl. cess, excl. surcharge):"
+    ]
+    for row in report["rows"]:
+        rate = f"{row['rate_percent']}%" if row["rate_percent"] != "slab" else "slab rate"
+        tax = f", tax {format_amount(row['tax'], currency)}" if row["tax"] is not None else ""
+        lines.append(
+            f"- {row['asset_class'].title()} {row['term']}-term at {rate}: net {format_amount(row['net'], currency)}, "
+            f"set off {format_amount(row['set_off'], currency)}, exempt {format_amount(row['exemption'], currency)}, "
+            f"taxable {format_amount(row['taxable'], currency)}{tax}"
+        )
+    lines.append(f"- Estimated tax on capital gains: {format_amount(report['total_tax'], currency)}")
+    carried = report["short_term_loss_carried_forward"] + report["long_term_loss_carried_forward"]
+    if carried:
+        lines.append(
+            f"- Losses to carry forward: short-term {format_amount(report['short_term_loss_carried_forward'], currency)}, "
+            f"long-term {format_amount(report['long_term_loss_carried_forward'], currency)}"
+        )
+    return "\n".join(lines + warnings)
+
+
+def _column(header: List[str], names: Tuple[str, ...]) -> Optional[int]:
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+class TradeCsvReader:
+    """Incremental reader for broker tradebooks and mutual fund transaction exports.
+
+    Bytes go in as they arrive and complete rows come out as trades; only the current partial
+    line is buffered. Columns are found from the header row (underscores read as spaces), and
+    a value column stands in for a missing price column.
+    """
+
+    def __init__(self, dayfirst: bool = True, asset_class: str = "equity"):
+        self.parse_date = DateParser(dayfirst)
+        self.asset_class = asset_class
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self.pending = ""
+        self.columns: Optional[Dict[str, Optional[int]]] = None
+        self.lines_seen = 0
+        self.skipped = 0
+
+    def feed(self, chunk: bytes) -> Iterator[Trade]:
+        self.pending += self.decoder.decode(chunk)
+        *lines, self.pending = self.pending.split("\n")
+        yield from self._lines(lines)
+
+    def close(self) -> Iterator[Trade]:
+        lines, self.pending = [self.pending + self.decoder.decode(b"", final=True)], ""
+        yield from self._lines(lines)
+        if self.columns is None:
+            raise ValueError("No header row with date, instrument, buy/sell, quantity and price columns was found")
+
+    def _lines(self, lines: List[str]) -> Iterator[Trade]:
+        for row in csv.reader(lines):
+            if not any(cell.strip() for cell in row):
+                continue
+            if self.columns is None:
+                self.lines_seen += 1
+                self.columns = self._header(row)
+                if self.columns is None and self.lines_seen >= MAX_PREAMBLE_LINES:
+                    raise ValueError("No header row with date, instrument, buy/sell, quantity and price columns was found")
+                continue
+            trade = self._row(row)
+            if trade is None:
+                self.skipped += 1
+            else:
+                yield trade
+
+    def _row(self, row: List[str]) -> Optional[Trade]:
+        def cell(name: str) -> str:
+            index = self.columns[name]
+            return row[index].strip() if index is not None and index < len(row) else ""
+
+        when = self.parse_date(cell("date")[:10]) or self.parse_date(cell("date"))
+        side = cell("side").lower()
+        quantity = parse_amount(cell("quantity"))
+        price = parse_amount(cell("price")) if self.columns["price"] is not None else None
+        if price is None and quantity:
+            value = parse_amount(cell("value"))
+            price = abs(value) / abs(quantity) if value is not None else None
+        if when is None or not side or not quantity or price is None or not cell("instrument"):
+            return None
+        asset_class = cell("asset_class").lower() or self.asset_class
+        return Trade(
+            when,
+            cell("instrument").upper(),
+            "sell" if is_sell(side) or quantity < 0 else "buy",
+            abs(quantity),
+            abs(price),
+            abs(parse_amount(cell("charges")) or 0.0),
+            asset_class if asset_class in ASSET_CLASSES else self.asset_class,
+        )
+
+    @staticmethod
+    def _header(row: List[str]) -> Optional[Dict[str, Optional[int]]]:
+        header = [cell.strip().lower().replace("_", " ") for cell in row]
+        columns = {
+            "date": _column(header, DATE_HEADERS),
+            "instrument": _column(header, INSTRUMENT_HEADERS),
+            "side": _column(header, SIDE_HEADERS),
+            "quantity": _column(header, QUANTITY_HEADERS),
+            "price": _column(header, PRICE_HEADERS),
+            "value": _column(header, VALUE_HEADERS),
+            "charges": _column(header, CHARGES_HEADERS),
+            "asset_class": _column(header, ASSET_CLASS_HEADERS),
+        }
+        required = ("date", "instrument", "side", "quantity")
+        has_price = columns["price"] is not None or columns["value"] is not None
+        return columns if has_price and all(columns[name] is not None for name in required) else None
+
+
+class CapitalGainsTools(Toolkit):
+    def __init__(self, **kwargs):
+        super().__init__(name="capital_gains", **kwargs)
+        self.register(self.calculate_capital_gains)
+
+    def calculate_capital_gains(
+        self,
+        instruments: List[str],
+        sides: List[str],
+        trade_dates: List[str],
+        quantities: List[float],
+        prices: List[float],
+        asset_classes: Optional[List[str]] = None,
+        fiscal_year: str = "",
+        slab_rate_percent: float = -1,
+    ) -> str:
+        """Compute capital gains tax for a list of buy and sell trades: matches sells to buys first-in-first-out,
+        classifies each gain as short- or long-term by holding period, applies loss set-off and the Section 112A
+        exemption at current rates. Use this instead of computing STCG/LTCG by hand.
+
+        Args:
+            instruments (List[str]): Stock, fund or asset name of each trade.
+            sides (List[str]): "buy" or "sell" for each trade.
+            trade_dates (List[str]): Date of each trade, YYYY-MM-DD.
+            quantities (List[float]): Shares or units in each trade.
+            prices (List[float]): Price per share or unit (NAV) of each trade.
+            asset_classes (List[str]): "equity" (listed shares, equity funds), "debt" (debt funds bought after
+                March 2023) or "other" (gold, property, unlisted shares) per trade; default equity.
+            fiscal_year (str): Fiscal year to report, e.g. "2024-25"; empty for the latest year with sales.
+            slab_rate_percent (float): The client's marginal slab rate for slab-taxed gains; -1 if unknown.
+
+        Returns:
+            str: JSON string with the gains table per asset class and term (net gain, set-off, exemption,
+            taxable amount, tax), losses to carry forward and the estimated total tax.
+        """
+        count = len(instruments)
+        if any(len(values) != count for values in (sides, trade_dates, quantities, prices)):
+            return json.dumps({"error": "Every list must have one entry per trade"})
+        try:
+            trades = [
+                Trade(
+                    date.fromisoformat(trade_dates[i]),
+                    instruments[i].upper(),
+                    "sell" if is_sell(sides[i]) else "buy",
+                    abs(quantities[i]),
+                    abs(prices[i]),
+                    asset_class=(asset_classes[i].lower() if asset_classes else "equity"),
+                )
+                for i in range(count)
+            ]
+            engine = CapitalGainsEngine()
+            for _ in engine.process(chronological(trades)):
+                pass
+            report = engine.report(fiscal_year or None, slab_rate_percent / 100 if slab_rate_percent >= 0 else None)
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+        log_info(f"Matched {engine.realizations} lots from {count} trades; FY {report['fiscal_year']} tax {report['total_tax']}")
+        return json.dumps(report)
+
+
+def _benchmark(trades: int = 100_000, instruments: int = 500) -> None:
+    import random
+
+    rng = random.Random(3)
+    names = [f"STOCK{i}" for i in range(instruments)]
+    held = dict.fromkeys(names, 0)
+    start = date(2022, 4, 1).toordinal()
+    rows = []
+    for i in range(trades):
+        name = rng.choice(names)
+        sell = held[name] > 0 and rng.random() < 0.45
+        quantity = rng.randint(1, held[name]) if sell else rng.randint(1, 100)
+        held[name] += -quantity if sell else quantity
+        rows.append(Trade(date.fromordinal(start + i * 1000 // trades), name, "sell" if sell else "buy", quantity, rng.uniform(50, 150), 20.0))
+    begin = time.perf_counter()
+    engine = CapitalGainsEngine()
+    for _ in engine.process(rows):
+        pass
+    report = engine.report()
+    elapsed = time.perf_counter() - begin
+    print(f"{trades:,} trades, {engine.realizations:,} lot matches in {elapsed:.2f}s; FY {report['fiscal_year']} tax {report['total_tax']:,.0f}")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,264 @@
+import json
+import re
+import threading
+import time
+from collections import deque
+from textwrap import dedent
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from agno.agent import Agent
+from agno.models.anthropic import Claude
+from agno.utils.log import log_info
+
+# Merchant keywords per budget category. Keywords match at the start of a word in the
+# normalized description ("electric" also matches "electricity"); a trailing space makes
+# the keyword a whole word ("lic "). When several keywords match, the longest one wins.
+CATEGORY_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    "Income": ("salary", "payroll", "interest credit", "int credit", "dividend", "refund", "cashback"),
+    "Housing": ("rent ", "rental", "mortgage", "maintenance", "society", "hoa ", "property tax"),
+    "Utilities": (
+        "electric", "power", "water", "gas bill", "broadband", "internet", "mobile", "recharge", "airtel",
+        "jio", "vodafone", "bsnl", "verizon", "comcast", "xfinity", "at t ", "t mobile", "tata power", "bescom",
+    ),
+    "Groceries": (
+        "grocery", "groceries", "supermarket", "bigbasket", "blinkit", "zepto", "dmart", "instamart", "walmart",
+        "costco", "whole foods", "kroger", "safeway", "trader joe", "aldi", "reliance fresh", "more retail",
+    ),
+    "Dining": (
+        "restaurant", "cafe", "coffee", "starbucks", "swiggy", "zomato", "doordash", "uber eats", "grubhub",
+        "mcdonald", "pizza", "domino", "kfc", "burger", "chipotle", "subway", "dunkin", "bakery", "bar ",
+    ),
+    "Transport": (
+        "uber", "ola ", "olacabs", "lyft", "rapido", "fuel", "petrol", "diesel", "shell", "chevron", "exxon",
+        "indian oil", "iocl", "hpcl", "bpcl", "metro", "parking", "toll", "fastag", "irctc", "railway", "transit",
+    ),
+    "Travel": ("airline", "airways", "indigo", "vistara", "air india", "delta", "united air", "makemytrip", "booking com", "airbnb", "hotel", "expedia"),
+    "Shopping": ("amazon", "amzn", "flipkart", "myntra", "ajio", "nykaa", "target", "ebay", "ikea", "mall", "decathlon", "best buy"),
+    "Entertainment": (
+        "netflix", "spotify", "prime video", "hotstar", "disney", "hulu", "youtube premium", "apple music",
+        "cinema", "pvr", "inox", "bookmyshow", "steam", "playstation", "xbox",
+    ),
+    "Health": ("pharmacy", "pharmeasy", "1mg", "netmeds", "hospital", "clinic", "apollo", "medical", "doctor", "diagnostic", "cvs", "walgreens"),
+    "Fitness": ("gym", "fitness", "cult fit", "cultfit", "yoga", "peloton"),
+    "Education": ("school", "tuition", "college", "university", "coursera", "udemy", "byju"),
+    "Insurance": ("insurance", "premium", "lic ", "policy", "geico", "hdfc ergo", "icici lombard", "star health"),
+    "Debt Payments": ("emi", "loan", "credit card payment", "card payment", "cc payment", "autopay card"),
+    "Investments": ("mutual fund", "sip ", "zerodha", "groww", "upstox", "kuvera", "brokerage", "ppf", "nps ", "vanguard", "fidelity", "schwab", "robinhood"),
+    "Taxes": ("income tax", "advance tax", "tds", "irs ", "gst payment"),
+    "Transfers": ("neft", "imps", "rtgs", "transfer", "atm", "cash withdrawal", "self transfer", "zelle", "venmo"),
+}
+UNCATEGORIZED = "Other"
+CATEGORIES = tuple(CATEGORY_KEYWORDS) + (UNCATEGORIZED,)
+
+NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+# Tokens that identify the payment rail or reference rather than the merchant
+NOISE_TOKENS = frozenset(
+    "upi pos ach neft imps rtgs nach ecs debit credit card purchase txn trn ref ref no payment paid to "
+    "from via www com in co ltd pvt inc llc online india ind mumbai bangalore bengaluru delhi us usa".split()
+)
+MERCHANT_KEY_TOKENS = 3
+LLM_BATCH_SIZE = 100
+
+
+def normalize(description: str) -> str:
+    """Lowercase, letters and digits only, single spaces, padded so keywords can match at word starts."""
+    return " " + NON_ALNUM_RE.sub(" ", description.lower()).strip() + " "
+
+
+def merchant_key(description: str) -> str:
+    """Stable key for a merchant: the first few meaningful tokens, ignoring rails, numbers and references."""
+    tokens = [
+        token
+        for token in NON_ALNUM_RE.sub(" ", description.lower()).split()
+        if token not in NOISE_TOKENS and not any(char.isdigit() for char in token)
+    ]
+    return " ".join(tokens[:MERCHANT_KEY_TOKENS])
+
+
+class AhoCorasick:
+    """Compiled multi-pattern matcher: one pass over the text finds every keyword it contains.
+
+    The automaton is stored as flat per-state lists (goto dict, failure link, best output) so
+    the search loop is a handful of list and dict lookups per character, independent of how
+    many keywords are loaded.
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        # Best (longest) pattern ending at each state, after following failure links
+        self.output: List[Optional[Tuple[int, str]]] = [None]
+        for pattern, value in patterns.items():
+            state = 0
+            for char in pattern:
+                nxt = self.goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][char] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                state = nxt
+            if self.output[state] is None or len(pattern) > self.output[state][0]:
+                self.output[state] = (len(pattern), value)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0) if state else 0
+                inherited = self.output[self.fail[nxt]]
+                if inherited is not None and (self.output[nxt] is None or inherited[0] > self.output[nxt][0]):
+                    self.output[nxt] = inherited
+
+    def best(self, text: str) -> Optional[str]:
+        """Value of the longest pattern found in ``text``; ties go to the leftmost occurrence."""
+        goto, fail, output = self.goto, self.fail, self.output
+        state, best = 0, None
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found = output[state]
+            if found is not None and (best is None or found[0] > best[0]):
+                best = found
+        return best[1] if best else None
+
+
+categorizer_agent = Agent(
+    model=Claude(id="claude-3-5-sonnet-20240620"),
+    description=dedent("""\
+        You classify bank transaction merchants into budget categories. You receive a JSON list of
+        normalized merchant names and reply with a single JSON object mapping every merchant name
+        to exactly one category from the allowed list. Use "Other" when unsure. Reply with JSON only.\
+    """),
+)
+
+
+class Categorizer:
+    """Local transaction categorizer with an optional, batched model fallback.
+
+    Lookup order for a description: user overrides and previously learned merchants (exact
+    hash lookup on the merchant key), then the compiled keyword automaton, then the sign of
+    the amount for unmatched credits. Anything still unmatched returns ``None``; callers can
+    collect those merchant keys and resolve them in one ``resolve`` call, whose answers are
+    cached so each merchant is sent to the model at most once.
+    """
+
+    def __init__(self, keywords: Optional[Dict[str, Sequence[str]]] = None, cache_size: int = 65536):
+        keywords = CATEGORY_KEYWORDS if keywords is None else keywords
+        patterns: Dict[str, str] = {}
+        for category, words in keywords.items():
+            for word in words:
+                # Longest-match wins; for duplicate keywords the first category listed keeps it
+                patterns.setdefault(" " + word.lower().strip(" ") + (" " if word.endswith(" ") else ""), category)
+        self.index = AhoCorasick(patterns)
+        self.overrides: Dict[str, Dict[str, str]] = {}
+        self.learned: Dict[str, str] = {}
+        self.cache: Dict[str, Optional[str]] = {}
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def set_override(self, user_id: str, merchant: str, category: str) -> None:
+        """Pin a merchant (any description that reduces to the same merchant key) to a category for one user."""
+        self.overrides.setdefault(user_id, {})[merchant_key(merchant)] = category
+
+    def match(self, description: str) -> Optional[str]:
+        """Keyword/learned category of a description, cached on the exact text."""
+        category = self.cache.get(description)
+        if category is None and description not in self.cache:
+            if self.learned:
+                category = self.learned.get(merchant_key(description))
+            category = category or self.index.best(normalize(description))
+            if self.cache_size:
+                if len(self.cache) >= self.cache_size:
+                    self.cache.clear()
+                self.cache[description] = category
+        return category
+
+    def classify(self, description: str, amount: float = 0.0, user_id: Optional[str] = None) -> Optional[str]:
+        if user_id and user_id in self.overrides:
+            category = self.overrides[user_id].get(merchant_key(description))
+            if category:
+                return category
+        category = self.match(description)
+        if category is None and amount > 0:
+            return "Income"
+        return category
+
+    def classify_many(
+        self,
+        descriptions: Iterable[str],
+        amounts: Optional[Iterable[float]] = None,
+        user_id: Optional[str] = None,
+        fallback: bool = False,
+    ) -> List[str]:
+        """Categories for a batch; unmatched merchants go to the model in one batch when ``fallback`` is set."""
+        descriptions = list(descriptions)
+        amounts = list(amounts) if amounts is not None else [0.0] * len(descriptions)
+        categories = [self.classify(text, amount, user_id) for text, amount in zip(descriptions, amounts)]
+        if fallback:
+            unmatched = {merchant_key(text) for text, category in zip(descriptions, categories) if category is None}
+            resolved = self.resolve(unmatched)
+            categories = [
+                category or resolved.get(merchant_key(text)) for text, category in zip(descriptions, categories)
+            ]
+        return [category or UNCATEGORIZED for category in categories]
+
+    def resolve(self, merchants: Iterable[str]) -> Dict[str, str]:
+        """Ask the model for merchants no rule matched, in batches; answers are learned for later lookups."""
+        with self._lock:
+            pending = sorted({key for key in merchants if key and key not in self.learned})
+        for start in range(0, len(pending), LLM_BATCH_SIZE):
+            batch = pending[start : start + LLM_BATCH_SIZE]
+            answers = self._ask_model(batch)
+            with self._lock:
+                for key in batch:
+                    category = answers.get(key)
+                    self.learned[key] = category if category in CATEGORIES else UNCATEGORIZED
+                self.cache.clear()
+            log_info(f"Categorizer: model resolved {len(batch)} merchants")
+        return {key: self.learned.get(key, UNCATEGORIZED) for key in merchants if key}
+
+    @staticmethod
+    def _ask_model(batch: List[str]) -> Dict[str, str]:
+        prompt = f"Allowed categories: {json.dumps(list(CATEGORIES))}\nMerchants: {json.dumps(batch)}"
+        content = categorizer_agent.run(prompt).content or ""
+        match = re.search(r"\{.*\}", content, re.DOTALL)
+        try:
+            answers = json.loads(match.group(0)) if match else {}
+        except json.JSONDecodeError:
+            answers = {}
+        return answers if isinstance(answers, dict) else {}
+
+
+default_categorizer = Categorizer()
+
+
+def _benchmark(count: int = 1_000_000) -> None:
+    import random
+
+    random.seed(7)
+    merchants = [word.strip() for words in CATEGORY_KEYWORDS.values() for word in words] + ["corner store", "acme widgets"]
+    templates = ("UPI/{n}/{m}@okaxis/Payment", "POS {n} {M} MUMBAI IN", "{M} #{n}", "ACH DEBIT {M} REF{n}", "{M}", "{m}")
+    descriptions = [
+        random.choice(templates).format(n=random.randint(10**5, 10**9), m=merchant, M=merchant.upper())
+        for merchant in random.choices(merchants, k=count)
+    ]
+    for label, categorizer in (("uncached", Categorizer(cache_size=0)), ("cached", Categorizer())):
+        start = time.perf_counter()
+        categories = categorizer.classify_many(descriptions)
+        elapsed = time.perf_counter() - start
+        matched = sum(category != UNCATEGORIZED for category in categories)
+        print(
+            f"{label:>8}: {count:,} descriptions in {elapsed:.2f}s "
+            f"({count / elapsed * 60 / 1e6:.1f}M/min), {matched / count:.1%} matched"
+        )
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,197 @@
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+
+@dataclass
+class PayoffResult:
+    """Outcome of every (strategy, extra payment level) row, with per-debt detail of shape (rows, debts)."""
+
+    strategies: List[str]
+    extra_payments: np.ndarray
+    months_to_debt_free: np.ndarray
+    total_interest: np.ndarray
+    debt_payoff_month: np.ndarray
+    debt_interest: np.ndarray
+
+    def row(self, i: int, names: Sequence[str], start: Optional[date] = None) -> Dict:
+        months = int(self.months_to_debt_free[i])
+        result = {
+            "strategy": self.strategies[i],
+            "extra_payment": round(float(self.extra_payments[i]), 2),
+            "months_to_debt_free": months if months > 0 else None,
+            "debt_free_date": _month_label(start, months) if months > 0 else None,
+            "total_interest": round(float(self.total_interest[i]), 2),
+            "debts": [],
+        }
+        for j, name in enumerate(names):
+            paid_off = int(self.debt_payoff_month[i, j])
+            result["debts"].append(
+                {
+                    "name": name,
+                    "payoff_month": paid_off if paid_off > 0 else None,
+                    "payoff_date": _month_label(start, paid_off) if paid_off > 0 else None,
+                    "interest": round(float(self.debt_interest[i, j]), 2),
+                }
+            )
+        return result
+
+
+def _month_label(start: Optional[date], months: int) -> str:
+    start = start or date.today()
+    index = start.year * 12 + start.month - 1 + months
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def payoff_orders(balances, aprs, custom_order: Optional[Sequence[int]] = None) -> Dict[str, np.ndarray]:
+    """Priority order of debt indices for each strategy (first entry gets extra money first).
+
+    A custom order may list only some debts; the rest follow in avalanche order.
+    """
+    balances, aprs = np.asarray(balances, dtype=float), np.asarray(aprs, dtype=float)
+    # Ties fall back to the other criterion so results are deterministic
+    orders = {
+        "avalanche": np.lexsort((balances, -aprs)),
+        "snowball": np.lexsort((-aprs, balances)),
+        "minimum_only": np.arange(balances.size),
+    }
+    if custom_order is not None:
+        listed = list(dict.fromkeys(int(index) for index in custom_order))
+        if any(index < 0 or index >= balances.size for index in listed):
+            raise ValueError(f"Custom order refers to debts outside 0..{balances.size - 1}: {list(custom_order)}")
+        rest = [int(index) for index in orders["avalanche"] if index not in listed]
+        orders["custom"] = np.array(listed + rest, dtype=int)
+    return orders
+
+
+def simulate_payoff(
+    balances,
+    aprs,
+    minimum_payments,
+    extra_payments=(0.0,),
+    strategies: Sequence[str] = ("avalanche", "snowball"),
+    custom_order: Optional[Sequence[int]] = None,
+    max_months: int = 600,
+) -> PayoffResult:
+    """Simulate debt payoff for every strategy x extra payment level in one vectorized run.
+
+    Each month interest accrues, minimums are paid, and the extra payment plus any minimums
+    freed by debts already paid off (the rollover) go to debts in strategy priority order.
+    ``minimum_only`` pays just the minimums without rollover, as a baseline.
+    """
+    balances = np.asarray(balances, dtype=float)
+    rates = np.asarray(aprs, dtype=float) / 12
+    minimums = np.asarray(minimum_payments, dtype=float)
+    if balances.ndim != 1 or rates.shape != balances.shape or minimums.shape != balances.shape:
+        raise ValueError("balances, aprs and minimum_payments must have one entry per debt")
+    extras = np.atleast_1d(np.asarray(extra_payments, dtype=float))
+    orders = payoff_orders(balances, aprs, custom_order)
+    unknown = [strategy for strategy in strategies if strategy not in orders]
+    if unknown:
+        raise ValueError(f"Unknown or unconfigured strategies: {unknown}")
+
+    row_strategies = [strategy for strategy in strategies for _ in extras]
+    row_extras = np.tile(extras, len(strategies))
+    row_orders = np.stack([orders[strategy] for strategy in row_strategies])
+    rollover = np.array([strategy != "minimum_only" for strategy in row_strategies])
+    rows, debts = row_orders.shape
+    budget = minimums.sum() + row_extras
+
+    balance = np.tile(balances, (rows, 1))
+    interest_paid = np.zeros((rows, debts))
+    payoff_month = np.zeros((rows, debts), dtype=int)
+    for month in range(1, max_months + 1):
+        open_debts = balance > 0.005
+        if not open_debts.any():
+            break
+        interest = balance * rates
+        balance = balance + interest
+        interest_paid += interest
+        payment = np.minimum(minimums, balance)
+        available = np.where(rollover, budget - payment.sum(axis=1), row_extras)
+        available = np.maximum(available, 0)
+
+        # Pour the available money down the priority order: each debt takes what it still needs
+        remaining = np.take_along_axis(balance - payment, row_orders, axis=1)
+        taken_before = np.cumsum(remaining, axis=1) - remaining
+        allocation = np.clip(available[:, None] - taken_before, 0, remaining)
+        np.put_along_axis(payment, row_orders, np.take_along_axis(payment, row_orders, axis=1) + allocation, axis=1)
+
+        balance = balance - payment
+        just_paid = open_debts & (balance <= 0.005)
+        payoff_month[just_paid] = month
+        balance[balance <= 0.005] = 0.0
+
+    months_to_debt_free = np.where((payoff_month > 0).all(axis=1), payoff_month.max(axis=1), 0)
+    return PayoffResult(
+        strategies=row_strategies,
+        extra_payments=row_extras,
+        months_to_debt_free=months_to_debt_free,
+        total_interest=interest_paid.sum(axis=1),
+        debt_payoff_month=payoff_month,
+        debt_interest=interest_paid,
+    )
+
+
+class DebtTools(Toolkit):
+    def __init__(self, **kwargs):
+        super().__init__(name="debt_payoff", **kwargs)
+        self.register(self.plan_debt_payoff)
+
+    def plan_debt_payoff(
+        self,
+        names: List[str],
+        balances: List[float],
+        apr_percents: List[float],
+        minimum_payments: List[float],
+        extra_payment_levels: Optional[List[float]] = None,
+        custom_order: Optional[List[str]] = None,
+    ) -> str:
+        """Simulate paying off several debts with the avalanche (highest APR first) and snowball (smallest
+        balance first) methods, and optionally a custom order, for several extra monthly payment levels at
+        once. Returns payoff dates and total interest so strategies can be compared exactly.
+
+        Args:
+            names (List[str]): Name of each debt, e.g. ["Credit card", "Car loan", "Student loan"].
+            balances (List[float]): Current balance of each debt.
+            apr_percents (List[float]): Annual interest rate of each debt in percent, e.g. 18.99.
+            minimum_payments (List[float]): Required minimum monthly payment of each debt.
+            extra_payment_levels (List[float]): Extra monthly amounts above the minimums to compare, e.g. [0, 200, 500].
+            custom_order (List[str]): Optional debt names in the order the user wants to pay them off; unlisted
+                debts follow, highest APR first.
+
+        Returns:
+            str: JSON string with, for each strategy and extra payment level, the debt-free date, total interest
+            and each debt's payoff date, plus interest saved versus paying minimums only.
+        """
+        count = len(names)
+        if any(len(values) != count for values in (balances, apr_percents, minimum_payments)):
+            return json.dumps({"error": "names, balances, apr_percents and minimum_payments must have one entry per debt"})
+        unknown = [name for name in custom_order or [] if name not in names]
+        if unknown:
+            return json.dumps({"error": f"custom_order names unknown debts {unknown}; use names from {names}"})
+        order = [names.index(name) for name in custom_order] if custom_order else None
+        strategies = ["avalanche", "snowball"] + (["custom"] if order else [])
+        levels = sorted(set(extra_payment_levels or []) | {0.0})
+        result = simulate_payoff(
+            balances, np.asarray(apr_percents) / 100, minimum_payments, levels, strategies + ["minimum_only"], order
+        )
+        rows = [result.row(i, names) for i in range(len(result.strategies))]
+        baseline = next(row for row in rows if row["strategy"] == "minimum_only" and row["extra_payment"] == 0)
+        plans = [row for row in rows if row["strategy"] != "minimum_only"]
+        for row in plans:
+            row["interest_saved_vs_minimums"] = round(baseline["total_interest"] - row["total_interest"], 2)
+        best = min(plans, key=lambda row: (row["total_interest"], row["extra_payment"]))
+        log_info(f"Simulated {len(rows)} debt payoff scenarios for {len(names)} debts")
+        return json.dumps(
+            {
+                "minimum_payments_only": {key: baseline[key] for key in ("months_to_debt_free", "debt_free_date", "total_interest")},
+                "plans": plans,
+                "lowest_interest_plan": {"strategy": best["strategy"], "extra_payment": best["extra_payment"]},
+            }
+        )
@@ -0,0 +1,241 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+# Outcome distributions larger than this are merged into probability-weighted quantile buckets
+MAX_OUTCOMES = 4096
+PROBABILITY_TOLERANCE = 1e-6
+MAX_DEPTH = 64
+
+
+@dataclass
+class Distribution:
+    """Discrete distribution of present values, as parallel value/probability arrays."""
+
+    values: np.ndarray
+    probs: np.ndarray
+
+    @classmethod
+    def point(cls, value: float) -> "Distribution":
+        return cls(np.array([float(value)]), np.array([1.0]))
+
+    @property
+    def mean(self) -> float:
+        return float(self.values @ self.probs)
+
+    @property
+    def std(self) -> float:
+        return float(np.sqrt(max(((self.values - self.mean) ** 2) @ self.probs, 0.0)))
+
+    def quantile(self, q: float) -> float:
+        order = np.argsort(self.values, kind="stable")
+        cumulative = np.cumsum(self.probs[order])
+        return float(self.values[order][min(np.searchsorted(cumulative, q - 1e-12), order.size - 1)])
+
+    def compressed(self, limit: int = MAX_OUTCOMES) -> "Distribution":
+        """Merge into at most ``limit`` buckets of equal probability mass; the mean is preserved exactly."""
+        if self.values.size <= limit:
+            return self
+        order = np.argsort(self.values, kind="stable")
+        values, probs = self.values[order], self.probs[order]
+        bucket = np.minimum((np.cumsum(probs) - probs / 2) * limit, limit - 1).astype(int)
+        mass = np.bincount(bucket, weights=probs, minlength=limit)
+        weighted = np.bincount(bucket, weights=values * probs, minlength=limit)
+        keep = mass > 0
+        return Distribution(weighted[keep] / mass[keep], mass[keep])
+
+    def summary(self) -> Dict[str, float]:
+        losses = np.minimum(self.values, 0.0)
+        return {
+            "expected_value": round(self.mean, 2),
+            "std_dev": round(self.std, 2),
+            "p5": round(self.quantile(0.05), 2),
+            "median": round(self.quantile(0.5), 2),
+            "p95": round(self.quantile(0.95), 2),
+            "worst_case": round(float(self.values.min()), 2),
+            "best_case": round(float(self.values.max()), 2),
+            "probability_of_loss": round(float(self.probs[self.values < 0].sum()), 4),
+            "expected_loss": round(abs(float(losses @ self.probs)), 2),
+        }
+
+
+@dataclass
+class Evaluation:
+    distribution: Distribution
+    # Choice made at every decision node reached below this point, keyed by its path of chance
+    # outcomes and decision name ("market=bust/sell later?"), since the choice can differ per outcome
+    policy: Dict[str, str] = field(default_factory=dict)
+
+
+class DecisionTree:
+    """Expected-value and risk evaluation of a decision tree given as nested dicts.
+
+    Node types:
+      - ``{"type": "decision", "name": ..., "options": [branch, ...]}``
+      - ``{"type": "chance", "name": ..., "outcomes": [branch with "probability", ...]}``
+      - ``{"type": "terminal", "value": ...}``
+      - ``{"ref": "id"}``: a shared subtree from the tree's top-level ``"subtrees"`` mapping.
+
+    A branch is ``{"name": ..., "cash_flows": [year 0, year 1, ...], "years": n, "next": node}``;
+    cash flows are yearly amounts from the branch start, ``years`` (default: the number of cash
+    flows) is when ``next`` begins, and a missing ``next`` ends the path. Every subtree is valued
+    in money of its own start date and discounted by its parent, so a shared subtree has the same
+    value wherever it is reached and is evaluated once (memoized on its id). Decision nodes pick
+    the option with the highest ``mean - risk_aversion * std``.
+    """
+
+    def __init__(self, tree: Dict[str, Any], discount_rate: float = 0.08, risk_aversion: float = 0.0):
+        self.root = tree.get("root", tree)
+        self.subtrees: Dict[str, Dict[str, Any]] = tree.get("subtrees", {})
+        self.discount_rate = discount_rate
+        self.risk_aversion = risk_aversion
+        self.memo: Dict[str, Evaluation] = {}
+        self.nodes_evaluated = 0
+        self.memo_hits = 0
+        self._active: set = set()
+
+    def score(self, distribution: Distribution) -> float:
+        return distribution.mean - self.risk_aversion * distribution.std
+
+    def evaluate(self, node: Optional[Dict[str, Any]], depth: int = 0) -> Evaluation:
+        if node is None:
+            return Evaluation(Distribution.point(0.0))
+        if depth > MAX_DEPTH:
+            raise ValueError(f"Decision tree is deeper than {MAX_DEPTH} levels")
+        key = node.get("ref") or node.get("id")
+        if key is not None:
+            if key in self.memo:
+                self.memo_hits += 1
+                return self.memo[key]
+            if key in self._active:
+                raise ValueError(f"Subtree {key!r} refers to itself")
+            if "ref" in node:
+                if key not in self.subtrees:
+                    raise ValueError(f"Unknown subtree reference {key!r}")
+                self._active.add(key)
+                result = self.evaluate(self.subtrees[key], depth + 1)
+                self._active.discard(key)
+                self.memo[key] = result
+                return result
+        self.nodes_evaluated += 1
+        kind = node.get("type") or ("terminal" if "value" in node else None)
+        if kind == "terminal":
+            result = Evaluation(Distribution.point(node.get("value", 0.0)))
+        elif kind == "chance":
+            result = self._chance(node, depth)
+        elif kind == "decision":
+            result = self._decision(node, depth)[0]
+        else:
+            raise ValueError(f"Node {node.get('name', '?')!r} needs a type of decision, chance or terminal")
+        if key is not None:
+            self.memo[key] = result
+        return result
+
+    def branch(self, branch: Dict[str, Any], depth: int) -> Evaluation:
+        """Present value of a branch's own cash flows plus its discounted continuation."""
+        flows = np.atleast_1d(np.asarray(branch.get("cash_flows", branch.get("cash_flow", 0.0)), dtype=float))
+        growth = (1 + self.discount_rate) ** -np.arange(flows.size)
+        years = branch.get("years", flows.size)
+        child = self.evaluate(branch.get("next"), depth + 1)
+        scale = (1 + self.discount_rate) ** -years
+        distribution = Distribution(float(flows @ growth) + scale * child.distribution.values, child.distribution.probs)
+        return Evaluation(distribution, child.policy)
+
+    def _chance(self, node: Dict[str, Any], depth: int) -> Evaluation:
+        outcomes = node.get("outcomes") or []
+        probs = np.array([outcome.get("probability", 0.0) for outcome in outcomes], dtype=float)
+        if not outcomes or np.any(probs < 0) or abs(probs.sum() - 1) > PROBABILITY_TOLERANCE:
+            raise ValueError(f"Outcome probabilities of {node.get('name', 'chance node')!r} must be non-negative and sum to 1")
+        values, weights, policy = [], [], {}
+        name = node.get("name", "chance")
+        for i, (outcome, prob) in enumerate(zip(outcomes, probs)):
+            evaluated = self.branch(outcome, depth)
+            values.append(evaluated.distribution.values)
+            weights.append(evaluated.distribution.probs * prob)
+            prefix = f"{name}={outcome.get('name', f'outcome {i + 1}')}/"
+            policy.update({prefix + path: choice for path, choice in evaluated.policy.items()})
+        return Evaluation(Distribution(np.concatenate(values), np.concatenate(weights)).compressed(), policy)
+
+    def _decision(self, node: Dict[str, Any], depth: int) -> Tuple[Evaluation, List[Tuple[str, Evaluation]]]:
+        options = node.get("options") or []
+        if not options:
+            raise ValueError(f"Decision {node.get('name', '?')!r} has no options")
+        evaluated = [(option.get("name", f"option {i + 1}"), self.branch(option, depth)) for i, option in enumerate(options)]
+        name, best = max(evaluated, key=lambda item: self.score(item[1].distribution))
+        policy = {**best.policy, node.get("name", "decision"): name}
+        return Evaluation(best.distribution, policy), evaluated
+
+    def compare(self) -> Dict[str, Any]:
+        """Ranked comparison of the root decision's options (or the evaluation of a root chance node)."""
+        root = self.subtrees.get(self.root["ref"], self.root) if "ref" in self.root else self.root
+        if root.get("type") != "decision":
+            evaluation = self.evaluate(root)
+            return {"summary": evaluation.distribution.summary(), "plan": evaluation.policy, **self.stats()}
+        self.nodes_evaluated += 1
+        _, evaluated = self._decision(root, 0)
+        ranked = sorted(evaluated, key=lambda item: -self.score(item[1].distribution))
+        options = [
+            {
+                "rank": rank,
+                "option": name,
+                "score": round(self.score(evaluation.distribution), 2),
+                **evaluation.distribution.summary(),
+                "outcomes": int(evaluation.distribution.values.size),
+                "plan": evaluation.policy,
+            }
+            for rank, (name, evaluation) in enumerate(ranked, start=1)
+        ]
+        best, runner_up = options[0], options[1] if len(options) > 1 else None
+        return {
+            "decision": root.get("name", "decision"),
+            "recommended": best["option"],
+            "advantage_over_next": round(best["score"] - runner_up["score"], 2) if runner_up else None,
+            "options": options,
+            **self.stats(),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "discount_rate": self.discount_rate,
+            "risk_aversion": self.risk_aversion,
+            "nodes_evaluated": self.nodes_evaluated,
+            "shared_subtree_reuses": self.memo_hits,
+        }
+
+
+class DecisionTreeTools(Toolkit):
+    def __init__(self, **kwargs):
+        super().__init__(name="decision_tree", **kwargs)
+        self.register(self.evaluate_decision_tree)
+
+    def evaluate_decision_tree(self, tree_json: str, discount_rate_percent: float = 8, risk_aversion: float = 0) -> str:
+        """Evaluate a decision tree (rent vs buy, career switch, starting a business, best/base/worst cases)
+        in one call: NPV and expected value of every option over all branches, downside risk (5th percentile,
+        worst case, probability of loss) and the best choice at every later decision. Returns a ranked comparison.
+
+        Args:
+            tree_json (str): JSON tree. Root: {"type": "decision", "name": "...", "options": [branch, ...]}.
+                Branch: {"name": "...", "cash_flows": [year0, year1, ...], "years": n, "next": node}; cash flows
+                are yearly amounts (negative = cost) and "next" starts after "years" years (default: number of
+                cash flows). Chance node: {"type": "chance", "name": "...", "outcomes": [branch with "probability"]}.
+                Terminal: {"type": "terminal", "value": x} (e.g. resale value). Reuse a subtree by putting it in a
+                top-level "subtrees": {"id": node} map next to "root": node, and referencing {"ref": "id"}.
+            discount_rate_percent (float): Annual discount rate for NPV, in percent.
+            risk_aversion (float): Penalty per unit of standard deviation when ranking (0 = pure expected value).
+
+        Returns:
+            str: JSON string with the recommended option and, per option in rank order, expected NPV, standard
+            deviation, p5/median/p95, worst and best case, probability of loss and the plan for later decisions,
+            keyed by the chance outcomes leading to each one (e.g. "market=bust/sell?").
+        """
+        try:
+            tree = json.loads(tree_json)
+            result = DecisionTree(tree, discount_rate_percent / 100, risk_aversion).compare()
+        except (ValueError, TypeError, KeyError, AttributeError) as e:
+            return json.dumps({"error": f"Invalid decision tree: {e}"})
+        log_info(f"Evaluated decision tree: {result['nodes_evaluated']} nodes, {result['shared_subtree_reuses']} reuses")
+        return json.dumps(result)
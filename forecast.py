@@ -0,0 +1,242 @@
+import itertools
+import time
+from typing import Dict, Hashable, List, Tuple
+
+import numpy as np
+
+from profile_parser import format_amount
+
+SEASON = 12
+HORIZON = 12
+# Months of observed history needed before a seasonal pattern is estimated; shorter series get trend only
+MIN_SEASONAL_MONTHS = 24
+MIN_MONTHS = 6
+# Smoothing grid searched for every series at once: level, trend (share of level), seasonal, damping
+ALPHAS = (0.1, 0.3, 0.5)
+BETAS = (0.05, 0.2)
+GAMMAS = (0.05, 0.2, 0.4)
+PHIS = (0.9, 0.98)
+# One-step errors from the first months only settle the initial state and are not scored
+BURN_IN = 6
+INTERVALS = {80: 1.2816, 95: 1.9600}
+CHUNK_SERIES = 8192
+
+MonthTable = Dict[str, Dict[str, float]]
+
+
+def _month_index(month: str) -> int:
+    year, number = month.split("-")[:2]
+    return int(year) * 12 + int(number) - 1
+
+
+def _month_label(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def _initial_state(z: np.ndarray, start: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Level, trend and seasonal indices from a per-series linear fit plus calendar-month means of its residuals.
+
+    ``z`` is (series, months) with NaN where a series has no data; column ``t`` is calendar
+    month ``(start + t) % 12``. Returns the state at column 0 and a mask of seasonal series.
+    """
+    series, months = z.shape
+    t = np.arange(months, dtype=float)
+    observed = ~np.isnan(z)
+    n = observed.sum(axis=1)
+    safe_n = np.maximum(n, 1)
+    t_mean = (observed * t).sum(axis=1) / safe_n
+    z_mean = np.nansum(z, axis=1) / safe_n
+    dt = np.where(observed, t - t_mean[:, None], 0.0)
+    dz = np.where(observed, z - z_mean[:, None], 0.0)
+    var = (dt**2).sum(axis=1)
+    slope = np.where(var > 0, (dt * dz).sum(axis=1) / np.maximum(var, 1e-12), 0.0)
+    level = z_mean - slope * t_mean
+
+    residual = np.where(observed, z - (level[:, None] + slope[:, None] * t), 0.0)
+    calendar = (start + np.arange(months)) % SEASON
+    onehot = calendar[:, None] == np.arange(SEASON)[None, :]
+    hits = observed.astype(float) @ onehot
+    season = np.where(hits > 0, (residual @ onehot) / np.maximum(hits, 1), 0.0)
+    season -= season.mean(axis=1, keepdims=True)
+    seasonal = n >= MIN_SEASONAL_MONTHS
+    season[~seasonal] = 0.0
+    return level, slope, season, seasonal
+
+
+def _smooth(z: np.ndarray, start: int):
+    """Run damped-trend additive Holt-Winters for every series and every grid point in lockstep.
+
+    Arrays are (series, combos); the loop is over months only. Returns the final states,
+    the one-step error variance and the parameters, all per (series, combo).
+    """
+    grid = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS, PHIS)))
+    alpha, beta, gamma, phi = (grid[:, i][None, :] for i in range(4))
+    series, months = z.shape
+    level0, trend0, season0, seasonal = _initial_state(z, start)
+    # Series too short for a seasonal estimate keep their (zero) seasonal indices fixed
+    gamma = np.where(seasonal[:, None], gamma, 0.0)
+    combos = grid.shape[0]
+    level = np.repeat(level0[:, None], combos, axis=1)
+    trend = np.repeat(trend0[:, None], combos, axis=1)
+    season = np.repeat(season0[:, None, :], combos, axis=1)
+    sse = np.zeros((series, combos))
+    scored = np.zeros(series)
+    observed_so_far = np.zeros(series)
+
+    for t in range(months):
+        month = (start + t) % SEASON
+        x = z[:, t]
+        live = ~np.isnan(x)
+        damped = phi * trend
+        s = season[:, :, month]
+        error = np.where(live[:, None], np.nan_to_num(x)[:, None] - (level + damped + s), 0.0)
+        level = level + damped + alpha * error
+        trend = damped + alpha * beta * error
+        season[:, :, month] = s + gamma * error
+        counted = live & (observed_so_far >= BURN_IN)
+        sse += np.where(counted[:, None], error**2, 0.0)
+        scored += counted
+        observed_so_far += live
+    # Degrees of freedom for the three fitted smoothing weights
+    variance = sse / np.maximum(scored - 3, 1)[:, None]
+    return level, trend, season, variance, (alpha, beta, np.broadcast_to(gamma, (series, combos)), phi)
+
+
+def holt_winters(history: np.ndarray, start_month: str, horizon: int = HORIZON) -> Dict[str, np.ndarray]:
+    """Fit seasonal exponential smoothing to every row of ``history`` and forecast ``horizon`` months.
+
+    ``history`` is (series, months) of monthly amounts with NaN before a series starts (or for
+    gaps); column 0 is ``start_month`` ("YYYY-MM"). Series are modelled on log1p(amount), so
+    forecasts stay non-negative and intervals widen proportionally. Every series picks its own
+    smoothing parameters from a small grid by one-step-ahead error, all in one vectorized pass.
+    Series with fewer than ``MIN_MONTHS`` observations get NaN forecasts.
+    """
+    history = np.asarray(history, dtype=float)
+    if history.ndim != 2:
+        raise ValueError("history must be a (series, months) array")
+    start = _month_index(start_month)
+    z = np.log1p(np.clip(history, 0.0, None))
+    level, trend, season, variance, (alpha, beta, gamma, phi) = _smooth(z, start)
+
+    best = np.argmin(variance, axis=1)
+
+    def pick(values):
+        return np.take_along_axis(np.broadcast_to(values, variance.shape), best[:, None], axis=1)[:, 0]
+
+    level, trend, sigma2 = pick(level), pick(trend), pick(variance)
+    alpha, beta, gamma, phi = pick(alpha), pick(beta), pick(gamma), pick(phi)
+    season = np.take_along_axis(season, best[:, None, None], axis=1)[:, 0, :]
+
+    months = history.shape[1]
+    steps = np.arange(1, horizon + 1)
+    # Cumulative damping sum phi + phi^2 + ... + phi^h for every series and step
+    damping = np.cumsum(phi[:, None] ** steps[None, :], axis=1)
+    calendar = (start + months - 1 + steps) % SEASON
+    mean = level[:, None] + damping * trend[:, None] + season[:, calendar]
+    # ETS(A,Ad,A) forecast variance: sigma^2 * (1 + sum over j < h of c_j^2)
+    c = alpha[:, None] * (1 + beta[:, None] * damping) + gamma[:, None] * (steps % SEASON == 0)[None, :]
+    spread = np.sqrt(sigma2[:, None] * (1 + np.concatenate([np.zeros((c.shape[0], 1)), np.cumsum(c**2, axis=1)[:, :-1]], axis=1)))
+
+    enough = (~np.isnan(history)).sum(axis=1) >= MIN_MONTHS
+    result = {
+        "months": [_month_label(start + months - 1 + step) for step in steps],
+        "forecast": np.where(enough[:, None], np.maximum(np.expm1(mean), 0.0), np.nan),
+        "alpha": alpha,
+        "beta": beta,
+        "gamma": gamma,
+        "phi": phi,
+        "seasonal": gamma > 0,
+    }
+    for level_pct, quantile in INTERVALS.items():
+        result[f"lower_{level_pct}"] = np.where(enough[:, None], np.maximum(np.expm1(mean - quantile * spread), 0.0), np.nan)
+        result[f"upper_{level_pct}"] = np.where(enough[:, None], np.maximum(np.expm1(mean + quantile * spread), 0.0), np.nan)
+    return result
+
+
+def stack_tables(tables: Dict[Hashable, MonthTable]) -> Tuple[List[Tuple[Hashable, str]], np.ndarray, str]:
+    """Lay out {owner: {category: {month: amount}}} as one (series, months) matrix on a shared month grid.
+
+    Months a series did not report between its first and last month count as zero spending;
+    months before its first one are NaN.
+    """
+    keys, rows = [], []
+    months = [_month_index(month) for table in tables.values() for values in table.values() for month in values]
+    if not months:
+        return [], np.zeros((0, 0)), ""
+    first, last = min(months), max(months)
+    width = last - first + 1
+    for owner, table in tables.items():
+        for category, values in table.items():
+            row = np.full(width, np.nan)
+            columns = np.array([_month_index(month) - first for month in values])
+            if not columns.size:
+                continue
+            row[columns.min() :] = 0.0
+            row[columns] = list(values.values())
+            keys.append((owner, category))
+            rows.append(row)
+    return keys, np.vstack(rows), _month_label(first)
+
+
+def forecast_tables(
+    tables: Dict[Hashable, MonthTable], horizon: int = HORIZON, chunk: int = CHUNK_SERIES
+) -> Dict[Hashable, Dict[str, Dict]]:
+    """Nightly-batch entry point: forecasts for every (owner, category), processed in fixed-size chunks.
+
+    Returns {owner: {category: {"months": [...], "forecast": [...], "lower_80": [...], ...}}}.
+    """
+    keys, history, start = stack_tables(tables)
+    results: Dict[Hashable, Dict[str, Dict]] = {}
+    for offset in range(0, len(keys), chunk):
+        fitted = holt_winters(history[offset : offset + chunk], start, horizon)
+        for i, (owner, category) in enumerate(keys[offset : offset + chunk]):
+            if np.isnan(fitted["forecast"][i, 0]):
+                continue
+            entry = {"months": fitted["months"], "seasonal": bool(fitted["seasonal"][i])}
+            for name in ["forecast"] + [f"{side}_{level}" for level in INTERVALS for side in ("lower", "upper")]:
+                entry[name] = np.round(fitted[name][i], 2).tolist()
+            results.setdefault(owner, {})[category] = entry
+    return results
+
+
+def forecast_categories(table: MonthTable, horizon: int = HORIZON) -> Dict[str, Dict]:
+    """Forecasts for one user's {category: {month: amount}} table (e.g. ``MonthlyTotals.category_totals()``)."""
+    return forecast_tables({None: table}, horizon).get(None, {})
+
+
+def forecast_summary(forecasts: Dict[str, Dict], currency: str = "USD", limit: int = 10) -> str:
+    """Prompt block: next-12-month total per category, the sum of its monthly 80% bounds, and the peak month."""
+    if not forecasts:
+        return ""
+    rows = []
+    for category, entry in forecasts.items():
+        point = np.array(entry["forecast"])
+        peak = int(np.argmax(point))
+        rows.append((point.sum(), category, np.sum(entry["lower_80"]), np.sum(entry["upper_80"]), entry["months"][peak], point[peak], entry["seasonal"]))
+    rows.sort(reverse=True)
+    months = next(iter(forecasts.values()))["months"]
+    lines = [f"Spending forecast {months[0]} to {months[-1]} (seasonal exponential smoothing; total, sum of monthly 80% bounds, peak month):"]
+    for total, category, low, high, peak_month, peak, seasonal in rows[:limit]:
+        peak_text = f", peak {peak_month} {format_amount(peak, currency)}" if seasonal else ""
+        lines.append(
+            f"- {category}: {format_amount(total, currency)} ({format_amount(low, currency)}-{format_amount(high, currency)}){peak_text}"
+        )
+    return "\n".join(lines)
+
+
+def _benchmark(series: int = 200_000, months: int = 60) -> None:
+    rng = np.random.default_rng(11)
+    t = np.arange(months)
+    base = rng.lognormal(5, 1, size=(series, 1))
+    seasonal = 1 + 0.3 * np.sin(2 * np.pi * (t + rng.integers(0, 12, size=(series, 1))) / 12)
+    history = base * seasonal * (1 + 0.002 * t) * rng.lognormal(0, 0.15, size=(series, months))
+    history[rng.random(series) < 0.3, :24] = np.nan
+    start = time.perf_counter()
+    for offset in range(0, series, CHUNK_SERIES):
+        holt_winters(history[offset : offset + CHUNK_SERIES], "2020-01")
+    elapsed = time.perf_counter() - start
+    print(f"{series:,} series x {months} months in {elapsed:.1f}s ({series / elapsed:,.0f} series/s)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,165 @@
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+
+def inflate(target_today, years, inflation) -> np.ndarray:
+    """Future cost of goals priced in today's money."""
+    return np.asarray(target_today, dtype=float) * (1 + np.asarray(inflation, dtype=float)) ** np.asarray(years, dtype=float)
+
+
+def _annuity_due(rate: np.ndarray, periods) -> np.ndarray:
+    """Future value of 1 paid at the start of each of ``periods`` periods."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(rate > 0, (1 + rate) * ((1 + rate) ** periods - 1) / rate, periods)
+
+
+def sip_factor(months, annual_return, annual_step_up=0.0) -> np.ndarray:
+    """Future value of contributing 1 per month (at the start of each month) for ``months`` months.
+
+    Contributions rise by ``annual_step_up`` every twelve months. Closed form, so it costs the same
+    for any tenure: each full year is a 12-payment annuity and the stepped-up years form a
+    geometric series, plus a partial final year.
+    """
+    months, annual_return, annual_step_up = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (months, annual_return, annual_step_up))
+    )
+    r = annual_return / 12
+    years, remainder = np.divmod(months, 12)
+    ratio = (1 + annual_step_up) / (1 + r) ** 12
+    with np.errstate(divide="ignore", invalid="ignore"):
+        series = np.where(np.isclose(ratio, 1), years, (1 - ratio**years) / (1 - ratio))
+    full_years = _annuity_due(r, 12) * (1 + r) ** (months - 12) * series
+    last_year = (1 + annual_step_up) ** years * _annuity_due(r, remainder)
+    return full_years + last_year
+
+
+def allocate(required, surplus: float, priorities=None, due_months=None) -> np.ndarray:
+    """Split a monthly surplus across goals in priority order (ties go to the nearer goal).
+
+    Each goal takes what it still needs before the next one gets anything.
+    """
+    required = np.asarray(required, dtype=float)
+    priorities = np.zeros_like(required) if priorities is None else np.asarray(priorities, dtype=float)
+    due_months = np.zeros_like(required) if due_months is None else np.asarray(due_months, dtype=float)
+    order = np.lexsort((due_months, priorities))
+    taken_before = np.cumsum(required[order]) - required[order]
+    allocation = np.empty_like(required)
+    allocation[order] = np.clip(surplus - taken_before, 0, required[order])
+    return allocation
+
+
+def solve_goals(
+    targets_today,
+    years,
+    inflation,
+    annual_return,
+    current_savings=0.0,
+    annual_step_up=0.0,
+    priorities=None,
+    monthly_surplus: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """Required monthly saving for every goal, and the funding achieved with a limited surplus.
+
+    Existing savings earmarked for a goal grow at its return and reduce what is still needed.
+    With ``monthly_surplus`` the money is allocated by priority and the projected corpus,
+    shortfall and funded share are reported for the allocated amounts.
+    """
+    targets_today, years, inflation, annual_return, current_savings, annual_step_up = np.broadcast_arrays(
+        *(
+            np.atleast_1d(np.asarray(value, dtype=float))
+            for value in (targets_today, years, inflation, annual_return, current_savings, annual_step_up)
+        )
+    )
+    months = np.maximum(np.round(years * 12), 1)
+    future_cost = inflate(targets_today, years, inflation)
+    savings_value = current_savings * (1 + annual_return / 12) ** months
+    gap = np.maximum(future_cost - savings_value, 0)
+    factor = sip_factor(months, annual_return, annual_step_up)
+    required = gap / factor
+
+    allocated = required if monthly_surplus is None else allocate(required, monthly_surplus, priorities, months)
+    projected = savings_value + allocated * factor
+    return {
+        "months": months,
+        "future_cost": future_cost,
+        "existing_savings_value": savings_value,
+        "required_monthly": required,
+        "allocated_monthly": allocated,
+        "projected_value": projected,
+        "shortfall": np.maximum(future_cost - projected, 0),
+        "funded_ratio": np.where(future_cost > 0, np.minimum(projected / np.maximum(future_cost, 1e-9), 1), 1.0),
+    }
+
+
+class GoalTools(Toolkit):
+    def __init__(self, **kwargs):
+        super().__init__(name="goal_funding", **kwargs)
+        self.register(self.plan_goal_funding)
+
+    def plan_goal_funding(
+        self,
+        names: List[str],
+        target_amounts_today: List[float],
+        years_to_goal: List[float],
+        expected_return_percents: List[float],
+        inflation_percents: Optional[List[float]] = None,
+        current_savings: Optional[List[float]] = None,
+        priorities: Optional[List[int]] = None,
+        monthly_surplus: float = -1,
+        annual_step_up_percent: float = 0,
+    ) -> str:
+        """Compute the monthly saving (SIP) every goal needs in one call, and how a limited monthly surplus
+        should be split across goals by priority. Use this instead of calculator chains for goal planning.
+
+        Args:
+            names (List[str]): Goal names, e.g. ["Home down payment", "Child education", "Retirement"].
+            target_amounts_today (List[float]): Cost of each goal in today's money.
+            years_to_goal (List[float]): Years until each goal is needed.
+            expected_return_percents (List[float]): Expected annual return on each goal's investments, in percent.
+            inflation_percents (List[float]): Annual cost inflation for each goal in percent (e.g. 10 for education); default 6.
+            current_savings (List[float]): Savings already earmarked for each goal; default 0.
+            priorities (List[int]): Priority of each goal, 1 = most important; default all equal (nearest goal first).
+            monthly_surplus (float): Monthly amount available for all goals together; -1 if not a constraint.
+            annual_step_up_percent (float): Yearly increase in the monthly saving, in percent (step-up SIP).
+
+        Returns:
+            str: JSON string with, per goal, the inflated target, required monthly saving, allocated amount,
+            projected corpus, shortfall and funded percentage, plus totals.
+        """
+        count = len(names)
+        result = solve_goals(
+            target_amounts_today,
+            years_to_goal,
+            np.asarray(inflation_percents if inflation_percents else [6.0] * count) / 100,
+            np.asarray(expected_return_percents) / 100,
+            current_savings=current_savings if current_savings else [0.0] * count,
+            annual_step_up=annual_step_up_percent / 100,
+            priorities=priorities,
+            monthly_surplus=None if monthly_surplus < 0 else monthly_surplus,
+        )
+        goals = [
+            {
+                "name": name,
+                "future_cost": round(float(result["future_cost"][i]), 2),
+                "required_monthly": round(float(result["required_monthly"][i]), 2),
+                "allocated_monthly": round(float(result["allocated_monthly"][i]), 2),
+                "projected_value": round(float(result["projected_value"][i]), 2),
+                "shortfall": round(float(result["shortfall"][i]), 2),
+                "funded_percent": round(float(result["funded_ratio"][i]) * 100, 1),
+            }
+            for i, name in enumerate(names)
+        ]
+        total_required = float(result["required_monthly"].sum())
+        log_info(f"Solved monthly savings for {count} goals: {total_required:.2f} required in total")
+        return json.dumps(
+            {
+                "goals": goals,
+                "total_required_monthly": round(total_required, 2),
+                "total_allocated_monthly": round(float(result["allocated_monthly"].sum()), 2),
+                "unallocated_surplus": round(max(monthly_surplus - total_required, 0.0), 2) if monthly_surplus >= 0 else None,
+            }
+        )
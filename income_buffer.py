@@ -0,0 +1,197 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+METHODS = ("bootstrap", "lognormal", "triangular")
+# Consecutive months resampled together so dry spells in the history stay together
+BLOCK_MONTHS = 3
+
+
+@dataclass(frozen=True)
+class IncomeModel:
+    """How simulated monthly income is drawn: from a history (resampled or fitted) or from a stated range."""
+
+    history: Optional[Sequence[float]] = None
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    average: Optional[float] = None
+    method: str = "bootstrap"
+
+    def sample(self, paths: int, months: int, rng: np.random.Generator) -> np.ndarray:
+        """(paths, months) matrix of simulated monthly income."""
+        if self.method not in METHODS:
+            raise ValueError(f"Unknown method {self.method!r}; choose from {list(METHODS)}")
+        history = np.asarray(self.history if self.history is not None else [], dtype=float)
+        if self.method == "triangular" or history.size == 0:
+            return self._triangular(paths, months, rng)
+        if self.method == "lognormal":
+            return self._lognormal(history, paths, months, rng)
+        # Circular block bootstrap: random starting months, each extended by BLOCK_MONTHS consecutive months
+        block = min(BLOCK_MONTHS, history.size)
+        blocks = -(-months // block)
+        starts = rng.integers(0, history.size, size=(paths, blocks))
+        index = (starts[:, :, None] + np.arange(block)) % history.size
+        return history[index.reshape(paths, -1)[:, :months]]
+
+    @staticmethod
+    def _lognormal(history: np.ndarray, paths: int, months: int, rng: np.random.Generator) -> np.ndarray:
+        # Zero-income months are kept as their own probability; the rest are fitted as lognormal
+        positive = history[history > 0]
+        if positive.size < 2:
+            raise ValueError("A lognormal fit needs at least two months with income")
+        logs = np.log(positive)
+        income = rng.lognormal(logs.mean(), logs.std(ddof=1), size=(paths, months))
+        return np.where(rng.random((paths, months)) < 1 - positive.size / history.size, 0.0, income)
+
+    def _triangular(self, paths: int, months: int, rng: np.random.Generator) -> np.ndarray:
+        if self.minimum is None or self.maximum is None or self.maximum < self.minimum:
+            raise ValueError("Give an income history, or a minimum and maximum monthly income")
+        if self.maximum == self.minimum:
+            return np.full((paths, months), float(self.minimum))
+        # The mode is set so the distribution's mean equals the stated average, when one is given
+        average = self.average if self.average is not None else (self.minimum + self.maximum) / 2
+        mode = float(np.clip(3 * average - self.minimum - self.maximum, self.minimum, self.maximum))
+        return rng.triangular(self.minimum, mode, self.maximum, size=(paths, months))
+
+
+def required_buffer(income: np.ndarray, salary: float, confidence: Sequence[float]) -> np.ndarray:
+    """Starting buffer that lets a fixed monthly ``salary`` be paid every month with the given probabilities.
+
+    With cumulative income C_t, the buffer must cover max_t(salary * t - C_t) on a path.
+    """
+    cumulative = np.cumsum(income, axis=1)
+    months = np.arange(1, income.shape[1] + 1)
+    deficit = np.maximum((salary * months - cumulative).max(axis=1), 0.0)
+    return np.quantile(deficit, confidence)
+
+
+def safe_salary(income: np.ndarray, buffer: float, confidence: Sequence[float]) -> np.ndarray:
+    """Largest fixed monthly salary payable from income plus ``buffer`` with the given probabilities.
+
+    On a path, salary S is payable while S * t <= buffer + C_t for all t, so the path's limit is
+    min_t (buffer + C_t) / t; the safe salary is that limit's lower quantile.
+    """
+    cumulative = np.cumsum(income, axis=1)
+    months = np.arange(1, income.shape[1] + 1)
+    limit = ((buffer + cumulative) / months).min(axis=1)
+    return np.quantile(limit, 1 - np.asarray(confidence))
+
+
+def simulate_buffer(
+    model: IncomeModel,
+    fixed_expenses: float,
+    current_buffer: float = 0.0,
+    confidence: Sequence[float] = (0.90, 0.95, 0.99),
+    horizon_months: int = 12,
+    paths: int = 10_000,
+    target_salary: Optional[float] = None,
+    seed: Optional[int] = None,
+) -> Dict:
+    """Buffer sizes and safe salaries for variable income, over ``paths`` simulated horizons at once."""
+    if horizon_months < 1 or paths < 1:
+        raise ValueError("horizon_months and paths must be positive")
+    rng = np.random.default_rng(seed)
+    income = model.sample(paths, horizon_months, rng)
+    confidence = np.asarray(confidence, dtype=float)
+    cumulative = np.cumsum(income, axis=1)
+    months = np.arange(1, horizon_months + 1)
+    shortfall = ((current_buffer + cumulative - fixed_expenses * months) < 0).any(axis=1)
+
+    buffers = required_buffer(income, fixed_expenses, confidence)
+    salaries = safe_salary(income, current_buffer, confidence)
+    levels = []
+    for i, level in enumerate(confidence):
+        row = {
+            "confidence": float(level),
+            "buffer_for_fixed_expenses": round(float(buffers[i]), 2),
+            "buffer_months_of_expenses": round(float(buffers[i] / fixed_expenses), 1) if fixed_expenses > 0 else None,
+            "safe_monthly_salary_with_current_buffer": round(float(salaries[i]), 2),
+        }
+        if target_salary is not None:
+            row["buffer_for_target_salary"] = round(float(required_buffer(income, target_salary, [level])[0]), 2)
+        levels.append(row)
+    window = min(3, horizon_months)
+    worst_stretch = np.lib.stride_tricks.sliding_window_view(income, window, axis=1).sum(axis=2).min(axis=1)
+    return {
+        "paths": paths,
+        "horizon_months": horizon_months,
+        "method": model.method if model.history is not None and len(model.history) else "triangular",
+        "monthly_income": {
+            "mean": round(float(income.mean()), 2),
+            "p10": round(float(np.quantile(income, 0.10)), 2),
+            "p50": round(float(np.quantile(income, 0.50)), 2),
+            "p90": round(float(np.quantile(income, 0.90)), 2),
+        },
+        f"worst_{window}_month_income_p5": round(float(np.quantile(worst_stretch, 0.05)), 2),
+        "fixed_expenses": fixed_expenses,
+        "current_buffer": current_buffer,
+        "shortfall_probability_with_current_buffer": round(float(shortfall.mean()), 4),
+        "levels": levels,
+    }
+
+
+class IncomeBufferTools(Toolkit):
+    def __init__(self, default_paths: int = 10_000, **kwargs):
+        super().__init__(name="income_buffer", **kwargs)
+        self.default_paths = default_paths
+        self.register(self.simulate_income_buffer)
+
+    def simulate_income_buffer(
+        self,
+        monthly_fixed_expenses: float,
+        income_history: Optional[List[float]] = None,
+        income_min: Optional[float] = None,
+        income_max: Optional[float] = None,
+        income_average: Optional[float] = None,
+        current_buffer: float = 0,
+        confidence_percents: Optional[List[float]] = None,
+        horizon_months: int = 12,
+        method: str = "bootstrap",
+        target_monthly_salary: Optional[float] = None,
+        paths: int = 0,
+    ) -> str:
+        """Simulate thousands of years of irregular (freelance, commission, seasonal) income against fixed
+        expenses. Returns the cash buffer needed and the fixed monthly "salary" the client can safely pay
+        themselves at each confidence level. Use this instead of estimating buffer sizes for variable income.
+
+        Args:
+            monthly_fixed_expenses (float): Fixed monthly expenses that must be paid every month.
+            income_history (List[float]): Past monthly incomes, oldest first, if known (12+ months is best).
+            income_min (float): Lowest typical monthly income, used when no history is given.
+            income_max (float): Highest typical monthly income, used when no history is given.
+            income_average (float): Average monthly income, used with income_min/income_max.
+            current_buffer (float): Cash already set aside as a buffer.
+            confidence_percents (List[float]): Confidence levels in percent, e.g. [90, 95, 99].
+            horizon_months (int): Months each simulated path covers, usually 12.
+            method (str): "bootstrap" resamples the history in 3-month blocks, "lognormal" fits a distribution
+                to it, "triangular" uses income_min/income_max/income_average.
+            target_monthly_salary (float): Optional salary to size a buffer for, besides fixed expenses.
+            paths (int): Number of simulated paths; 0 uses the default.
+
+        Returns:
+            str: JSON string with simulated income percentiles, shortfall probability with the current buffer,
+            and for each confidence level the buffer for fixed expenses and the safe monthly salary.
+        """
+        model = IncomeModel(
+            history=income_history,
+            minimum=income_min,
+            maximum=income_max,
+            average=income_average,
+            method=method if income_history else "triangular",
+        )
+        levels = [percent / 100 for percent in (confidence_percents or [90, 95, 99])]
+        result = simulate_buffer(
+            model,
+            monthly_fixed_expenses,
+            current_buffer,
+            levels,
+            horizon_months,
+            paths or self.default_paths,
+            target_monthly_salary,
+        )
+        log_info(f"Simulated {result['paths']} income paths of {horizon_months} months ({result['method']})")
+        return json.dumps(result)
@@ -0,0 +1,244 @@
+import json
+from typing import Dict, List, Optional
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+# Share of household expenses that is the insured's own consumption and stops at death
+PERSONAL_EXPENSE_SHARE = 0.25
+EMERGENCY_MONTHS = 6
+# Life cover is recommended in these steps, the way term plans are sold
+COVER_ROUNDING = 500_000
+# Rule-of-thumb range for term cover, in multiples of annual income
+INCOME_MULTIPLES = (10, 15)
+
+# Health sum insured for a couple by city tier (1 = metros, 2 = other large cities, 3 = smaller towns)
+HEALTH_BASE_COVER = {1: 1_000_000, 2: 750_000, 3: 500_000}
+# Floater cover relative to a couple's: a single adult needs less, each child adds a quarter
+SINGLE_ADULT_FACTOR = 0.75
+PER_CHILD_FACTOR = 0.25
+# Families whose eldest insured member is at least this old need proportionally more cover
+OLDER_FAMILY_AGE = 45
+OLDER_FAMILY_FACTOR = 1.25
+# Dependent parents are covered under a separate policy of this multiple of the base cover, per parent
+PARENT_COVER_FACTOR = 0.75
+
+
+def _batch(*values) -> List[np.ndarray]:
+    return np.broadcast_arrays(*(np.atleast_1d(np.asarray(value, dtype=float)) for value in values))
+
+
+def growing_annuity(payment, growth, rate, years, due: bool = False) -> np.ndarray:
+    """Present value of ``years`` yearly payments starting at ``payment`` and growing at ``growth``.
+
+    Payments are at the end of each year, or at the start when ``due``.
+    """
+    payment, growth, rate, years = _batch(payment, growth, rate, years)
+    ratio = (1 + growth) / (1 + rate)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(np.isclose(ratio, 1), years, (1 - ratio ** np.maximum(years, 0)) / (1 - ratio))
+    value = payment / (1 + rate) * np.where(years > 0, factor, 0.0)
+    return value * (1 + rate) if due else value
+
+
+def life_cover_needs(
+    age,
+    annual_income,
+    annual_expenses,
+    retirement_age=60,
+    support_years=None,
+    liabilities=0.0,
+    goals_today=None,
+    goal_years=None,
+    existing_assets=0.0,
+    existing_cover=0.0,
+    spouse_income=0.0,
+    income_growth=0.06,
+    inflation=0.06,
+    discount_rate=0.07,
+    goal_inflation=0.08,
+    personal_share=PERSONAL_EXPENSE_SHARE,
+) -> Dict[str, np.ndarray]:
+    """Human-life-value and needs-based life cover for a batch of clients.
+
+    Human life value is the present value of the income the family would lose (income minus
+    the insured's own consumption, growing until retirement). The needs-based cover adds the
+    present value of the family's remaining expenses not met by a surviving spouse's
+    ``spouse_income`` for ``support_years`` (default: until the insured's retirement age),
+    outstanding liabilities, goals priced in today's money (``goals_today``/``goal_years`` as
+    (clients, goals) arrays, zero-padded), and an emergency reserve, less investments the family
+    could use. Without income or working years left there is no income to replace, so only
+    liabilities and goals need cover. Gaps are measured against existing cover.
+    """
+    age, income, expenses, retirement_age, liabilities, assets, cover, spouse_income = _batch(
+        age, annual_income, annual_expenses, retirement_age, liabilities, existing_assets, existing_cover, spouse_income
+    )
+    working_years = np.maximum(retirement_age - age, 0)
+    support = working_years if support_years is None else _batch(support_years, age)[0]
+    personal = expenses * personal_share
+    earning = (income > 0) & (working_years > 0)
+
+    human_life_value = growing_annuity(np.maximum(income - personal, 0.0), income_growth, discount_rate, working_years)
+    shortfall = np.where(earning, np.maximum(expenses - personal - spouse_income, 0.0), 0.0)
+    income_replacement = growing_annuity(shortfall, inflation, discount_rate, support, due=True)
+    goals = np.zeros_like(age)
+    if goals_today is not None:
+        amounts = np.atleast_2d(np.asarray(goals_today, dtype=float))
+        years = np.broadcast_to(np.atleast_2d(np.asarray(goal_years, dtype=float)), amounts.shape)
+        goals = goals + (amounts * ((1 + goal_inflation) / (1 + discount_rate)) ** years).sum(axis=1)
+    emergency = np.where(earning, expenses * EMERGENCY_MONTHS / 12, 0.0)
+    needs = np.maximum(income_replacement + liabilities + goals + emergency - assets, 0.0)
+    recommended = np.ceil(needs / COVER_ROUNDING) * COVER_ROUNDING
+    return {
+        "human_life_value": human_life_value,
+        "income_replacement": income_replacement,
+        "liabilities": liabilities,
+        "goals": goals,
+        "emergency_reserve": emergency,
+        "existing_assets": assets,
+        "needs_based_cover": needs,
+        "recommended_cover": recommended,
+        "existing_cover": cover,
+        "cover_gap": np.maximum(recommended - cover, 0.0),
+        "hlv_gap": np.maximum(human_life_value - cover, 0.0),
+        "income_multiple": np.where(income > 0, needs / np.maximum(income, 1e-9), np.nan),
+    }
+
+
+def health_cover_needs(
+    city_tier=1,
+    adults=2,
+    children=0,
+    eldest_age=35,
+    parents=0,
+    existing_cover=0.0,
+    employer_cover=0.0,
+    parents_cover=0.0,
+) -> Dict[str, np.ndarray]:
+    """Recommended family floater and parents' health cover for a batch of households, with gaps.
+
+    Employer group cover counts towards adequacy but is reported separately, since it ends with
+    the job; the gap without it is what a job change would expose.
+    """
+    tier, adults, children, eldest, parents, personal, employer, parents_existing = _batch(
+        city_tier, adults, children, eldest_age, parents, existing_cover, employer_cover, parents_cover
+    )
+    if np.any(~np.isin(tier, list(HEALTH_BASE_COVER))):
+        raise ValueError(f"City tier must be one of {sorted(HEALTH_BASE_COVER)}")
+    base = np.vectorize(HEALTH_BASE_COVER.get, otypes=[float])(tier)
+    members = np.where(adults >= 2, 1.0, SINGLE_ADULT_FACTOR) + PER_CHILD_FACTOR * children
+    recommended = base * members * np.where(eldest >= OLDER_FAMILY_AGE, OLDER_FAMILY_FACTOR, 1.0)
+    recommended = np.ceil(recommended / 100_000) * 100_000
+    parents_needed = np.ceil(base * PARENT_COVER_FACTOR * parents / 100_000) * 100_000
+    return {
+        "base_cover": base,
+        "recommended_floater": recommended,
+        "existing_cover": personal,
+        "employer_cover": employer,
+        "floater_gap": np.maximum(recommended - personal - employer, 0.0),
+        "gap_without_employer_cover": np.maximum(recommended - personal, 0.0),
+        "recommended_parents_cover": parents_needed,
+        "parents_gap": np.maximum(parents_needed - parents_existing, 0.0),
+    }
+
+
+class InsuranceTools(Toolkit):
+    def __init__(self, **kwargs):
+        super().__init__(name="insurance_needs", **kwargs)
+        self.register(self.analyze_insurance_needs)
+
+    def analyze_insurance_needs(
+        self,
+        age: float,
+        annual_income: float,
+        annual_household_expenses: float,
+        retirement_age: float = 60,
+        support_years: float = -1,
+        outstanding_loans: float = 0,
+        goal_amounts_today: Optional[List[float]] = None,
+        goal_years: Optional[List[float]] = None,
+        existing_investments: float = 0,
+        existing_life_cover: float = 0,
+        spouse_annual_income: float = 0,
+        city_tier: int = 1,
+        adults: int = 2,
+        children: int = 0,
+        eldest_member_age: float = -1,
+        dependent_parents: int = 0,
+        existing_health_cover: float = 0,
+        employer_health_cover: float = 0,
+        parents_health_cover: float = 0,
+        inflation_percent: float = 6,
+        return_percent: float = 7,
+    ) -> str:
+        """Compute exact life and health insurance needs and coverage gaps in one call: human life value, needs-based
+        term cover (income replacement, loans, goals, existing investments) and health cover adequacy by city tier
+        and family size. Use this instead of estimating cover from rules of thumb.
+
+        Args:
+            age (float): Age of the earning member to be insured.
+            annual_income (float): Their annual income after tax.
+            annual_household_expenses (float): Annual expenses of the whole household.
+            retirement_age (float): Age at which their income would stop.
+            support_years (float): Years the family needs support; -1 for until the retirement age.
+            outstanding_loans (float): Loans to be paid off on death (home loan, car loan, etc.).
+            goal_amounts_today (List[float]): Goals to fund in today's money (child education, marriage).
+            goal_years (List[float]): Years until each goal.
+            existing_investments (float): Savings and investments the family could draw on (not the home they live in).
+            existing_life_cover (float): Current term/life insurance sum assured.
+            spouse_annual_income (float): A spouse's annual income after tax that would continue to cover expenses.
+            city_tier (int): 1 for metros, 2 for other large cities, 3 for smaller towns.
+            adults (int): Adults on the family floater (1 or 2).
+            children (int): Children on the family floater.
+            eldest_member_age (float): Age of the eldest person on the floater; -1 to use the insured's age.
+            dependent_parents (int): Parents who need their own health policy (0-4).
+            existing_health_cover (float): Personal health insurance sum insured (base plus super top-up).
+            employer_health_cover (float): Employer group health cover.
+            parents_health_cover (float): Existing health cover for the parents.
+            inflation_percent (float): Annual household inflation, in percent.
+            return_percent (float): Post-tax return the family can earn on the payout, in percent.
+
+        Returns:
+            str: JSON string with human life value, the needs-based breakdown, recommended life cover and gap,
+            and the recommended family floater and parents' cover with gaps (also without employer cover).
+        """
+        goals = goal_amounts_today or []
+        if len(goals) != len(goal_years or []):
+            return json.dumps({"error": "goal_amounts_today and goal_years must have the same length"})
+        life = life_cover_needs(
+            age,
+            annual_income,
+            annual_household_expenses,
+            retirement_age=retirement_age,
+            support_years=None if support_years < 0 else support_years,
+            liabilities=outstanding_loans,
+            goals_today=[goals] if goals else None,
+            goal_years=[goal_years] if goals else None,
+            existing_assets=existing_investments,
+            existing_cover=existing_life_cover,
+            spouse_income=spouse_annual_income,
+            income_growth=inflation_percent / 100,
+            inflation=inflation_percent / 100,
+            discount_rate=return_percent / 100,
+        )
+        try:
+            health = health_cover_needs(
+                city_tier,
+                adults,
+                children,
+                age if eldest_member_age < 0 else eldest_member_age,
+                dependent_parents,
+                existing_health_cover,
+                employer_health_cover,
+                parents_health_cover,
+            )
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+        life_result = {key: None if np.isnan(value[0]) else round(float(value[0]), 2) for key, value in life.items()}
+        life_result["rule_of_thumb_range"] = [annual_income * multiple for multiple in INCOME_MULTIPLES]
+        result = {"life": life_result, "health": {key: round(float(value[0]), 2) for key, value in health.items()}}
+        log_info(
+            f"Insurance needs: life gap {life_result['cover_gap']:.0f}, health floater gap {result['health']['floater_gap']:.0f}"
+        )
+        return json.dumps(result)
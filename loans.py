@@ -0,0 +1,326 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+
+def _check_tenure(months: np.ndarray) -> None:
+    if np.any(months < 1):
+        raise ValueError("Loan tenure must be at least one month")
+
+
+def emi(principal, annual_rate, months) -> np.ndarray:
+    """Equated monthly instalment for any broadcastable arrays of loans; tenures must be at least a month."""
+    principal = np.asarray(principal, dtype=float)
+    r = np.asarray(annual_rate, dtype=float) / 12
+    n = np.asarray(months, dtype=float)
+    _check_tenure(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(r > 0, r / (1 - (1 + r) ** -n), 1 / n)
+    return principal * factor
+
+
+def max_loan(monthly_payment, annual_rate, months) -> np.ndarray:
+    """Largest principal a given EMI can service (inverse of ``emi``)."""
+    payment = np.asarray(monthly_payment, dtype=float)
+    r = np.asarray(annual_rate, dtype=float) / 12
+    n = np.asarray(months, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(r > 0, (1 - (1 + r) ** -n) / r, n)
+    return np.maximum(payment, 0) * factor
+
+
+@dataclass
+class AmortizationResult:
+    """Month-by-month schedules for a batch of loan scenarios, shape (scenarios, months)."""
+
+    emi: np.ndarray
+    payment: np.ndarray
+    interest: np.ndarray
+    principal: np.ndarray
+    prepayment: np.ndarray
+    balance: np.ndarray
+    baseline_interest: np.ndarray
+
+    @property
+    def total_interest(self) -> np.ndarray:
+        return self.interest.sum(axis=1)
+
+    @property
+    def interest_saved(self) -> np.ndarray:
+        return self.baseline_interest - self.total_interest
+
+    @property
+    def payoff_month(self) -> np.ndarray:
+        """1-based month in which each loan is fully repaid (0 if it is not within the horizon)."""
+        paid = self.balance <= 0.005
+        return np.where(paid.any(axis=1), paid.argmax(axis=1) + 1, 0)
+
+    def yearly(self, scenario: int = 0) -> List[Dict]:
+        months = int(self.payoff_month[scenario]) or self.balance.shape[1]
+        years = -(-months // 12)
+        rows = []
+        for year in range(years):
+            window = slice(year * 12, min((year + 1) * 12, months))
+            rows.append(
+                {
+                    "year": year + 1,
+                    "interest": round(float(self.interest[scenario, window].sum()), 2),
+                    "principal": round(float(self.principal[scenario, window].sum()), 2),
+                    "prepayment": round(float(self.prepayment[scenario, window].sum()), 2),
+                    "closing_balance": round(float(self.balance[scenario, window.stop - 1]), 2),
+                }
+            )
+        return rows
+
+    def summary(self, scenario: int = 0) -> Dict:
+        return {
+            "initial_emi": round(float(self.emi[scenario]), 2),
+            "payoff_month": int(self.payoff_month[scenario]),
+            "total_interest": round(float(self.total_interest[scenario]), 2),
+            "total_prepayments": round(float(self.prepayment[scenario].sum()), 2),
+            "interest_saved_vs_no_prepayment": round(float(self.interest_saved[scenario]), 2) + 0.0,
+        }
+
+
+def amortize(
+    principal,
+    annual_rate,
+    months,
+    extra_monthly=0.0,
+    lump_sum=0.0,
+    lump_sum_month=0,
+    prepayments: Optional[np.ndarray] = None,
+    reduce_emi: bool = False,
+) -> AmortizationResult:
+    """Amortize a batch of loans with optional prepayments in a single vectorized pass.
+
+    All scalar arguments broadcast to one value per scenario. ``lump_sum`` is paid at the end of
+    ``lump_sum_month`` (1-based; 0 disables it), ``extra_monthly`` every month, and
+    ``prepayments`` may give an explicit (scenarios, months) matrix on top of both. By default
+    prepayments shorten the tenure at a fixed EMI; with ``reduce_emi`` the EMI is recomputed
+    over the remaining tenure instead. Raises ``ValueError`` for tenures under one month.
+    """
+    principal, annual_rate, months, extra_monthly, lump_sum, lump_sum_month = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (principal, annual_rate, months, extra_monthly, lump_sum, lump_sum_month))
+    )
+    _check_tenure(months)
+    scenarios, horizon = principal.size, int(months.max())
+    r = annual_rate / 12
+    payment_due = emi(principal, annual_rate, months)
+    baseline_interest = payment_due * months - principal
+
+    scheduled = np.zeros((scenarios, horizon))
+    scheduled += extra_monthly[:, None]
+    has_lump = (lump_sum_month >= 1) & (lump_sum_month <= horizon)
+    scheduled[np.nonzero(has_lump)[0], lump_sum_month[has_lump].astype(int) - 1] += lump_sum[has_lump]
+    if prepayments is not None:
+        scheduled[:, : prepayments.shape[1]] += prepayments[:, :horizon]
+
+    shape = (scenarios, horizon)
+    interest, principal_paid, prepaid, balances, payments = (np.zeros(shape) for _ in range(5))
+    balance = principal.copy()
+    current_emi = payment_due.copy()
+    for t in range(horizon):
+        interest[:, t] = balance * r
+        principal_paid[:, t] = np.clip(current_emi - interest[:, t], 0, balance)
+        # Close out the final instalment exactly, even with rounding drift
+        principal_paid[:, t] = np.where(t + 1 >= months, balance, principal_paid[:, t])
+        balance = balance - principal_paid[:, t]
+        prepaid[:, t] = np.minimum(scheduled[:, t], balance)
+        balance = balance - prepaid[:, t]
+        payments[:, t] = principal_paid[:, t] + interest[:, t]
+        balances[:, t] = balance
+        if reduce_emi:
+            remaining = np.maximum(months - t - 1, 1)
+            current_emi = np.where(prepaid[:, t] > 0, emi(balance, annual_rate, remaining), current_emi)
+
+    return AmortizationResult(
+        emi=payment_due,
+        payment=payments,
+        interest=interest,
+        principal=principal_paid,
+        prepayment=prepaid,
+        balance=balances,
+        baseline_interest=baseline_interest,
+    )
+
+
+def affordability(
+    monthly_income,
+    annual_rate,
+    months,
+    emi_to_income_cap=0.4,
+    existing_emis=0.0,
+    down_payment_ratio=0.2,
+    available_down_payment=None,
+) -> Dict[str, np.ndarray]:
+    """Maximum loan and property price for a given income and EMI cap (vectorized).
+
+    The price is limited both by the loan the EMI headroom can service and, when
+    ``available_down_payment`` is given, by the cash on hand for the down payment.
+    """
+    headroom = np.maximum(np.asarray(monthly_income, dtype=float) * emi_to_income_cap - existing_emis, 0)
+    loan = max_loan(headroom, annual_rate, months)
+    down_payment_ratio = np.asarray(down_payment_ratio, dtype=float)
+    price = loan / (1 - down_payment_ratio)
+    if available_down_payment is not None:
+        cash = np.asarray(available_down_payment, dtype=float)
+        price = np.minimum(price, loan + cash)
+        price = np.minimum(price, np.where(down_payment_ratio > 0, cash / down_payment_ratio, np.inf))
+    loan_used = np.minimum(loan, price * (1 - down_payment_ratio))
+    return {
+        "max_emi": headroom,
+        "max_loan": loan,
+        "max_price": price,
+        "loan_needed": loan_used,
+        "down_payment_needed": price - loan_used,
+        "emi_at_max_price": emi(loan_used, annual_rate, months),
+    }
+
+
+def _rounded(values: Dict[str, np.ndarray]) -> Dict[str, float]:
+    return {key: round(float(value), 2) for key, value in values.items()}
+
+
+class LoanTools(Toolkit):
+    def __init__(
+        self, schedule: bool = True, compare_prepayments: bool = True, affordability: bool = True, **kwargs
+    ):
+        super().__init__(name="loan_calculator", **kwargs)
+
+        if schedule:
+            self.register(self.loan_schedule)
+        if compare_prepayments:
+            self.register(self.compare_prepayment_scenarios)
+        if affordability:
+            self.register(self.home_affordability)
+
+    def loan_schedule(
+        self,
+        principal: float,
+        annual_rate_percent: float,
+        tenure_years: float,
+        extra_monthly: float = 0,
+        lump_sum: float = 0,
+        lump_sum_month: int = 0,
+        reduce_emi: bool = False,
+    ) -> str:
+        """Compute the EMI, year-by-year amortization schedule and total interest for a loan, optionally
+        with a recurring extra payment and/or a one-time lump-sum prepayment.
+
+        Args:
+            principal (float): Loan amount.
+            annual_rate_percent (float): Annual interest rate in percent, e.g. 8.75.
+            tenure_years (float): Loan tenure in years.
+            extra_monthly (float): Extra principal paid every month on top of the EMI.
+            lump_sum (float): One-time prepayment amount.
+            lump_sum_month (int): Month number (1 = first month) in which the lump sum is paid; 0 for none.
+            reduce_emi (bool): If true, prepayments lower the EMI instead of shortening the tenure.
+
+        Returns:
+            str: JSON string with the summary, interest saved versus no prepayment, and yearly schedule.
+        """
+        try:
+            result = amortize(
+                principal,
+                annual_rate_percent / 100,
+                round(tenure_years * 12),
+                extra_monthly=extra_monthly,
+                lump_sum=lump_sum,
+                lump_sum_month=lump_sum_month,
+                reduce_emi=reduce_emi,
+            )
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+        log_info(f"Amortized loan of {principal} at {annual_rate_percent}% over {tenure_years} years")
+        return json.dumps({**result.summary(0), "yearly_schedule": result.yearly(0)})
+
+    def compare_prepayment_scenarios(
+        self,
+        principal: float,
+        annual_rate_percent: float,
+        tenure_years: float,
+        extra_monthly_options: List[float],
+        lump_sum_options: Optional[List[float]] = None,
+        lump_sum_month: int = 12,
+    ) -> str:
+        """Compare many prepayment strategies for one loan in a single call: every combination of the
+        extra monthly payment options and lump-sum options is simulated at once.
+
+        Args:
+            principal (float): Loan amount.
+            annual_rate_percent (float): Annual interest rate in percent.
+            tenure_years (float): Loan tenure in years.
+            extra_monthly_options (List[float]): Extra monthly payments to try, e.g. [0, 5000, 10000].
+            lump_sum_options (List[float]): Lump-sum prepayments to try, e.g. [0, 200000].
+            lump_sum_month (int): Month number in which lump sums are paid.
+
+        Returns:
+            str: JSON string with payoff month, total interest and interest saved for every combination.
+        """
+        extras, lumps = np.meshgrid(
+            np.asarray(extra_monthly_options or [0], dtype=float),
+            np.asarray(lump_sum_options or [0], dtype=float),
+            indexing="ij",
+        )
+        extras, lumps = extras.ravel(), lumps.ravel()
+        try:
+            result = amortize(
+                principal,
+                annual_rate_percent / 100,
+                round(tenure_years * 12),
+                extra_monthly=extras,
+                lump_sum=lumps,
+                lump_sum_month=lump_sum_month,
+            )
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+        scenarios = [
+            {"extra_monthly": float(extra), "lump_sum": float(lump), **result.summary(i)}
+            for i, (extra, lump) in enumerate(zip(extras, lumps))
+        ]
+        log_info(f"Compared {len(scenarios)} prepayment scenarios for loan of {principal}")
+        return json.dumps({"scenarios": scenarios})
+
+    def home_affordability(
+        self,
+        monthly_income: float,
+        annual_rate_percent: float,
+        tenure_years: float,
+        emi_to_income_cap_percent: float = 40,
+        existing_emis: float = 0,
+        down_payment_percent: float = 20,
+        available_down_payment: float = -1,
+    ) -> str:
+        """Find the maximum home price affordable for a given income, EMI cap and down payment.
+
+        Args:
+            monthly_income (float): Monthly take-home income.
+            annual_rate_percent (float): Home loan interest rate in percent.
+            tenure_years (float): Loan tenure in years.
+            emi_to_income_cap_percent (float): Maximum share of income for all EMIs, in percent.
+            existing_emis (float): EMIs already being paid on other loans.
+            down_payment_percent (float): Minimum down payment as a percent of the price.
+            available_down_payment (float): Cash available for the down payment; -1 if not a constraint.
+
+        Returns:
+            str: JSON string with maximum EMI, loan, price, down payment needed and EMI at that price.
+        """
+        try:
+            result = affordability(
+                monthly_income,
+                annual_rate_percent / 100,
+                round(tenure_years * 12),
+                emi_to_income_cap=emi_to_income_cap_percent / 100,
+                existing_emis=existing_emis,
+                down_payment_ratio=down_payment_percent / 100,
+                available_down_payment=None if available_down_payment < 0 else available_down_payment,
+            )
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+        log_info(f"Computed home affordability for monthly income {monthly_income}")
+        return json.dumps(_rounded(result))
@@ -1,20 +1,278 @@
 # main.py
-from fastapi import FastAPI
-from planning import agent as planning_agent
+from dataclasses import asdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import Body, FastAPI, File, HTTPException, Query, UploadFile
+from loans import affordability, amortize
+from planning import agent as planning_agent, reasoning_tools as planning_reasoning
+from anomalies import monthly_outliers
 from budget import agent as budget_agent
+from capital_gains import CapitalGainsEngine, TradeCsvReader, chronological, gains_summary
+from forecast import forecast_categories
+from profile_parser import parse_profile, with_profile
+from replanning import Replanner
+from returns import returns_table
+from session_memory import record_reply, session_prompt
+from categorizer import CATEGORIES, default_categorizer
+from statements import CHUNK_SIZE, StatementReader, statement_prompt
+from stress_test import StressProfile, build_shocks, run_stress_test
+from timeline import get_timeline_store, with_timeline
+from whatif import WhatIfBase, narrate, sensitivity_grid
 
 app = FastAPI()
+replanner = Replanner(planning_agent)
 
 @app.post("/generate-financial-plan/")
-async def generate_financial_plan(user_input: str):
-    response = planning_agent.print_response(user_input, stream=True)
-    return {"response": response}
+async def generate_financial_plan(user_input: str, user_id: Optional[str] = None, session_id: Optional[str] = None):
+    prompt = with_timeline(user_id, user_input, with_profile(user_input))
+    response = planning_agent.print_response(session_prompt(session_id, user_input, prompt), stream=True)
+    record_reply(session_id, planning_agent.run_response.content if planning_agent.run_response else None)
+    return {"response": response, "reasoning": planning_reasoning.get_run_stats(planning_agent.run_id)}
 
 @app.post("/analyze-budget/")
-async def analyze_budget(user_input: str):
-    response = budget_agent.print_response(user_input, stream=True)
+async def analyze_budget(user_input: str, user_id: Optional[str] = None, session_id: Optional[str] = None):
+    prompt = with_timeline(user_id, user_input, with_profile(user_input))
+    response = budget_agent.print_response(session_prompt(session_id, user_input, prompt), stream=True)
+    record_reply(session_id, budget_agent.run_response.content if budget_agent.run_response else None)
     return {"response": response}
 
+@app.post("/upload-statement/")
+async def upload_statement(
+    file: UploadFile = File(...),
+    user_input: str = "",
+    currency: Optional[str] = None,
+    dayfirst: bool = True,
+    analyze: bool = True,
+    llm_fallback: bool = False,
+    user_id: Optional[str] = None,
+    session_id: Optional[str] = None,
+):
+    # The file is read and aggregated chunk by chunk; only the monthly summary reaches the agent
+    reader = StatementReader(file.filename or "", currency, dayfirst, user_id=user_id)
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            reader.feed(chunk)
+        totals = reader.close(fallback=llm_fallback)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = {
+        "statement": totals.to_dict(),
+        "recurring": [charge.to_dict() for charge in reader.recurring.recurring()],
+        "anomalies": [anomaly.to_dict() for anomaly in reader.anomalies.anomalies(reader.anomaly_user)],
+        "monthly_outliers": monthly_outliers(totals.category_totals()),
+        "forecast": forecast_categories(totals.category_totals()),
+    }
+    if analyze:
+        prompt = statement_prompt(reader, user_input)
+        turn = user_input or f"Uploaded bank statement {file.filename or ''}".strip()
+        result["response"] = budget_agent.print_response(session_prompt(session_id, turn, prompt), stream=True)
+        record_reply(session_id, budget_agent.run_response.content if budget_agent.run_response else None)
+    return result
+
+@app.post("/capital-gains/")
+async def capital_gains(
+    file: UploadFile = File(...),
+    user_input: str = "",
+    dayfirst: bool = True,
+    asset_class: str = "equity",
+    fiscal_year: Optional[str] = None,
+    slab_rate_percent: Optional[float] = None,
+    analyze: bool = True,
+    session_id: Optional[str] = None,
+):
+    # Trades are parsed as each chunk arrives and matched oldest first; the agent only sees the gains table
+    reader, engine = TradeCsvReader(dayfirst, asset_class), CapitalGainsEngine()
+    trades = []
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            trades.extend(reader.feed(chunk))
+        trades.extend(reader.close())
+        for _ in engine.process(chronological(trades)):
+            pass
+        report = engine.report(fiscal_year, slab_rate_percent / 100 if slab_rate_percent is not None else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = {"capital_gains": report, "fiscal_years": engine.fiscal_years, "skipped_rows": reader.skipped}
+    if analyze:
+        request = user_input or "Explain my capital gains tax for this year and how I could reduce it."
+        prompt = "\n\n".join(block for block in (request, gains_summary(report)) if block)
+        response = planning_agent.print_response(session_prompt(session_id, request, prompt), stream=True)
+        record_reply(session_id, planning_agent.run_response.content if planning_agent.run_response else None)
+        result["response"] = response
+    return result
+
+@app.post("/category-overrides/{user_id}")
+async def set_category_override(user_id: str, merchant: str, category: str):
+    if category not in CATEGORIES:
+        raise HTTPException(status_code=400, detail=f"Unknown category {category!r}; choose from {list(CATEGORIES)}")
+    default_categorizer.set_override(user_id, merchant, category)
+    return {"user_id": user_id, "merchant": merchant, "category": category}
+
+@app.post("/loans/amortize/")
+async def amortize_loan(
+    principal: float,
+    annual_rate_percent: float,
+    tenure_years: float,
+    extra_monthly: List[float] = Query([0.0]),
+    lump_sum: List[float] = Query([0.0]),
+    lump_sum_month: int = 0,
+    reduce_emi: bool = False,
+    include_schedule: bool = False,
+):
+    # Every extra_monthly x lump_sum combination is evaluated in one vectorized call
+    extras = [extra for extra in extra_monthly for _ in lump_sum]
+    lumps = [lump for _ in extra_monthly for lump in lump_sum]
+    try:
+        result = amortize(
+            principal,
+            annual_rate_percent / 100,
+            round(tenure_years * 12),
+            extra_monthly=extras,
+            lump_sum=lumps,
+            lump_sum_month=lump_sum_month,
+            reduce_emi=reduce_emi,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    scenarios = []
+    for i, (extra, lump) in enumerate(zip(extras, lumps)):
+        scenario = {"extra_monthly": extra, "lump_sum": lump, **result.summary(i)}
+        if include_schedule:
+            scenario["yearly_schedule"] = result.yearly(i)
+        scenarios.append(scenario)
+    return {"scenarios": scenarios}
+
+@app.post("/loans/affordability/")
+async def loan_affordability(
+    monthly_income: float,
+    annual_rate_percent: float,
+    tenure_years: float,
+    emi_to_income_cap_percent: float = 40,
+    existing_emis: float = 0,
+    down_payment_percent: float = 20,
+    available_down_payment: Optional[float] = None,
+):
+    try:
+        result = affordability(
+            monthly_income,
+            annual_rate_percent / 100,
+            round(tenure_years * 12),
+            emi_to_income_cap=emi_to_income_cap_percent / 100,
+            existing_emis=existing_emis,
+            down_payment_ratio=down_payment_percent / 100,
+            available_down_payment=available_down_payment,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {key: round(float(value), 2) for key, value in result.items()}
+
+@app.post("/what-if/")
+async def what_if(
+    user_input: str = "",
+    retirement_age: List[int] = Query([]),
+    monthly_contribution: List[float] = Query([]),
+    expected_return_percent: List[float] = Query([]),
+    inflation_percent: List[float] = Query([]),
+    purchase_price: List[float] = Query([]),
+    current_age: Optional[int] = None,
+    current_savings: Optional[float] = None,
+    annual_spending: Optional[float] = None,
+    monthly_income: Optional[float] = None,
+    life_expectancy: Optional[int] = None,
+    narrative: bool = False,
+):
+    # The grid is computed locally; the model is only called for the optional narrative
+    try:
+        base = WhatIfBase.from_profile(
+            parse_profile(user_input),
+            current_age=current_age,
+            current_savings=current_savings,
+            annual_spending=annual_spending,
+            monthly_income=monthly_income,
+            life_expectancy=life_expectancy,
+        )
+        result = sensitivity_grid(
+            base,
+            {
+                "retirement_age": retirement_age,
+                "monthly_contribution": monthly_contribution,
+                "expected_return": [value / 100 for value in expected_return_percent],
+                "inflation": [value / 100 for value in inflation_percent],
+                "purchase_price": purchase_price,
+            },
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if narrative:
+        result["narrative"] = narrate(result, user_input)
+    return result
+
+@app.post("/stress-test/")
+async def stress_test(
+    user_input: str,
+    horizon_months: int = 24,
+    job_loss_months: List[int] = Query([3, 6, 12]),
+    rate_hike_percents: List[float] = Query([2, 5]),
+    drawdown_percents: List[float] = Query([20, 30, 50]),
+    medical_costs: Optional[List[float]] = Query(None),
+    home_loan_rate_percent: Optional[float] = None,
+    home_loan_years_left: Optional[int] = None,
+    floating_rate: bool = True,
+):
+    try:
+        base = StressProfile.from_profile(
+            parse_profile(user_input),
+            home_loan_rate=home_loan_rate_percent / 100 if home_loan_rate_percent is not None else None,
+            home_loan_months=home_loan_years_left * 12 if home_loan_years_left else None,
+            floating_rate=floating_rate,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        shocks = build_shocks(
+            base,
+            horizon_months,
+            job_loss_months,
+            medical_costs=medical_costs,
+            rate_hikes=[percent / 100 for percent in rate_hike_percents],
+            drawdowns=[percent / 100 for percent in drawdown_percents],
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return run_stress_test(base, shocks)
+
+@app.post("/returns/xirr/")
+async def batch_xirr(series: Dict[str, List[Tuple[date, float]]] = Body(...), inflation_percent: float = 6):
+    # Outflows are negative and the current value is a final inflow; all series are solved together
+    return {"returns": returns_table(series, inflation_percent / 100), "inflation_percent": inflation_percent}
+
+@app.post("/plans/")
+async def create_plan(user_input: str):
+    plan = replanner.create(user_input)
+    return {"plan_id": plan.plan_id, "values": plan.values, "plan": plan.markdown}
+
+@app.post("/plans/{plan_id}/update/")
+async def update_plan(plan_id: str, user_input: str = "", changes: Dict[str, float] = Body({})):
+    # Only sections whose inputs actually changed are sent back to the model
+    try:
+        return await replanner.update(plan_id, dict(changes), user_input)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/timeline/{user_id}")
+async def get_timeline(
+    user_id: str,
+    category: Optional[str] = None,
+    label: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    events = get_timeline_store().range(user_id, category=category, start=start, end=end, label=label)
+    return {"user_id": user_id, "events": [asdict(event) for event in events]}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
@@ -4,15 +4,23 @@ from textwrap import dedent
 from agno.agent import Agent
 from agno.models.anthropic import Claude
 from agno.tools.calculator import CalculatorTools
-from agno.tools.reasoning import ReasoningTools
+from goals import GoalTools
+from insurance import InsuranceTools
+from loans import LoanTools
+from profile_parser import with_profile
+from reasoning_budget import BudgetedReasoningTools, ReasoningBudget
+from retirement import RetirementTools
 
 today = datetime.now().strftime("%Y-%m-%d")
 
+# Bounds the think/analyze loop so complex plans cannot stall before writing an answer
+reasoning_tools = BudgetedReasoningTools(add_instructions=True, budget=ReasoningBudget.from_env())
+
 agent = Agent(
     model=Claude(id="claude-3-5-sonnet-20240620"),
     
     tools=[
-        ReasoningTools(add_instructions=True),
+        reasoning_tools,
         CalculatorTools(
             add=True,
             subtract=True,
@@ -22,7 +30,12 @@ agent = Agent(
             factorial=True,
             is_prime=True,
             square_root=True,
-        )],
+        ),
+        GoalTools(),
+        LoanTools(),
+        RetirementTools(),
+        InsuranceTools(),
+    ],
     description=dedent("""\
         You are the Financial Planning Agent, a specialized AI that focuses exclusively on 
         developing comprehensive, long-term financial plans aligned with life goals and changing 
@@ -60,6 +73,8 @@ agent = Agent(
            - Establish timeframes for short, medium, and long-term goals
            - Create financial milestones aligned with life stages
            - Balance competing priorities across different life domains
+           - Use `plan_goal_funding` to get the monthly saving each goal needs and how the available
+             surplus covers them by priority, instead of computing each goal with the calculator
            - Document values-based objectives that drive financial decisions
 
         2. Perform comprehensive financial situation analysis:
@@ -68,13 +83,16 @@ agent = Agent(
            - Project income growth trajectory based on career path
            - Map current financial assets to future goals
            - Identify potential financial vulnerabilities and risks
-           - Evaluate current insurance coverage against protection needs
+           - Evaluate current insurance coverage against protection needs (run `analyze_insurance_needs` for the
+             exact life cover and health cover gaps instead of estimating them)
 
         3. Develop retirement planning strategy:
            - Calculate projected retirement needs based on desired lifestyle
            - Determine optimal savings rates for retirement objectives
            - Recommend retirement account allocation strategies
            - Project retirement income from various sources
+           - Run `simulate_retirement` to get the probability the corpus lasts and percentile bands,
+             and report the gap/surplus from its median rather than a single fixed-return projection
            - Analyze Social Security optimization strategies
            - Create withdrawal strategy recommendations for retirement phase
            - Suggest phased retirement options if appropriate
@@ -274,7 +292,7 @@ agent = Agent(
 if __name__ == "__main__":
     # Generate a personalized financial plan
     agent.print_response(
-        """
+        with_profile("""
         I need help creating a comprehensive financial plan. Here's my current situation:
         
         Personal Information:
@@ -300,7 +318,7 @@ if __name__ == "__main__":
         5. Start creating a basic estate plan
         
         Can you help me develop a comprehensive financial plan that addresses these goals and provides a clear roadmap for the next 5-10 years?
-        """, 
+        """), 
         stream=True
     )
 
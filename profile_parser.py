@@ -0,0 +1,525 @@
+import re
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Multipliers for the unit words people use after a number
+UNITS = {
+    "k": 1_000,
+    "thousand": 1_000,
+    "l": 100_000,
+    "lac": 100_000,
+    "lacs": 100_000,
+    "lakh": 100_000,
+    "lakhs": 100_000,
+    "lpa": 100_000,
+    "cr": 10_000_000,
+    "crore": 10_000_000,
+    "crores": 10_000_000,
+    "mn": 1_000_000,
+    "million": 1_000_000,
+}
+INR_UNITS = {"l", "lac", "lacs", "lakh", "lakhs", "lpa", "cr", "crore", "crores"}
+
+CURRENCY_SYMBOLS = {"$": "USD", "usd": "USD", "₹": "INR", "rs": "INR", "rs.": "INR", "inr": "INR"}
+
+# Months in one period, used to convert to monthly equivalents
+PERIOD_MONTHS = {"week": 12 / 52, "fortnight": 12 / 26, "month": 1.0, "quarter": 3.0, "year": 12.0}
+
+_NUMBER = r"\d{1,3}(?:,\d{2,3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+_UNIT = r"lakhs?|lacs?|lpa|crores?|cr|k|l|thousand|million|mn"
+_CURRENCY = r"\$|₹|rs\.?|inr|usd"
+AMOUNT_RE = re.compile(
+    rf"(?P<cur>{_CURRENCY})?\s*(?P<num>{_NUMBER})(?:\s*(?P<unit>{_UNIT})\b)?"
+    rf"(?:\s*(?:-|–|to)\s*(?P<cur2>{_CURRENCY})?\s*(?P<num2>{_NUMBER})(?:\s*(?P<unit2>{_UNIT})\b)?)?",
+    re.IGNORECASE,
+)
+# Numbers that are clearly not money even when written next to a unit-like word
+NOT_MONEY_RE = re.compile(
+    r"^\s*(?:%|years?|yrs?|months?|weeks?|days?|sq|bhk|\(k\)|-year|kids?|children)", re.IGNORECASE
+)
+
+PERIOD_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ("week", re.compile(r"/\s*w(?:ee)?k\b|per\s+week|a\s+week|\bweekly\b|every\s+week", re.I)),
+    ("fortnight", re.compile(r"bi-?weekly|fortnightly|every\s+two\s+weeks", re.I)),
+    ("quarter", re.compile(r"/\s*q(?:tr|uarter)?\b|per\s+quarter|quarterly", re.I)),
+    (
+        "month",
+        re.compile(r"/\s*mo(?:nth)?\b|per\s+month|a\s+month|\bmonthly\b|\bp\.?m\.?(?=\W|$)|(?:every|each)\s+month", re.I),
+    ),
+    (
+        "year",
+        re.compile(
+            r"/\s*y(?:ea)?r\b|per\s+(?:year|annum)|a\s+year|\bannual(?:ly)?\b|\byearly\b|\bp\.a\.|"
+            r"\blpa\b|(?:every|each)\s+year",
+            re.I,
+        ),
+    ),
+]
+VARIABLE_RE = re.compile(r"\b(?:average|averaging|on average|it varies|varies|variable|irregular|ranging)\b", re.I)
+APPROXIMATE_RE = re.compile(r"\b(?:about|approx(?:imately|\.)?|around|roughly|nearly|almost)\b|~", re.I)
+TOTAL_RE = re.compile(
+    r"^\s*(?:(?:my|our|the)\s+)?(?:(?:total|combined|household|overall|monthly|annual|yearly)\s+)*(?:income|expenses?|spending)"
+    r"(?:\s+(?:is|are|was|were|come to|comes to|total|totals))?\s*$",
+    re.I,
+)
+RATE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*%\s*(?:apr|interest|p\.a\.|rate)?", re.I)
+AGE_RE = re.compile(r"\b(?:i'?m|i am|aged?)\s+(\d{2})\b|\b(\d{2})\s*(?:years?\s+old|-year-old|yo\b)", re.I)
+RETIRE_RE = re.compile(r"retire\w*\s+(?:at|by)\s+(?:the\s+)?(?:age\s+(?:of\s+)?)?(\d{2})\b", re.I)
+
+# First match wins, so more specific kinds come first
+KIND_PATTERNS: List[Tuple[str, re.Pattern]] = [
+    ("cover", re.compile(r"\b(?:coverage|cover|sum assured|floater|term (?:insurance|plan|policy))\b", re.I)),
+    ("debt", re.compile(r"\b(?:debt|loans?|owe|outstanding|balance|mortgage)\b", re.I)),
+    ("goal", re.compile(r"\b(?:goals?|target|purchase|buy|down payment|wedding|marriage|range)\b", re.I)),
+    ("income", re.compile(r"\b(?:income|salary|earn\w*|make|making|job|gig|freelanc\w*|pension|bonus|ctc|wages?)\b", re.I)),
+    (
+        "asset",
+        re.compile(
+            r"\b(?:fds?|fixed deposits?|epf|ppf|nps|401\(k\)s?|529|mutual funds?|emergency fund|retirement accounts?|"
+            r"stocks?|shares|portfolio|worth|deposits?|gold|savings)\b",
+            re.I,
+        ),
+    ),
+    ("saving", re.compile(r"\b(?:sav(?:e|ing)|sip|invest\w*)\b", re.I)),
+    (
+        "expense",
+        re.compile(
+            r"\b(?:expenses?|spend\w*|rent|payments?|pay|bills?|costs?|groceries|utilities|insurance|premiums?|emi|"
+            r"subscriptions?|food|dining|phone|gym|membership|shopping|entertainment|childcare|fees?|tuition|"
+            r"miscellaneous|transport\w*|fuel)\b",
+            re.I,
+        ),
+    ),
+]
+# Parenthetical asides, except the "(k)" in "401(k)"
+PAREN_RE = re.compile(r"\((?!k\))([^)]*)\)", re.I)
+# Where the words describing one amount stop
+CLAUSE_BREAK_RE = re.compile(r",|;|\bbut\b|\bwhich\b|\bso\b|\bbecause\b", re.I)
+# Flow kinds are converted to monthly equivalents; the rest are balances
+FLOW_KINDS = {"income", "expense", "saving"}
+
+
+@dataclass
+class ProfileItem:
+    """One amount extracted from the user's text."""
+
+    label: str
+    kind: str
+    amount: float
+    currency: str
+    period: Optional[str] = None
+    monthly: Optional[float] = None
+    low: Optional[float] = None
+    high: Optional[float] = None
+    qualifier: Optional[str] = None
+    rate: Optional[float] = None
+    is_total: bool = False
+    period_assumed: bool = False
+    source: str = ""
+
+
+@dataclass
+class FinancialProfile:
+    currency: str = "USD"
+    age: Optional[int] = None
+    retirement_age: Optional[int] = None
+    items: List[ProfileItem] = field(default_factory=list)
+
+    def of_kind(self, kind: str) -> List[ProfileItem]:
+        return [item for item in self.items if item.kind == kind]
+
+    def _monthly_total(self, kind: str) -> float:
+        items = self.of_kind(kind)
+        totals = [item for item in items if item.is_total]
+        if totals:
+            return totals[0].monthly or 0.0
+        return sum(item.monthly or 0.0 for item in items)
+
+    @property
+    def monthly_income(self) -> float:
+        return self._monthly_total("income")
+
+    @property
+    def monthly_expenses(self) -> float:
+        return self._monthly_total("expense")
+
+    @property
+    def monthly_savings(self) -> float:
+        return self._monthly_total("saving")
+
+    @property
+    def net_monthly_cash_flow(self) -> float:
+        return self.monthly_income - self.monthly_expenses
+
+    @property
+    def total_assets(self) -> float:
+        return sum(item.amount for item in self.of_kind("asset"))
+
+    @property
+    def total_debt(self) -> float:
+        return sum(item.amount for item in self.of_kind("debt"))
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.update(
+            monthly_income=self.monthly_income,
+            monthly_expenses=self.monthly_expenses,
+            monthly_savings=self.monthly_savings,
+            net_monthly_cash_flow=self.net_monthly_cash_flow,
+            total_assets=self.total_assets,
+            total_debt=self.total_debt,
+        )
+        return data
+
+    def summary(self) -> str:
+        """Compact, prompt-ready description of the profile."""
+        fmt = lambda value: format_amount(value, self.currency)  # noqa: E731
+        lines = [f"Parsed financial profile ({self.currency}, flows converted to monthly equivalents):"]
+        if self.age is not None or self.retirement_age is not None:
+            lines.append(f"- Age: {self.age or 'unknown'}; target retirement age: {self.retirement_age or 'unknown'}")
+
+        for kind, title in (("income", "Income"), ("expense", "Expenses"), ("saving", "Savings")):
+            items = self.of_kind(kind)
+            if not items:
+                continue
+            parts = []
+            for item in items:
+                text = f"{item.label} {fmt(item.monthly or 0)}/mo"
+                if item.period not in (None, "month"):
+                    text += f" (from {fmt(item.amount)}/{item.period})"
+                if item.low is not None and item.high is not None:
+                    text += f" (range {fmt(item.low)}-{fmt(item.high)}/{item.period})"
+                if item.qualifier:
+                    text += f" [{item.qualifier}]"
+                if item.is_total:
+                    text += " [stated total]"
+                parts.append(text)
+            lines.append(f"- {title}: " + "; ".join(parts))
+
+        for kind, title in (("asset", "Assets"), ("debt", "Debts"), ("cover", "Insurance cover"), ("goal", "Goals")):
+            items = self.of_kind(kind)
+            if not items:
+                continue
+            parts = []
+            for item in items:
+                text = f"{item.label} {fmt(item.amount)}"
+                if item.low is not None and item.high is not None:
+                    text += f" (range {fmt(item.low)}-{fmt(item.high)})"
+                if item.rate is not None:
+                    text += f" at {item.rate}%"
+                parts.append(text)
+            lines.append(f"- {title}: " + "; ".join(parts))
+
+        lines.append(
+            f"- Totals: income {fmt(self.monthly_income)}/mo, expenses {fmt(self.monthly_expenses)}/mo, "
+            f"net cash flow {fmt(self.net_monthly_cash_flow)}/mo, assets {fmt(self.total_assets)}, "
+            f"debt {fmt(self.total_debt)}"
+        )
+        if any(item.period_assumed for item in self.items):
+            lines.append("- Note: amounts without a stated period were assumed to be monthly")
+        return "\n".join(lines)
+
+
+def format_amount(value: float, currency: str = "USD") -> str:
+    """Format a money amount, using lakh/crore digit grouping for rupees."""
+    sign = "-" if value < 0 else ""
+    value = round(abs(value))
+    if currency == "INR":
+        digits = str(int(value))
+        if len(digits) > 3:
+            head, tail = digits[:-3], digits[-3:]
+            groups = []
+            while len(head) > 2:
+                groups.insert(0, head[-2:])
+                head = head[:-2]
+            if head:
+                groups.insert(0, head)
+            digits = ",".join(groups + [tail])
+        return f"{sign}₹{digits}"
+    return f"{sign}${value:,.0f}"
+
+
+def _to_number(num: str, unit: Optional[str]) -> float:
+    value = float(num.replace(",", ""))
+    if unit:
+        value *= UNITS[unit.lower()]
+    return value
+
+
+def _find_period(text: str) -> Optional[str]:
+    best: Optional[Tuple[int, str]] = None
+    for period, pattern in PERIOD_PATTERNS:
+        match = pattern.search(text)
+        if match and (best is None or match.start() < best[0]):
+            best = (match.start(), period)
+    return best[1] if best else None
+
+
+def _strip_periods(text: str) -> str:
+    for _, pattern in PERIOD_PATTERNS:
+        text = pattern.sub(" ", text)
+    return text
+
+
+def _infer_kind(text: str) -> Optional[str]:
+    for kind, pattern in KIND_PATTERNS:
+        if pattern.search(text):
+            return kind
+    return None
+
+
+def _nearest_kind(text: str) -> Optional[str]:
+    """Kind of the keyword closest to the end of ``text`` ("My biggest expenses are ...")."""
+    best: Optional[Tuple[int, str]] = None
+    for kind, pattern in KIND_PATTERNS:
+        for match in pattern.finditer(text):
+            if best is None or match.end() > best[0]:
+                best = (match.end(), kind)
+    return best[1] if best else None
+
+
+def _clean_label(text: str) -> str:
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"^(?:[-*•\d.)\s]+|and\s+|in\s+|on\s+|of\s+|for\s+|from\s+|with\s+)+", "", text, flags=re.I)
+    text = re.sub(r"\b(?:approximately|approx\.?|about|around|roughly|currently|current)\b", "", text, flags=re.I)
+    return re.sub(r"\s+", " ", text).strip(" :,.;-–()")
+
+
+# Words that say nothing about which fact a label describes, dropped by ``label_key``
+LABEL_STOP_WORDS = {
+    "i", "me", "my", "we", "our", "us", "you", "your", "he", "she", "his", "her", "their", "the", "a", "an",
+    "is", "are", "was", "were", "be", "been", "am", "has", "have", "had", "got", "get", "gets", "now", "currently",
+    "current", "actually", "also", "just", "still", "only", "about", "around", "roughly", "approximately",
+    "on", "in", "of", "for", "to", "at", "from", "with", "by", "and", "per", "each", "every", "this", "that",
+    "up", "down", "went", "go", "goes", "gone", "rose", "risen", "increased", "decreased", "dropped", "fell",
+    "new", "another", "month", "monthly", "year", "yearly", "annual", "annually", "week", "weekly",
+    # Generic words for the kind of amount rather than what it is
+    "income", "salary", "earn", "earns", "earning", "earnings", "make", "makes", "making", "wage", "wages",
+    "spend", "spends", "spending", "spent", "expense", "expenses", "pay", "pays", "paying", "payment", "payments",
+    "cost", "costs", "bill", "bills", "owe", "owes", "owed", "debt", "debts", "loan", "loans", "balance",
+    "outstanding", "amount", "worth", "invest", "investing", "put", "toward", "towards", "into",
+}
+LABEL_WORD_RE = re.compile(r"[a-z0-9]+(?:\([a-z]\))?")
+
+
+def label_key(label: str) -> str:
+    """What a label is about, for matching restatements: "My rent went up to" and "rent" are both "rent".
+
+    Stop words and generic words ("salary", "payment", "loan") are dropped, so the primary income
+    stated as "I earn" or "my salary is" keys to "" while "spouse earning" keys to "spouse".
+    """
+    return " ".join(word for word in LABEL_WORD_RE.findall(label.lower()) if word not in LABEL_STOP_WORDS)
+
+
+class _Amount:
+    __slots__ = ("start", "end", "value", "low", "high", "currency", "period")
+
+    def __init__(self, start, end, value, low, high, currency, period=None):
+        self.start, self.end = start, end
+        self.value, self.low, self.high = value, low, high
+        self.currency = currency
+        self.period = period
+
+
+def _find_amounts(text: str, bare_numbers: bool = False) -> List[_Amount]:
+    amounts = []
+    for match in AMOUNT_RE.finditer(text):
+        cur, unit, cur2, unit2 = match.group("cur"), match.group("unit"), match.group("cur2"), match.group("unit2")
+        if NOT_MONEY_RE.match(text[match.end() :]):
+            continue
+        # Bare numbers only count as money in "Label: 1650" form
+        leading = bare_numbers and not text[: match.start()].strip()
+        if not (cur or cur2 or unit or unit2 or leading):
+            continue
+        if unit and unit.lower() in ("k", "l") and text[match.start("unit") - 1 : match.start("unit")] == " ":
+            # "5 k" style is fine, but a lone "l"/"k" word after a space is usually something else
+            if cur is None:
+                continue
+        low = _to_number(match.group("num"), unit or unit2)
+        high = _to_number(match.group("num2"), unit2 or unit) if match.group("num2") else None
+        symbol = (cur or cur2 or "").lower().rstrip(".")
+        currency = CURRENCY_SYMBOLS.get(symbol) or CURRENCY_SYMBOLS.get(symbol + ".")
+        if currency is None and any(u and u.lower() in INR_UNITS for u in (unit, unit2)):
+            currency = "INR"
+        value = (low + high) / 2 if high is not None else low
+        period = "year" if any(u and u.lower() == "lpa" for u in (unit, unit2)) else None
+        amounts.append(_Amount(match.start(), match.end(), value, low, high, currency, period))
+    return amounts
+
+
+def _split_sentences(line: str) -> List[str]:
+    return [part for part in re.split(r"(?<=[.!?])\s+(?=[A-Z\"'])", line) if part.strip()]
+
+
+def _split_segments(text: str, amounts: List[_Amount]) -> List[Tuple[str, _Amount]]:
+    """Split a clause that lists several amounts ("$18,000 car loan, $5,000 credit card debt")."""
+    if len(amounts) == 1:
+        return [(text, amounts[0])]
+    segments = []
+    boundaries = [0]
+    for previous, current in zip(amounts, amounts[1:]):
+        between = text[previous.end : current.start]
+        split = max(between.rfind(","), between.rfind(";"), between.lower().rfind(" and "))
+        boundaries.append(previous.end + split + 1 if split >= 0 else current.start)
+    boundaries.append(len(text))
+    for amount, start, end in zip(amounts, boundaries, boundaries[1:]):
+        segments.append((text[start:end], amount))
+    return segments
+
+
+def parse_profile(text: str, default_currency: Optional[str] = None) -> FinancialProfile:
+    """Deterministically extract a typed financial profile from free text.
+
+    Understands $/₹/Rs amounts, k/lakh/crore units, ranges ("$3,000-$7,000"), period
+    markers (/month, annual, per year, weekly...), qualifiers such as "average, it varies",
+    and section headers like "Monthly Expenses:" that set the kind and period for the lines
+    beneath them. Flow amounts (income, expenses, savings) get monthly equivalents.
+    """
+    profile = FinancialProfile()
+    items: List[ProfileItem] = []
+    section_kind: Optional[str] = None
+    section_period: Optional[str] = None
+
+    age_match = AGE_RE.search(text)
+    if age_match:
+        profile.age = int(age_match.group(1) or age_match.group(2))
+    retire_match = RETIRE_RE.search(text)
+    if retire_match:
+        profile.retirement_age = int(retire_match.group(1))
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.endswith(":") and not _find_amounts(line):
+            section_kind = _infer_kind(line)
+            section_period = _find_period(line)
+            continue
+
+        for sentence in _split_sentences(line):
+            # Parentheticals usually restate the main amount; keep them only for balances and rates
+            asides = re.findall(PAREN_RE, sentence)
+            main = re.sub(PAREN_RE, " ", sentence)
+
+            label_prefix, value_text = "", main
+            colon = re.match(r"^\s*[-*•]?\s*([^:]{1,60}):\s*(.*)$", main)
+            if colon:
+                label_prefix, value_text = colon.group(1), colon.group(2)
+
+            amounts = _find_amounts(value_text, bare_numbers=bool(colon))
+            sentence_kind = _infer_kind(label_prefix) if label_prefix else None
+            sentence_period = _find_period(label_prefix) if label_prefix else None
+            previous_period: Optional[str] = None
+
+            for segment, amount in _split_segments(value_text, amounts):
+                offset = value_text.find(segment)
+                local_start, local_end = amount.start - offset, amount.end - offset
+                before, after = segment[:local_start], segment[local_end:]
+                breaks = list(CLAUSE_BREAK_RE.finditer(before))
+                if breaks:
+                    before = before[breaks[-1].end() :]
+                first_break = CLAUSE_BREAK_RE.search(after)
+                if first_break:
+                    after = after[: first_break.start()]
+                rest = _clean_label(_strip_periods(f"{before} {after}"))
+                if label_prefix and not (len(amounts) > 1 and rest):
+                    label = _clean_label(label_prefix)
+                else:
+                    label = rest or "amount"
+
+                kind = (
+                    _infer_kind(f"{before} {after}")
+                    or sentence_kind
+                    or _nearest_kind(value_text[: amount.start])
+                    or section_kind
+                    or "other"
+                )
+                explicit_period = amount.period or _find_period(after) or _find_period(before)
+                period = explicit_period or sentence_period or section_period
+                # "Student loan: $320" under "Monthly Expenses" is a payment, not a balance
+                if kind == "debt" and period is not None and section_kind == "expense":
+                    kind = "expense"
+                elif kind == "debt" and explicit_period is not None:
+                    kind = "expense"
+                # "Current savings: $65,000" is a balance; "saving $305 per month" is a flow
+                if kind == "saving" and period is None:
+                    kind = "asset"
+                elif kind == "asset" and explicit_period is not None:
+                    kind = "saving"
+
+                # "averaging $4,800/month but ranging from $3,000-$7,000" restates the same flow
+                previous = items[-1] if items else None
+                if (
+                    amount.high is not None
+                    and previous is not None
+                    and previous.source == sentence.strip()
+                    and previous.kind == kind
+                    and amount.low <= previous.amount <= amount.high
+                ):
+                    previous.low, previous.high = amount.low, amount.high
+                    previous.qualifier = "variable" if kind in FLOW_KINDS else previous.qualifier
+                    continue
+
+                item = ProfileItem(
+                    label=label,
+                    kind=kind,
+                    amount=amount.value,
+                    currency=amount.currency or "",
+                    low=amount.low if amount.high is not None else None,
+                    high=amount.high,
+                    source=sentence.strip(),
+                )
+                qualifier_text = " ".join([segment, label_prefix] + asides)
+                if VARIABLE_RE.search(qualifier_text) or amount.high is not None:
+                    item.qualifier = "variable" if kind in FLOW_KINDS else None
+                elif APPROXIMATE_RE.search(qualifier_text):
+                    item.qualifier = "approximate"
+                rate = RATE_RE.search(segment)
+                if rate:
+                    item.rate = float(rate.group(1))
+                if kind in FLOW_KINDS:
+                    if period is None:
+                        period, item.period_assumed = previous_period or "month", previous_period is None
+                    previous_period = period
+                    item.period = period
+                    item.monthly = amount.value / PERIOD_MONTHS[period]
+                    item.is_total = bool(TOTAL_RE.match(_clean_label(label_prefix) or label))
+                items.append(item)
+
+            # "Credit card payment: $200 (I have $4,300 balance at 18.99% APR)"
+            for aside in asides:
+                if not re.search(r"\b(?:balance|owe|outstanding)\b", aside, re.I):
+                    continue
+                for amount in _find_amounts(aside):
+                    rate = RATE_RE.search(aside)
+                    items.append(
+                        ProfileItem(
+                            label=_clean_label(label_prefix) or "balance",
+                            kind="debt",
+                            amount=amount.value,
+                            currency=amount.currency or "",
+                            rate=float(rate.group(1)) if rate else None,
+                            source=sentence.strip(),
+                        )
+                    )
+
+    currencies = Counter(item.currency for item in items if item.currency)
+    profile.currency = default_currency or (currencies.most_common(1)[0][0] if currencies else "USD")
+    for item in items:
+        item.currency = item.currency or profile.currency
+    profile.items = items
+    return profile
+
+
+def with_profile(user_input: str) -> str:
+    """Prefix the user's request with the deterministic profile so agents skip re-parsing it."""
+    profile = parse_profile(user_input)
+    if not profile.items:
+        return user_input
+    return (
+        f"{profile.summary()}\n"
+        "(Figures above were extracted and normalized deterministically from the request below. "
+        "Use them directly instead of re-deriving monthly equivalents.)\n\n"
+        f"{user_input}"
+    )
@@ -0,0 +1,198 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Union
+
+from agno.agent import Agent
+from agno.team.team import Team
+from agno.tools.reasoning import ReasoningTools
+from agno.utils.log import log_info, log_warning
+
+# Rough size of a token for Claude-family models; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    if not text:
+        return 0
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+@dataclass
+class ReasoningBudget:
+    """Per-run limits for the think/analyze tools. None disables a limit."""
+
+    max_steps: Optional[int] = 12
+    max_tokens: Optional[int] = 6000
+    max_seconds: Optional[float] = 90.0
+
+    @classmethod
+    def from_env(cls, prefix: str = "REASONING_") -> "ReasoningBudget":
+        def read(name, cast, default):
+            value = os.getenv(prefix + name)
+            if value is None:
+                return default
+            return None if value.lower() in ("", "none", "off") else cast(value)
+
+        defaults = cls()
+        return cls(
+            max_steps=read("MAX_STEPS", int, defaults.max_steps),
+            max_tokens=read("MAX_TOKENS", int, defaults.max_tokens),
+            max_seconds=read("MAX_SECONDS", float, defaults.max_seconds),
+        )
+
+
+@dataclass
+class ReasoningRunStats:
+    run_id: str
+    steps: int = 0
+    tokens: int = 0
+    rejected_steps: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    last_step_at: Optional[float] = None
+    step_latencies: List[float] = field(default_factory=list)
+    exhausted_reason: Optional[str] = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def as_dict(self) -> Dict:
+        data = asdict(self)
+        data.pop("started_at")
+        data.pop("last_step_at")
+        data["elapsed_seconds"] = round(self.elapsed, 3)
+        data["step_latencies"] = [round(latency, 3) for latency in self.step_latencies]
+        return data
+
+
+class BudgetedReasoningTools(ReasoningTools):
+    """ReasoningTools that stop accepting think/analyze steps once the run's budget is spent.
+
+    When the budget is exhausted the tools answer with an instruction to write the final
+    answer instead of recording the step, so the model cannot keep looping. Step counts,
+    token estimates and latencies are kept per run id and mirrored into
+    ``agent.session_state["reasoning_stats"]``.
+    """
+
+    EXHAUSTED_MESSAGE = (
+        "Reasoning budget exhausted ({reason}). Do not call `think` or `analyze` again. "
+        "Use the reasoning steps you already have and write the final answer to the user now."
+    )
+    LAST_STEP_NOTICE = (
+        "\n\nThis was your last reasoning step for this request. Write the final answer next."
+    )
+
+    def __init__(self, budget: Optional[ReasoningBudget] = None, max_tracked_runs: int = 256, **kwargs):
+        super().__init__(**kwargs)
+        self.budget = budget or ReasoningBudget.from_env()
+        self.max_tracked_runs = max_tracked_runs
+        self.run_stats: "OrderedDict[str, ReasoningRunStats]" = OrderedDict()
+
+        if self.instructions is not None:
+            self.instructions += self._budget_instructions()
+
+    def _budget_instructions(self) -> str:
+        limits = []
+        if self.budget.max_steps is not None:
+            limits.append(f"at most {self.budget.max_steps} `think`/`analyze` steps")
+        if self.budget.max_tokens is not None:
+            limits.append(f"about {self.budget.max_tokens} tokens of reasoning")
+        if self.budget.max_seconds is not None:
+            limits.append(f"{int(self.budget.max_seconds)} seconds of reasoning time")
+        if not limits:
+            return ""
+        return (
+            "<reasoning_budget>\n"
+            f"Each request has a reasoning budget of {', '.join(limits)}. Plan your steps so the "
+            "important calculations happen early. When a reasoning tool reports that the budget is "
+            "exhausted, stop reasoning and write the final answer immediately.\n"
+            "</reasoning_budget>\n"
+        )
+
+    def get_run_stats(self, run_id: Optional[str]) -> Optional[Dict]:
+        stats = self.run_stats.get(run_id) if run_id is not None else None
+        return stats.as_dict() if stats is not None else None
+
+    def _stats_for(self, agent: Union[Agent, Team]) -> ReasoningRunStats:
+        run_id = agent.run_id or "default"
+        stats = self.run_stats.get(run_id)
+        if stats is None:
+            stats = ReasoningRunStats(run_id=run_id)
+            self.run_stats[run_id] = stats
+            while len(self.run_stats) > self.max_tracked_runs:
+                self.run_stats.popitem(last=False)
+        return stats
+
+    def _exhausted_reason(self, stats: ReasoningRunStats) -> Optional[str]:
+        if self.budget.max_steps is not None and stats.steps >= self.budget.max_steps:
+            return f"{stats.steps}/{self.budget.max_steps} steps used"
+        if self.budget.max_tokens is not None and stats.tokens >= self.budget.max_tokens:
+            return f"{stats.tokens}/{self.budget.max_tokens} reasoning tokens used"
+        if self.budget.max_seconds is not None and stats.elapsed >= self.budget.max_seconds:
+            return f"{stats.elapsed:.0f}s/{self.budget.max_seconds:.0f}s reasoning time used"
+        return None
+
+    def _export(self, agent: Union[Agent, Team], stats: ReasoningRunStats) -> None:
+        if agent.session_state is None:
+            agent.session_state = {}
+        agent.session_state.setdefault("reasoning_stats", {})[stats.run_id] = stats.as_dict()
+
+    def _charge(self, agent: Union[Agent, Team], *texts: Optional[str]) -> Optional[str]:
+        """Record a reasoning step against the budget, or return the stop message if it is spent."""
+        stats = self._stats_for(agent)
+        reason = self._exhausted_reason(stats)
+        if reason is not None:
+            stats.rejected_steps += 1
+            if stats.exhausted_reason is None:
+                stats.exhausted_reason = reason
+                log_warning(f"Reasoning budget exhausted for run {stats.run_id}: {reason}")
+            self._export(agent, stats)
+            return self.EXHAUSTED_MESSAGE.format(reason=reason)
+
+        now = time.perf_counter()
+        stats.step_latencies.append(now - (stats.last_step_at or stats.started_at))
+        stats.last_step_at = now
+        stats.steps += 1
+        stats.tokens += sum(estimate_tokens(text) for text in texts)
+        log_info(
+            f"Reasoning step {stats.steps} for run {stats.run_id}: "
+            f"{stats.tokens} tokens, {stats.elapsed:.2f}s elapsed"
+        )
+        self._export(agent, stats)
+        return None
+
+    def _with_notice(self, agent: Union[Agent, Team], result: str) -> str:
+        if self._exhausted_reason(self._stats_for(agent)) is not None:
+            return result + self.LAST_STEP_NOTICE
+        return result
+
+    def think(
+        self, agent: Union[Agent, Team], title: str, thought: str, action: Optional[str] = None, confidence: float = 0.8
+    ) -> str:
+        stop = self._charge(agent, title, thought, action)
+        if stop is not None:
+            return stop
+        return self._with_notice(agent, super().think(agent, title, thought, action=action, confidence=confidence))
+
+    def analyze(
+        self,
+        agent: Union[Agent, Team],
+        title: str,
+        result: str,
+        analysis: str,
+        next_action: str = "continue",
+        confidence: float = 0.8,
+    ) -> str:
+        stop = self._charge(agent, title, result, analysis)
+        if stop is not None:
+            return stop
+        return self._with_notice(
+            agent,
+            super().analyze(agent, title, result, analysis, next_action=next_action, confidence=confidence),
+        )
+
+    # The docstrings are what the model sees as the tool descriptions
+    think.__doc__ = ReasoningTools.think.__doc__
+    analyze.__doc__ = ReasoningTools.analyze.__doc__
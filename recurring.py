@@ -0,0 +1,193 @@
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from categorizer import merchant_key
+from profile_parser import format_amount
+
+# name: (shortest gap in days, longest gap in days, charges per year, minimum charges to call it recurring)
+CADENCES: Dict[str, Tuple[int, int, float, int]] = {
+    "weekly": (6, 8, 52.0, 4),
+    "biweekly": (13, 16, 26.0, 3),
+    "monthly": (26, 34, 12.0, 3),
+    "quarterly": (85, 97, 4.0, 3),
+    "semiannual": (175, 190, 2.0, 2),
+    "annual": (350, 380, 1.0, 2),
+}
+# Charges within this share (or this absolute amount) of a series' running mean belong to it
+AMOUNT_TOLERANCE = 0.10
+AMOUNT_TOLERANCE_ABS = 1.0
+# Share of gaps that must fall in the winning cadence window
+MIN_REGULARITY = 0.6
+# A series is still active if its last charge is within this many cadence periods of the statement end
+ACTIVE_PERIODS = 1.5
+MAX_SERIES = 20_000
+
+
+def _cadence_of(gap: int) -> Optional[str]:
+    for name, (low, high, _, _) in CADENCES.items():
+        if low <= gap <= high:
+            return name
+    return None
+
+
+@dataclass
+class ChargeSeries:
+    """Running state for one merchant at one price level: counts and a gap histogram, no dates kept."""
+
+    merchant: str
+    category: Optional[str]
+    mean_amount: float
+    last_amount: float
+    first_date: date
+    last_date: date
+    previous: date
+    count: int = 1
+    gaps: int = 0
+    cadence_gaps: Dict[str, int] = field(default_factory=dict)
+
+    def matches(self, amount: float) -> bool:
+        return abs(amount - self.mean_amount) <= max(self.mean_amount * AMOUNT_TOLERANCE, AMOUNT_TOLERANCE_ABS)
+
+    def add(self, when: date, amount: float) -> None:
+        # Statements come newest- or oldest-first, so the gap to the previous row is taken unsigned
+        gap = abs((when - self.previous).days)
+        if gap:
+            self.gaps += 1
+            cadence = _cadence_of(gap)
+            if cadence:
+                self.cadence_gaps[cadence] = self.cadence_gaps.get(cadence, 0) + 1
+        self.count += 1
+        self.mean_amount += (amount - self.mean_amount) / self.count
+        self.previous = when
+        self.first_date = min(self.first_date, when)
+        if when >= self.last_date:
+            self.last_date, self.last_amount = when, amount
+
+    def cadence(self) -> Optional[Tuple[str, float]]:
+        """Best-supported cadence and the share of gaps that fit it, if the series is regular enough."""
+        if not self.cadence_gaps:
+            return None
+        name, hits = max(self.cadence_gaps.items(), key=lambda item: item[1])
+        regularity = hits / self.gaps
+        if hits + 1 < CADENCES[name][3] or regularity < MIN_REGULARITY:
+            return None
+        return name, regularity
+
+
+@dataclass
+class RecurringCharge:
+    merchant: str
+    category: Optional[str]
+    cadence: str
+    amount: float
+    occurrences: int
+    first_date: date
+    last_date: date
+    next_expected: date
+    annualized_cost: float
+    regularity: float
+    active: bool
+
+    def to_dict(self) -> Dict:
+        return {
+            "merchant": self.merchant,
+            "category": self.category,
+            "cadence": self.cadence,
+            "amount": round(self.amount, 2),
+            "occurrences": self.occurrences,
+            "first_date": self.first_date.isoformat(),
+            "last_date": self.last_date.isoformat(),
+            "next_expected": self.next_expected.isoformat(),
+            "annualized_cost": round(self.annualized_cost, 2),
+            "regularity": round(self.regularity, 2),
+            "active": self.active,
+        }
+
+
+class RecurringDetector:
+    """Streaming detector for subscriptions and other recurring charges.
+
+    Each outflow is routed to a series keyed by normalized merchant and price level (within
+    ``AMOUNT_TOLERANCE`` of the series' running mean). A series only keeps counters and a
+    histogram of the gaps between consecutive charges bucketed into the known cadence
+    windows, so every transaction is O(1) and memory is bounded by the number of distinct
+    merchant/price pairs, not by statement length.
+    """
+
+    def __init__(self, max_series: int = MAX_SERIES):
+        self.series: Dict[str, List[ChargeSeries]] = {}
+        self.max_series = max_series
+        self.size = 0
+        self.latest: Optional[date] = None
+
+    def add(self, when: date, description: str, amount: float, category: Optional[str] = None) -> None:
+        """Feed one signed transaction; credits are ignored."""
+        if amount >= 0:
+            return
+        amount = -amount
+        self.latest = max(self.latest or when, when)
+        key = merchant_key(description)
+        if not key:
+            return
+        candidates = self.series.setdefault(key, [])
+        for series in candidates:
+            if series.matches(amount):
+                series.add(when, amount)
+                return
+        if self.size < self.max_series:
+            candidates.append(ChargeSeries(key, category, amount, amount, when, when, when))
+            self.size += 1
+
+    def recurring(self, include_inactive: bool = False) -> List[RecurringCharge]:
+        """Detected recurring charges, most expensive (annualized) first."""
+        charges = []
+        for candidates in self.series.values():
+            for series in candidates:
+                found = series.cadence() if series.count > 1 else None
+                if found is None:
+                    continue
+                name, regularity = found
+                low, high, per_year, _ = CADENCES[name]
+                period = (low + high) / 2
+                active = self.latest is None or (self.latest - series.last_date).days <= period * ACTIVE_PERIODS
+                if not active and not include_inactive:
+                    continue
+                charges.append(
+                    RecurringCharge(
+                        merchant=series.merchant,
+                        category=series.category,
+                        cadence=name,
+                        amount=series.last_amount,
+                        occurrences=series.count,
+                        first_date=series.first_date,
+                        last_date=series.last_date,
+                        next_expected=series.last_date + timedelta(days=round(period)),
+                        annualized_cost=series.last_amount * per_year if active else 0.0,
+                        regularity=regularity,
+                        active=active,
+                    )
+                )
+        return sorted(charges, key=lambda charge: (-charge.annualized_cost, charge.merchant))
+
+    def table(self, currency: str = "USD", limit: int = 25) -> str:
+        """Compact prompt table of active recurring charges with their annualized total."""
+        charges = self.recurring()
+        if not charges:
+            return ""
+        total = sum(charge.annualized_cost for charge in charges)
+        lines = [
+            f"Recurring charges detected ({len(charges)} active, {format_amount(total, currency)}/yr in total):",
+            "| Merchant | Category | Cadence | Amount | Per year | Since | Next due |",
+            "|---|---|---|---|---|---|---|",
+        ]
+        for charge in charges[:limit]:
+            lines.append(
+                f"| {charge.merchant} | {charge.category or '-'} | {charge.cadence} | "
+                f"{format_amount(charge.amount, currency)} | {format_amount(charge.annualized_cost, currency)} | "
+                f"{charge.first_date:%Y-%m} | {charge.next_expected} |"
+            )
+        if len(charges) > limit:
+            rest = sum(charge.annualized_cost for charge in charges[limit:])
+            lines.append(f"| {len(charges) - limit} smaller charges | | | | {format_amount(rest, currency)} | | |")
+        return "\n".join(lines)
@@ -0,0 +1,396 @@
+import asyncio
+import json
+import re
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from textwrap import dedent
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from agno.agent import Agent
+from agno.models.anthropic import Claude
+from agno.utils.log import log_info
+
+from loans import affordability
+from profile_parser import FLOW_KINDS, FinancialProfile, ProfileItem, label_key, parse_profile, with_profile
+from whatif import WhatIfBase, outcomes
+
+SECTION_RE = re.compile(r"^## +(?P<title>.+?)\s*$", re.MULTILINE)
+# "I paid off my car loan", "cleared the credit card": debts (and their EMIs) that no longer exist
+PAID_OFF_RE = re.compile(
+    r"\b(?:paid off|paid back|repaid|cleared|closed|settled|no longer have)\s+(?P<what>[^.,;!?]+)", re.IGNORECASE
+)
+EMI_LABEL_RE = re.compile(r"\b(?:emi|payment|instal?ment)s?\b", re.IGNORECASE)
+
+
+@dataclass
+class Node:
+    """A plan input, a value computed from other nodes, or a generated plan section."""
+
+    name: str
+    deps: Tuple[str, ...] = ()
+    compute: Optional[Callable[..., Any]] = None
+    is_section: bool = False
+
+
+class PlanGraph:
+    """Dependency graph from profile inputs to computed values to plan sections.
+
+    ``propagate`` recomputes only nodes downstream of changed inputs, in topological
+    order, and stops at any value whose result did not actually change, so sections that
+    depend only on unchanged values are reused.
+    """
+
+    def __init__(self):
+        self.nodes: "OrderedDict[str, Node]" = OrderedDict()
+        self.dependents: Dict[str, List[str]] = {}
+
+    def _add(self, node: Node) -> Node:
+        missing = [dep for dep in node.deps if dep not in self.nodes]
+        if missing:
+            raise ValueError(f"{node.name} depends on undefined nodes {missing}")
+        self.nodes[node.name] = node
+        for dep in node.deps:
+            self.dependents.setdefault(dep, []).append(node.name)
+        return node
+
+    def add_input(self, name: str) -> Node:
+        return self._add(Node(name))
+
+    def add_value(self, name: str, deps: Tuple[str, ...], compute: Callable[..., Any]) -> Node:
+        return self._add(Node(name, tuple(deps), compute))
+
+    def add_section(self, title: str, deps: Tuple[str, ...]) -> Node:
+        return self._add(Node(title, tuple(deps), is_section=True))
+
+    @property
+    def inputs(self) -> List[str]:
+        return [name for name, node in self.nodes.items() if not node.deps and not node.is_section]
+
+    @property
+    def sections(self) -> List[str]:
+        return [name for name, node in self.nodes.items() if node.is_section]
+
+    def _compute(self, node: Node, values: Dict[str, Any]) -> Any:
+        return node.compute(*(values[dep] for dep in node.deps))
+
+    def evaluate(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        # Nodes can only depend on earlier nodes, so insertion order is a topological order
+        values = {name: inputs.get(name) for name in self.inputs}
+        for name, node in self.nodes.items():
+            if node.compute is not None:
+                values[name] = self._compute(node, values)
+        return values
+
+    def propagate(self, values: Dict[str, Any], changes: Dict[str, Any]) -> Tuple[Dict[str, Any], Set[str], List[str]]:
+        """Apply input changes; returns new values, the names that changed and the sections to regenerate."""
+        unknown = sorted(set(changes) - set(self.inputs))
+        if unknown:
+            raise ValueError(f"Unknown plan inputs: {unknown}; choose from {self.inputs}")
+        values = dict(values)
+        changed = {name for name, value in changes.items() if not _same(values.get(name), value)}
+        values.update(changes)
+        dirty = {dependent for name in changed for dependent in self.dependents.get(name, [])}
+        sections = []
+        for name, node in self.nodes.items():
+            if name not in dirty:
+                continue
+            if node.is_section:
+                sections.append(name)
+                continue
+            value = self._compute(node, values)
+            if _same(values.get(name), value):
+                continue
+            values[name] = value
+            changed.add(name)
+            dirty.update(self.dependents.get(name, []))
+        return values, changed, sections
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[key], b[key]) for key in a)
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return bool(np.isclose(a, b, rtol=1e-9, atol=1e-6))
+    return a == b
+
+
+def _retirement_projection(age, retirement_age, life_expectancy, total_assets, monthly_investable, monthly_expenses, monthly_income):
+    if age is None or retirement_age is None or retirement_age <= age:
+        return None
+    base = WhatIfBase(
+        current_age=age,
+        retirement_age=retirement_age,
+        life_expectancy=life_expectancy,
+        current_savings=total_assets,
+        monthly_contribution=monthly_investable,
+        annual_spending=monthly_expenses * 12,
+        monthly_income=monthly_income,
+    )
+    result = outcomes(base, {})
+    keys = ("corpus_at_retirement", "required_corpus", "retirement_gap", "required_monthly_contribution")
+    return {key: round(float(np.ravel(result[key])[0]), 2) for key in keys}
+
+
+def build_plan_graph() -> PlanGraph:
+    """The planning agent's report as a graph; section titles match its output template headings."""
+    graph = PlanGraph()
+    for name in (
+        "age",
+        "retirement_age",
+        "life_expectancy",
+        "monthly_income",
+        "monthly_expenses",
+        "monthly_savings",
+        "total_assets",
+        "total_debt",
+    ):
+        graph.add_input(name)
+
+    graph.add_value("net_worth", ("total_assets", "total_debt"), lambda assets, debt: assets - debt)
+    graph.add_value("monthly_cash_flow", ("monthly_income", "monthly_expenses"), lambda income, expenses: income - expenses)
+    graph.add_value(
+        "monthly_investable", ("monthly_savings", "monthly_cash_flow"), lambda savings, flow: savings or max(flow, 0.0)
+    )
+    graph.add_value(
+        "savings_rate",
+        ("monthly_investable", "monthly_income"),
+        lambda investable, income: round(investable / income, 4) if income else None,
+    )
+    graph.add_value("emergency_fund_target", ("monthly_expenses",), lambda expenses: expenses * 6)
+    graph.add_value(
+        "years_to_retirement",
+        ("age", "retirement_age"),
+        lambda age, retirement_age: retirement_age - age if age is not None and retirement_age is not None else None,
+    )
+    graph.add_value(
+        "retirement_projection",
+        ("age", "retirement_age", "life_expectancy", "total_assets", "monthly_investable", "monthly_expenses", "monthly_income"),
+        _retirement_projection,
+    )
+    graph.add_value(
+        "affordable_home_price",
+        ("monthly_income",),
+        lambda income: round(float(affordability(income, 0.085, 240)["max_price"]), 2) if income else None,
+    )
+
+    # Each section depends only on the figures it states, so an update rewrites just the sections quoting
+    # a changed figure; the full picture is the Financial Situation Analysis alone
+    graph.add_section("Life Goals & Planning Summary", ("retirement_age", "years_to_retirement"))
+    graph.add_section(
+        "Financial Situation Analysis",
+        ("net_worth", "monthly_cash_flow", "total_assets", "total_debt", "savings_rate", "emergency_fund_target"),
+    )
+    graph.add_section("Retirement Planning Strategy", ("retirement_age", "years_to_retirement", "retirement_projection"))
+    graph.add_section("Education Funding Plan", ("monthly_investable",))
+    graph.add_section("Major Purchase Planning", ("affordable_home_price",))
+    graph.add_section("Life Transition Planning", ("emergency_fund_target", "total_assets"))
+    graph.add_section("Basic Estate Considerations", ("net_worth",))
+    graph.add_section("Financial Roadmap Implementation", ("total_debt", "emergency_fund_target"))
+    graph.add_section("Financial Plan Success Framework", ("savings_rate",))
+    return graph
+
+
+def profile_inputs(profile: FinancialProfile) -> Dict[str, Any]:
+    return {
+        "age": profile.age,
+        "retirement_age": profile.retirement_age or 60,
+        "life_expectancy": 85,
+        "monthly_income": profile.monthly_income,
+        "monthly_expenses": profile.monthly_expenses,
+        "monthly_savings": profile.monthly_savings,
+        "total_assets": profile.total_assets,
+        "total_debt": profile.total_debt,
+    }
+
+
+def merge_profile(base: FinancialProfile, text: str) -> FinancialProfile:
+    """Apply a free-text update to a stored profile, item by item.
+
+    A stated item replaces the stored item with the same ``label_key`` and kind, or is added;
+    a stated total replaces the stored total, and a changed flow item moves a stored total of its
+    kind by the same amount. "Paid off X" removes the matching debts and their EMI expenses.
+    Everything the update does not mention is kept, so totals are recomputed from the full profile.
+    """
+    update = parse_profile(text)
+    items: List[ProfileItem] = list(base.items)
+    for match in PAID_OFF_RE.finditer(text):
+        key = label_key(match.group("what"))
+        if key:
+            items = [
+                item
+                for item in items
+                if label_key(item.label) != key
+                or not (item.kind == "debt" or (item.kind == "expense" and EMI_LABEL_RE.search(item.label)))
+            ]
+    for new in update.items:
+        if new.is_total:
+            items = [item for item in items if not (item.kind == new.kind and item.is_total)]
+            items.append(new)
+            continue
+        key = label_key(new.label)
+        old = next((item for item in items if item.kind == new.kind and not item.is_total and label_key(item.label) == key), None)
+        if old is not None:
+            items.remove(old)
+        if new.kind in FLOW_KINDS:
+            delta = (new.monthly or 0.0) - ((old.monthly or 0.0) if old is not None else 0.0)
+            items = [
+                replace(item, amount=(item.monthly or 0.0) + delta, monthly=(item.monthly or 0.0) + delta, period="month")
+                if item.kind == new.kind and item.is_total
+                else item
+                for item in items
+            ]
+        items.append(new)
+    return FinancialProfile(
+        currency=update.currency if update.items else base.currency,
+        age=update.age or base.age,
+        retirement_age=update.retirement_age or base.retirement_age,
+        items=items,
+    )
+
+
+def changes_from_text(text: str, profile: Optional[FinancialProfile] = None) -> Dict[str, Any]:
+    """Inputs that a free-text update such as "my income rose to 2 lakh a month" changes.
+
+    With the plan's stored ``profile`` the update is merged item by item and the totals are
+    recomputed from the merged profile; without one, only the totals the text states are returned.
+    """
+    if profile is not None:
+        merged, before = profile_inputs(merge_profile(profile, text)), profile_inputs(profile)
+        return {key: value for key, value in merged.items() if not _same(before[key], value)}
+    profile = parse_profile(text)
+    kinds = {item.kind for item in profile.items}
+    parsed = profile_inputs(profile)
+    changes = {key: getattr(profile, key) for key in ("age", "retirement_age") if getattr(profile, key) is not None}
+    for kind, key in (
+        ("income", "monthly_income"),
+        ("expense", "monthly_expenses"),
+        ("saving", "monthly_savings"),
+        ("asset", "total_assets"),
+        ("debt", "total_debt"),
+    ):
+        if kind in kinds:
+            changes[key] = parsed[key]
+    return changes
+
+
+def split_sections(markdown: str) -> Tuple[str, "OrderedDict[str, str]"]:
+    """Split a plan into the text before the first ``##`` heading and its sections by title."""
+    matches = list(SECTION_RE.finditer(markdown))
+    preamble = markdown[: matches[0].start()] if matches else markdown
+    sections = OrderedDict()
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(markdown)
+        sections[match.group("title")] = markdown[match.start() : end]
+    return preamble, sections
+
+
+@dataclass
+class StoredPlan:
+    plan_id: str
+    inputs: Dict[str, Any]
+    values: Dict[str, Any]
+    preamble: str
+    sections: "OrderedDict[str, str]" = field(default_factory=OrderedDict)
+    revision: int = 0
+    # Item-level profile the inputs were computed from, so text updates can be merged into it
+    profile: FinancialProfile = field(default_factory=FinancialProfile)
+
+    @property
+    def markdown(self) -> str:
+        return self.preamble + "".join(self.sections.values())
+
+
+section_agent = Agent(
+    model=Claude(id="claude-3-5-sonnet-20240620"),
+    description=dedent("""\
+        You are the Financial Planning Agent revising one section of an existing financial plan after
+        some of the client's figures changed. Rewrite only the section you are given, keeping its
+        heading, structure and tone, and update every statement affected by the new figures. Use the
+        figures exactly as given; do not recompute them. Return only the rewritten section in markdown.\
+    """),
+    markdown=True,
+)
+
+
+class Replanner:
+    """Stores plans with their dependency graph values and regenerates only affected sections."""
+
+    def __init__(self, planning_agent: Agent, graph: Optional[PlanGraph] = None, max_plans: int = 512):
+        self.planning_agent = planning_agent
+        self.graph = graph or build_plan_graph()
+        self.max_plans = max_plans
+        self.plans: "OrderedDict[str, StoredPlan]" = OrderedDict()
+
+    def create(self, user_input: str) -> StoredPlan:
+        profile = parse_profile(user_input)
+        inputs = profile_inputs(profile)
+        values = self.graph.evaluate(inputs)
+        response = self.planning_agent.run(with_profile(user_input))
+        preamble, sections = split_sections(response.content or "")
+        plan = StoredPlan(
+            plan_id=uuid.uuid4().hex, inputs=inputs, values=values, preamble=preamble, sections=sections, profile=profile
+        )
+        self._remember(plan)
+        return plan
+
+    def get(self, plan_id: str) -> StoredPlan:
+        if plan_id not in self.plans:
+            raise KeyError(f"Unknown plan {plan_id}")
+        self.plans.move_to_end(plan_id)
+        return self.plans[plan_id]
+
+    async def update(self, plan_id: str, changes: Dict[str, Any], user_input: str = "") -> Dict:
+        """Re-plan after input changes; ``user_input`` is a free-text update merged into the stored profile
+        (explicit ``changes`` win over it)."""
+        plan = self.get(plan_id)
+        profile = merge_profile(plan.profile, user_input) if user_input else plan.profile
+        if user_input:
+            changes = {**changes_from_text(user_input, plan.profile), **changes}
+        values, changed, dirty = self.graph.propagate(plan.values, changes)
+        to_regenerate = [title for title in dirty if title in plan.sections]
+        rewritten = await asyncio.gather(*(self._rewrite(plan, title, values, changed) for title in to_regenerate))
+        for title, text in zip(to_regenerate, rewritten):
+            plan.sections[title] = text.rstrip() + "\n\n"
+        plan.inputs.update(changes)
+        plan.values = values
+        plan.profile = profile
+        plan.revision += 1
+        log_info(f"Re-planned {plan_id}: regenerated {len(to_regenerate)} of {len(plan.sections)} sections")
+        return {
+            "plan_id": plan_id,
+            "revision": plan.revision,
+            "changed_values": sorted(changed),
+            "regenerated_sections": to_regenerate,
+            "reused_sections": [title for title in plan.sections if title not in to_regenerate],
+            "plan": plan.markdown,
+        }
+
+    async def _rewrite(self, plan: StoredPlan, title: str, values: Dict[str, Any], changed: Set[str]) -> str:
+        deps = self._section_inputs(title)
+        facts = {name: values[name] for name in deps}
+        updates = {name: {"before": plan.values.get(name), "after": values[name]} for name in sorted(changed & set(deps))}
+        prompt = (
+            f"Changed figures: {json.dumps(updates, default=str)}\n"
+            f"Current figures for this section: {json.dumps(facts, default=str)}\n\n"
+            f"Section to rewrite:\n{plan.sections[title]}"
+        )
+        # Each rewrite runs on its own copy so sections are regenerated concurrently
+        response = await section_agent.deep_copy().arun(prompt)
+        return response.content or plan.sections[title]
+
+    def _section_inputs(self, title: str) -> Set[str]:
+        """Every node a section depends on, directly or transitively."""
+        seen, stack = set(), list(self.graph.nodes[title].deps)
+        while stack:
+            name = stack.pop()
+            if name not in seen:
+                seen.add(name)
+                stack.extend(self.graph.nodes[name].deps)
+        return seen
+
+    def _remember(self, plan: StoredPlan) -> None:
+        self.plans[plan.plan_id] = plan
+        while len(self.plans) > self.max_plans:
+            self.plans.popitem(last=False)
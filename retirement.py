@@ -0,0 +1,229 @@
+import atexit
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+PERCENTILES = (5, 25, 50, 75, 95)
+# Below this many paths the process pool costs more than it saves
+PARALLEL_THRESHOLD = 50_000
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+@dataclass(frozen=True)
+class RetirementScenario:
+    """Inputs for one retirement projection. Rates are annual decimals; money in today's terms.
+
+    The contribution is this year's amount and grows at the nominal ``contribution_growth``
+    (like a salary), not with simulated inflation.
+    """
+
+    current_age: int
+    retirement_age: int
+    current_savings: float
+    annual_contribution: float
+    annual_spending: float
+    life_expectancy: int = 85
+    contribution_growth: float = 0.05
+    expected_return: float = 0.08
+    return_volatility: float = 0.12
+    post_retirement_return: float = 0.06
+    post_retirement_volatility: float = 0.06
+    inflation: float = 0.05
+    inflation_volatility: float = 0.01
+    other_retirement_income: float = 0.0
+
+    @property
+    def years(self) -> int:
+        return self.life_expectancy - self.current_age
+
+    @property
+    def years_to_retirement(self) -> int:
+        return self.retirement_age - self.current_age
+
+
+def _lognormal_returns(rng: np.random.Generator, mean, volatility, size) -> np.ndarray:
+    """Annual returns whose arithmetic mean and volatility match the inputs."""
+    sigma = np.sqrt(np.log1p((volatility / (1 + mean)) ** 2))
+    mu = np.log1p(mean) - sigma**2 / 2
+    return np.expm1(rng.normal(mu, sigma, size))
+
+
+def _report_years(scenario: RetirementScenario) -> np.ndarray:
+    """Year indices reported in the bands: every fifth year, the retirement year and the last year."""
+    return np.array(sorted(set(range(4, scenario.years, 5)) | {scenario.years_to_retirement - 1, scenario.years - 1}))
+
+
+def _simulate_chunk(
+    scenario: RetirementScenario, paths: int, seed: np.random.SeedSequence
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Simulate ``paths`` lives; returns real balances for the report years and the depletion year index.
+
+    Arrays are laid out (years, paths) so every yearly update works on contiguous memory.
+    """
+    rng = np.random.default_rng(seed)
+    years, working = scenario.years, scenario.years_to_retirement
+    growth = np.empty((years, paths))
+    growth[:working] = _lognormal_returns(rng, scenario.expected_return, scenario.return_volatility, (working, paths))
+    growth[working:] = _lognormal_returns(
+        rng, scenario.post_retirement_return, scenario.post_retirement_volatility, (years - working, paths)
+    )
+    growth += 1
+    inflation = rng.normal(scenario.inflation, scenario.inflation_volatility, (years, paths))
+    price_index = np.cumprod(np.maximum(inflation, -0.02) + 1, axis=0)
+
+    # Contributions are nominal: this year's amount grown at the salary growth rate; withdrawals track inflation
+    contribution = scenario.annual_contribution * (1 + scenario.contribution_growth) ** np.arange(working)
+    net_spending = max(scenario.annual_spending - scenario.other_retirement_income, 0.0)
+
+    report = _report_years(scenario)
+    real_balances = np.empty((report.size, paths))
+    depleted_at = np.full(paths, -1, dtype=np.int32)
+    balance = np.full(paths, float(scenario.current_savings))
+    row = 0
+    for year in range(years):
+        if year < working:
+            balance *= growth[year]
+            balance += contribution[year]
+        else:
+            balance -= net_spending * price_index[year]
+            balance *= growth[year]
+            depleted_at[(balance <= 0) & (depleted_at < 0)] = year
+            np.maximum(balance, 0, out=balance)
+        if year == report[row]:
+            np.divide(balance, price_index[year], out=real_balances[row])
+            row = min(row + 1, report.size - 1)
+    return real_balances, depleted_at
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None or _pool._max_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers)
+    return _pool
+
+
+@atexit.register
+def _shutdown_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def simulate(
+    scenario: RetirementScenario, paths: int = 20_000, seed: Optional[int] = None, workers: Optional[int] = None
+) -> Dict:
+    """Monte Carlo retirement projection with success probability and percentile bands.
+
+    Large path counts are split into equal chunks with independent random streams and run on a
+    reusable process pool; smaller runs stay in-process.
+    """
+    if scenario.retirement_age <= scenario.current_age or scenario.life_expectancy <= scenario.retirement_age:
+        raise ValueError("Ages must satisfy current_age < retirement_age < life_expectancy")
+
+    workers = workers or os.cpu_count() or 1
+    chunks = workers if paths >= PARALLEL_THRESHOLD and workers > 1 else 1
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    sizes = [paths // chunks + (1 if i < paths % chunks else 0) for i in range(chunks)]
+    if chunks == 1:
+        results = [_simulate_chunk(scenario, paths, seeds[0])]
+    else:
+        pool = _get_pool(workers)
+        results = list(pool.map(_simulate_chunk, [scenario] * chunks, sizes, seeds))
+    real_balances = np.concatenate([balances for balances, _ in results], axis=1)
+    depleted_at = np.concatenate([depleted for _, depleted in results])
+
+    ages = scenario.current_age + 1 + np.arange(scenario.years)
+    report = _report_years(scenario)
+    bands = np.percentile(real_balances, PERCENTILES, axis=1)
+    retirement_row = int(np.searchsorted(report, scenario.years_to_retirement - 1))
+    failed = depleted_at >= 0
+    depletion_ages = ages[depleted_at[failed]]
+    return {
+        "paths": int(paths),
+        "success_probability": round(float(1 - failed.mean()), 4),
+        "corpus_at_retirement_real": {
+            f"p{p}": round(float(value), 2) for p, value in zip(PERCENTILES, bands[:, retirement_row])
+        },
+        "median_depletion_age": int(np.median(depletion_ages)) if depletion_ages.size else None,
+        "earliest_depletion_age_p5": int(np.percentile(depletion_ages, 5)) if depletion_ages.size else None,
+        "balance_bands_real": [
+            {"age": int(ages[year]), **{f"p{p}": round(float(bands[k, i]), 2) for k, p in enumerate(PERCENTILES)}}
+            for i, year in enumerate(report)
+        ],
+        "assumptions": asdict(scenario),
+    }
+
+
+class RetirementTools(Toolkit):
+    def __init__(self, default_paths: int = 20_000, **kwargs):
+        super().__init__(name="retirement_monte_carlo", **kwargs)
+        self.default_paths = default_paths
+        self.register(self.simulate_retirement)
+
+    def simulate_retirement(
+        self,
+        current_age: int,
+        retirement_age: int,
+        current_savings: float,
+        monthly_contribution: float,
+        annual_retirement_spending: float,
+        life_expectancy: int = 85,
+        expected_return_percent: float = 8,
+        return_volatility_percent: float = 12,
+        post_retirement_return_percent: float = 6,
+        post_retirement_volatility_percent: float = 6,
+        inflation_percent: float = 5,
+        contribution_growth_percent: float = 5,
+        other_retirement_income: float = 0,
+        paths: int = 0,
+    ) -> str:
+        """Run a Monte Carlo simulation of saving until retirement and withdrawing afterwards, with random
+        returns and inflation. Returns the probability the money lasts to life expectancy, the projected
+        corpus at retirement and balance percentile bands. Use this for retirement gap/surplus projections.
+
+        Args:
+            current_age (int): Client's current age.
+            retirement_age (int): Planned retirement age.
+            current_savings (float): Current retirement savings (EPF, NPS, 401(k), investments earmarked for retirement).
+            monthly_contribution (float): Monthly retirement saving now; grows only at contribution_growth_percent (nominal).
+            annual_retirement_spending (float): Desired annual spending in retirement, in today's money.
+            life_expectancy (int): Age the money must last until.
+            expected_return_percent (float): Mean annual return before retirement, in percent.
+            return_volatility_percent (float): Annual return standard deviation before retirement, in percent.
+            post_retirement_return_percent (float): Mean annual return after retirement, in percent.
+            post_retirement_volatility_percent (float): Return standard deviation after retirement, in percent.
+            inflation_percent (float): Mean annual inflation, in percent.
+            contribution_growth_percent (float): Annual nominal growth of contributions (salary growth, inflation included), in percent.
+            other_retirement_income (float): Annual pension/social security in retirement, in today's money.
+            paths (int): Number of simulated paths; 0 uses the default.
+
+        Returns:
+            str: JSON string with success probability, corpus percentiles at retirement (today's money),
+            depletion ages and balance bands by age.
+        """
+        scenario = RetirementScenario(
+            current_age=current_age,
+            retirement_age=retirement_age,
+            current_savings=current_savings,
+            annual_contribution=monthly_contribution * 12,
+            annual_spending=annual_retirement_spending,
+            life_expectancy=life_expectancy,
+            contribution_growth=contribution_growth_percent / 100,
+            expected_return=expected_return_percent / 100,
+            return_volatility=return_volatility_percent / 100,
+            post_retirement_return=post_retirement_return_percent / 100,
+            post_retirement_volatility=post_retirement_volatility_percent / 100,
+            inflation=inflation_percent / 100,
+            other_retirement_income=other_retirement_income,
+        )
+        result = simulate(scenario, paths=paths or self.default_paths)
+        log_info(f"Simulated {result['paths']} retirement paths: {result['success_probability']:.1%} success")
+        return json.dumps(result)
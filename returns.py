@@ -0,0 +1,233 @@
+import json
+import time
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+DAYS_PER_YEAR = 365.0
+# Search interval for the fallback, as log(1 + rate): about -99.99% to +10,000% a year
+LOG_RATE_BOUNDS = (float(np.log(1e-4)), float(np.log(101.0)))
+TOLERANCE = 1e-10
+MAX_ITERATIONS = 100
+
+
+def _npv(amounts: np.ndarray, years: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Present value of every row at continuous rate ``x`` = log(1 + rate), and its derivative in ``x``."""
+    discounted = amounts * np.exp(-x[:, None] * years)
+    return discounted.sum(axis=1), -(discounted * years).sum(axis=1)
+
+
+def xirr(amounts, years, guess: float = 0.1) -> np.ndarray:
+    """Annualized internal rate of return of every row of a (series, flows) cash-flow matrix.
+
+    ``years`` gives each flow's time in years (any origin; only differences matter); pad short
+    rows with zero amounts. Solves sum(amount * (1 + r) ** -years) = 0 for all rows in
+    lockstep with Newton's method on log(1 + r), keeping a sign-change bracket per row and
+    bisecting whenever a Newton step would leave it, so every row with a root converges.
+    Rows whose flows do not change sign across the bracket (all inflows, all outflows) are NaN.
+    """
+    amounts = np.atleast_2d(np.asarray(amounts, dtype=float))
+    years = np.broadcast_to(np.atleast_2d(np.asarray(years, dtype=float)), amounts.shape)
+    series = amounts.shape[0]
+    lo, hi = np.full(series, LOG_RATE_BOUNDS[0]), np.full(series, LOG_RATE_BOUNDS[1])
+    with np.errstate(over="ignore", invalid="ignore"):
+        f_lo = _npv(amounts, years, lo)[0]
+        f_hi = _npv(amounts, years, hi)[0]
+        solvable = np.isfinite(f_lo) & np.isfinite(f_hi) & (np.sign(f_lo) * np.sign(f_hi) < 0)
+        x = np.full(series, np.log1p(guess))
+        active = solvable.copy()
+        for _ in range(MAX_ITERATIONS):
+            f, slope = _npv(amounts[active], years[active], x[active])
+            # Narrow the bracket to the side of x that still contains the sign change
+            keep_lo = np.sign(f) == np.sign(f_lo[active])
+            lo[active] = np.where(keep_lo, x[active], lo[active])
+            f_lo[active] = np.where(keep_lo, f, f_lo[active])
+            hi[active] = np.where(keep_lo, hi[active], x[active])
+            newton = x[active] - f / slope
+            inside = np.isfinite(newton) & (newton > lo[active]) & (newton < hi[active])
+            step = np.where(inside, newton, (lo[active] + hi[active]) / 2)
+            done = (np.abs(step - x[active]) < TOLERANCE) | (f == 0)
+            x[active] = np.where(f == 0, x[active], step)
+            active[np.flatnonzero(active)[done]] = False
+            if not active.any():
+                break
+    return np.where(solvable, np.expm1(x), np.nan)
+
+
+def stack_flows(series: Sequence[Sequence[Tuple[date, float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Lay out dated cash-flow lists as zero-padded (series, flows) amount and year-offset matrices."""
+    width = max((len(flows) for flows in series), default=0)
+    amounts, years = np.zeros((len(series), width)), np.zeros((len(series), width))
+    for i, flows in enumerate(series):
+        if not flows:
+            continue
+        ordinals = np.array([when.toordinal() for when, _ in flows], dtype=float)
+        amounts[i, : len(flows)] = [amount for _, amount in flows]
+        years[i, : len(flows)] = (ordinals - ordinals.min()) / DAYS_PER_YEAR
+    return amounts, years
+
+
+def _percent(value: float, digits: int = 2) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value) * 100, digits)
+
+
+def xirr_dated(series: Sequence[Sequence[Tuple[date, float]]]) -> np.ndarray:
+    """Batch entry point: XIRR of many lists of (date, amount) flows, outflows negative, in one solve."""
+    amounts, years = stack_flows(series)
+    return xirr(amounts, years)
+
+
+def returns_table(series: Dict[str, Sequence[Tuple[date, float]]], inflation: float = 0.06) -> Dict[str, Dict]:
+    """XIRR and real XIRR, in percent, for named (date, amount) series; unsolvable series get None."""
+    names = list(series)
+    rates = xirr_dated([series[name] for name in names])
+    real = real_return(rates, inflation)
+    return {
+        name: {"xirr_percent": _percent(rates[i], 4), "real_xirr_percent": _percent(real[i], 4)}
+        for i, name in enumerate(names)
+    }
+
+
+def cagr(start_value, end_value, years) -> np.ndarray:
+    """Compound annual growth rate; NaN where the start value or the period is not positive."""
+    start_value, end_value, years = np.broadcast_arrays(*(np.atleast_1d(np.asarray(v, dtype=float)) for v in (start_value, end_value, years)))
+    valid = (start_value > 0) & (end_value >= 0) & (years > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(valid, (end_value / start_value) ** (1 / np.where(valid, years, 1)) - 1, np.nan)
+
+
+def real_return(nominal, inflation) -> np.ndarray:
+    """Inflation-adjusted annual return: (1 + nominal) / (1 + inflation) - 1."""
+    return (1 + np.asarray(nominal, dtype=float)) / (1 + np.asarray(inflation, dtype=float)) - 1
+
+
+def holding_flows(current_value, lump_sum=0.0, years_held=0.0, monthly=0.0, months=0.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Cash flows of holdings described the way clients describe them, timed in years before today.
+
+    Each holding is a lump sum invested ``years_held`` ago and/or a monthly investment (SIP, RD,
+    EPF contribution) made at the start of each of the last ``months`` months, worth
+    ``current_value`` today. Column 0 is the lump sum, the last column today's value.
+    """
+    current_value, lump_sum, years_held, monthly, months = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=float)) for v in (current_value, lump_sum, years_held, monthly, months))
+    )
+    months = np.round(months).astype(int)
+    width = int(months.max(initial=0))
+    installment = np.arange(width, 0, -1)
+    paid = installment[None, :] <= months[:, None]
+    amounts = np.hstack([-lump_sum[:, None], np.where(paid, -monthly[:, None], 0.0), current_value[:, None]])
+    years = np.hstack([-years_held[:, None], np.broadcast_to(-installment / 12, paid.shape), np.zeros((current_value.size, 1))])
+    return amounts, years
+
+
+def holding_returns(current_value, lump_sum=0.0, years_held=0.0, monthly=0.0, months=0.0, inflation=0.06) -> Dict[str, np.ndarray]:
+    """XIRR, CAGR (lump sums only), absolute and real returns for a batch of described holdings."""
+    amounts, years = holding_flows(current_value, lump_sum, years_held, monthly, months)
+    invested = -amounts[:, :-1].sum(axis=1)
+    value = amounts[:, -1]
+    rate = xirr(amounts, years)
+    lump_only = amounts[:, 1:-1].sum(axis=1) == 0
+    return {
+        "invested": invested,
+        "current_value": value,
+        "gain": value - invested,
+        "absolute_return": np.where(invested > 0, value / np.maximum(invested, 1e-9) - 1, np.nan),
+        "xirr": rate,
+        "cagr": np.where(lump_only, cagr(-amounts[:, 0], value, -years[:, 0]), np.nan),
+        "real_xirr": real_return(rate, inflation),
+    }
+
+
+class ReturnsTools(Toolkit):
+    def __init__(self, **kwargs):
+        super().__init__(name="returns", **kwargs)
+        self.register(self.calculate_returns)
+
+    def calculate_returns(
+        self,
+        names: List[str],
+        current_values: List[float],
+        lump_sums: Optional[List[float]] = None,
+        years_held: Optional[List[float]] = None,
+        monthly_investments: Optional[List[float]] = None,
+        months_invested: Optional[List[float]] = None,
+        inflation_percent: float = 6,
+    ) -> str:
+        """Compute exact annualized returns (XIRR), CAGR and inflation-adjusted returns of existing holdings
+        (SIPs, mutual funds, FDs, RDs, EPF/PPF balances, stocks) in one call. Use this instead of estimating
+        returns when reviewing a portfolio.
+
+        Args:
+            names (List[str]): Holding names, e.g. ["Nifty index SIP", "SBI FD", "EPF"].
+            current_values (List[float]): Value of each holding today.
+            lump_sums (List[float]): One-time amount invested in each holding (0 if none).
+            years_held (List[float]): Years since each lump sum was invested.
+            monthly_investments (List[float]): Monthly amount invested in each holding (SIP/RD/EPF contribution; 0 if none).
+            months_invested (List[float]): Number of monthly investments made so far in each holding.
+            inflation_percent (float): Annual inflation used for real returns, in percent.
+
+        Returns:
+            str: JSON string with, per holding, amount invested, gain, absolute return, XIRR, CAGR (lump sums)
+            and real XIRR in percent, plus the same for the whole portfolio.
+        """
+        count = len(names)
+        inputs = [
+            current_values,
+            lump_sums or [0.0] * count,
+            years_held or [0.0] * count,
+            monthly_investments or [0.0] * count,
+            months_invested or [0.0] * count,
+        ]
+        if any(len(values) != count for values in inputs):
+            return json.dumps({"error": "Every list must have one entry per holding"})
+        result = holding_returns(*inputs, inflation=inflation_percent / 100)
+        # The whole portfolio is one more series: all holdings' flows together
+        amounts, years = holding_flows(*inputs)
+        portfolio = xirr(amounts.ravel()[None, :], years.ravel()[None, :])[0]
+        holdings = [
+            {
+                "name": name,
+                "invested": round(float(result["invested"][i]), 2),
+                "current_value": round(float(result["current_value"][i]), 2),
+                "gain": round(float(result["gain"][i]), 2),
+                "absolute_return_percent": _percent(result["absolute_return"][i]),
+                "xirr_percent": _percent(result["xirr"][i]),
+                "cagr_percent": _percent(result["cagr"][i]),
+                "real_xirr_percent": _percent(result["real_xirr"][i]),
+            }
+            for i, name in enumerate(names)
+        ]
+        invested, value = float(result["invested"].sum()), float(result["current_value"].sum())
+        log_info(f"Computed returns for {count} holdings: portfolio XIRR {_percent(portfolio)}%")
+        return json.dumps(
+            {
+                "holdings": holdings,
+                "portfolio": {
+                    "invested": round(invested, 2),
+                    "current_value": round(value, 2),
+                    "gain": round(value - invested, 2),
+                    "xirr_percent": _percent(portfolio),
+                    "real_xirr_percent": _percent(real_return(portfolio, inflation_percent / 100)),
+                },
+                "inflation_percent": inflation_percent,
+            }
+        )
+
+
+def _benchmark(series: int = 100_000, months: int = 120) -> None:
+    rng = np.random.default_rng(5)
+    monthly = rng.uniform(1_000, 50_000, series)
+    count = rng.integers(6, months + 1, series)
+    value = monthly * count * rng.uniform(0.7, 2.5, series)
+    amounts, years = holding_flows(value, monthly=monthly, months=count)
+    start = time.perf_counter()
+    rates = xirr(amounts, years)
+    elapsed = time.perf_counter() - start
+    print(f"{series:,} series x {amounts.shape[1]} flows in {elapsed:.2f}s ({np.isnan(rates).sum()} unsolved)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,311 @@
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from agno.utils.log import log_info, log_warning
+
+RULES_DIR = Path(__file__).parent / "rules"
+RULES_FILE_RE = re.compile(r"^india_fy(?P<fy>\d{4}-\d{2})\.json$")
+
+
+@dataclass(frozen=True)
+class TaxRegime:
+    """Slab table and adjustments for one Indian income tax regime."""
+
+    name: str
+    slab_floors: np.ndarray
+    slab_rates: np.ndarray
+    standard_deduction: float
+    rebate_income_limit: float
+    rebate_max: float
+    surcharge_thresholds: np.ndarray
+    surcharge_rates: np.ndarray
+    cess_rate: float = 0.04
+    allows_deductions: bool = True
+    # Whether tax just above the 87A income limit is capped at the income above it
+    rebate_marginal_relief: bool = False
+    slab_ceilings: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "slab_ceilings", np.append(self.slab_floors[1:], np.inf))
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    """One fiscal year's rules, with the tax tables compiled into NumPy lookups."""
+
+    fiscal_year: str
+    version: int
+    raw: Dict
+    regimes: Dict[str, TaxRegime]
+    deduction_limits: Dict[str, float]
+    schemes: Dict[str, Dict]
+    capital_gains: Dict[str, Dict] = field(default_factory=dict)
+    salary: Dict = field(default_factory=dict)
+
+    def scheme(self, name: str) -> Dict:
+        return self.schemes[name]
+
+
+def compile_rules(raw: Dict, version: int = 0) -> CompiledRules:
+    tax = raw["tax"]
+    regimes = {}
+    for name, spec in tax["regimes"].items():
+        slabs = np.asarray(spec["slabs"], dtype=float)
+        surcharge = np.asarray(spec.get("surcharge", []), dtype=float).reshape(-1, 2)
+        if np.any(np.diff(slabs[:, 0]) <= 0) or np.any(np.diff(surcharge[:, 0]) <= 0):
+            raise ValueError(f"Slab and surcharge thresholds for the {name} regime must be increasing")
+        rebate = spec.get("rebate_87a", {})
+        regimes[name] = TaxRegime(
+            name=name,
+            slab_floors=slabs[:, 0],
+            slab_rates=slabs[:, 1],
+            standard_deduction=float(spec.get("standard_deduction", 0)),
+            rebate_income_limit=float(rebate.get("income_limit", 0)),
+            rebate_max=float(rebate.get("max_rebate", 0)),
+            surcharge_thresholds=surcharge[:, 0],
+            surcharge_rates=surcharge[:, 1],
+            cess_rate=float(tax.get("cess_rate", 0.04)),
+            allows_deductions=bool(spec.get("allows_deductions", True)),
+            rebate_marginal_relief=bool(rebate.get("marginal_relief", False)),
+        )
+
+    limits = {}
+    for key, spec in raw.get("deductions", {}).items():
+        if spec.get("limit") is not None:
+            limits[key] = float(spec["limit"])
+        if spec.get("senior_limit") is not None:
+            limits[f"{key}_senior"] = float(spec["senior_limit"])
+
+    return CompiledRules(
+        fiscal_year=raw["fiscal_year"],
+        version=version,
+        raw=raw,
+        regimes=regimes,
+        deduction_limits=limits,
+        schemes=raw.get("schemes", {}),
+        capital_gains=raw.get("capital_gains", {}),
+        salary=raw.get("salary", {}),
+    )
+
+
+class RulesStore:
+    """Fiscal-year-versioned regulatory rules, reloaded when their files change.
+
+    Each ``rules/india_fy<YYYY-YY>.json`` file holds one fiscal year. Lookups stat the files
+    at most every ``check_interval`` seconds and recompile only the ones whose mtime changed,
+    so rate updates are picked up by running workers without a restart. A file that fails to
+    parse or compile is logged and the previously loaded version keeps serving.
+    """
+
+    def __init__(self, directory: Path = RULES_DIR, check_interval: float = 2.0, default_fiscal_year: Optional[str] = None):
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self.default_fiscal_year = default_fiscal_year or os.getenv("RULES_FISCAL_YEAR")
+        self._rules: Dict[str, CompiledRules] = {}
+        self._mtimes: Dict[Path, int] = {}
+        self._last_check = float("-inf")
+        self._lock = threading.Lock()
+
+    def fiscal_years(self) -> List[str]:
+        self._maybe_reload()
+        return sorted(self._rules)
+
+    def get(self, fiscal_year: Optional[str] = None) -> CompiledRules:
+        self._maybe_reload()
+        fiscal_year = fiscal_year or self.default_fiscal_year or max(self._rules, default=None)
+        if fiscal_year not in self._rules:
+            raise KeyError(f"No regulatory rules loaded for FY {fiscal_year} (have: {sorted(self._rules)})")
+        return self._rules[fiscal_year]
+
+    def reload(self) -> None:
+        self._last_check = float("-inf")
+        self._maybe_reload()
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            current = {
+                path: path.stat().st_mtime_ns for path in self.directory.glob("india_fy*.json") if RULES_FILE_RE.match(path.name)
+            }
+            for path, mtime in current.items():
+                if self._mtimes.get(path) == mtime:
+                    continue
+                try:
+                    raw = json.loads(path.read_text(encoding="utf-8"))
+                    compiled = compile_rules(raw, version=mtime)
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    log_warning(f"Keeping previous rules; failed to load {path.name}: {e}")
+                    continue
+                self._rules[compiled.fiscal_year] = compiled
+                self._mtimes[path] = mtime
+                log_info(f"Loaded regulatory rules for FY {compiled.fiscal_year} from {path.name}")
+            for path in set(self._mtimes) - set(current):
+                fiscal_year = RULES_FILE_RE.match(path.name).group("fy")
+                self._rules.pop(fiscal_year, None)
+                self._mtimes.pop(path)
+
+
+rules_store = RulesStore()
+
+
+def rupees(value: float) -> str:
+    """Write an amount the way the knowledge base does (₹10,000 / ₹2.5 lakhs / ₹1 crore)."""
+    if value >= 10_000_000:
+        amount, unit = value / 10_000_000, "crore" if value == 10_000_000 else "crores"
+    elif value >= 100_000:
+        amount, unit = value / 100_000, "lakh" if value == 100_000 else "lakhs"
+    else:
+        return f"₹{value:,.0f}"
+    return f"₹{amount:g} {unit}"
+
+
+def percent(rate: float) -> str:
+    return f"{rate * 100:g}%"
+
+
+def render_knowledge(fiscal_year: Optional[str] = None) -> str:
+    """Render the rate-bearing sections of the knowledge base from the rules store."""
+    rules = rules_store.get(fiscal_year)
+    fy = rules.fiscal_year
+    lines = ["# Regulatory Rates and Limits", "", "## Tax Structure"]
+
+    for name, regime in rules.regimes.items():
+        lines.append(f"- Income Tax Slabs (FY {fy}, {name.title()} Regime):")
+        floors, rates = regime.slab_floors, regime.slab_rates
+        for i, (floor, rate) in enumerate(zip(floors, rates)):
+            tax = "Nil" if rate == 0 else percent(rate)
+            if i == 0:
+                lines.append(f"  * Up to {rupees(floors[1])}: {tax}")
+            elif i == len(floors) - 1:
+                lines.append(f"  * Above {rupees(floor)}: {tax}")
+            else:
+                lines.append(f"  * {rupees(floor)}-{rupees(floors[i + 1])}: {tax}")
+        lines.append(
+            f"  * Standard deduction: {rupees(regime.standard_deduction)}; Section 87A rebate up to "
+            f"{rupees(regime.rebate_max)} for taxable income up to {rupees(regime.rebate_income_limit)}"
+            + (", with marginal relief just above the limit" if regime.rebate_marginal_relief else "")
+        )
+        if regime.surcharge_thresholds.size:
+            surcharge = ", ".join(
+                f"{percent(rate)} (> {rupees(threshold)})"
+                for threshold, rate in zip(regime.surcharge_thresholds, regime.surcharge_rates)
+            )
+            lines.append(f"  * Surcharge: {surcharge}")
+        lines.append(f"  * Cess: {percent(regime.cess_rate)} Health and Education Cess on total tax liability")
+        if not regime.allows_deductions:
+            lines.append("  * Chapter VI-A deductions (80C, 80D, etc.) are not available")
+        lines.append("")
+
+    lines.append("## Tax Deductions & Exemptions")
+    for key, spec in rules.raw.get("deductions", {}).items():
+        text = f"- {spec.get('label', key)}: {spec.get('description', '')}"
+        if spec.get("limit") is not None:
+            text += f" (up to {rupees(spec['limit'])}"
+            if spec.get("senior_limit") is not None:
+                text += f", {rupees(spec['senior_limit'])} for senior citizens"
+            text += ")"
+        lines.append(text)
+    lines.append("")
+
+    salary = rules.salary
+    if salary:
+        hra, nps = salary["hra_exemption"], salary["employer_nps_limit"]
+        lines += [
+            "## Salary Structuring",
+            f"- HRA exemption (old regime): least of HRA received, rent paid minus {percent(hra['rent_excess_over_basic_share'])} "
+            f"of basic, and {percent(hra['metro_share'])} of basic in metros ({percent(hra['non_metro_share'])} elsewhere)",
+            f"- Employer NPS contribution, Section 80CCD(2): deductible up to {percent(nps['old'])} of basic (old regime), "
+            f"{percent(nps['new'])} (new regime)",
+            f"- Employer EPF, NPS and superannuation contributions above {rupees(salary['employer_retirement_limit'])} a year are taxable",
+            "",
+        ]
+
+    if rules.capital_gains:
+        lines.append("## Capital Gains Tax (by date of sale)")
+        for spec in rules.capital_gains.values():
+            lines.append(f"- {spec['label']}:")
+            for period in spec["periods"]:
+                months = period.get("long_term_months")
+                term = f"long-term if held more than {months} months" if months else "always short-term"
+                stcg = percent(period["stcg_rate"]) if period.get("stcg_rate") is not None else "slab rate"
+                ltcg = percent(period["ltcg_rate"]) if period.get("ltcg_rate") is not None else "slab rate"
+                lines.append(f"  * Sold from {period['from']}: {term}; STCG {stcg}" + (f", LTCG {ltcg}" if months else ""))
+            if spec.get("ltcg_exemption"):
+                lines.append(f"  * LTCG up to {rupees(spec['ltcg_exemption'])} a year exempt (Section {spec.get('exemption_section', '')})")
+        lines.append("")
+
+    lines.append("## Scheme Rates and Limits")
+    schemes = rules.schemes
+    if "epf" in schemes:
+        epf = schemes["epf"]
+        lines += [
+            f"- {epf['name']}:",
+            f"  * Employee contribution: {percent(epf['employee_rate'])} of Basic + DA",
+            f"  * Employer contribution: {percent(epf['employer_rate'])} of Basic + DA, of which "
+            f"{percent(epf['eps_rate'])} of wages up to {rupees(epf['eps_wage_ceiling'])} goes to the pension scheme (EPS)",
+            f"  * Current interest rate: {percent(epf['interest_rate'])} ({epf.get('rate_period', fy)})",
+            f"  * Tax status: {epf.get('tax_status', '')}",
+        ]
+    if "ppf" in schemes:
+        ppf = schemes["ppf"]
+        lines += [
+            f"- {ppf['name']}:",
+            f"  * Annual contribution: {rupees(ppf['min_annual'])} to {rupees(ppf['max_annual'])}",
+            f"  * Current interest rate: {percent(ppf['interest_rate'])} (compounded annually)",
+            f"  * Tenure: {ppf['tenure_years']} years (extendable)",
+            f"  * Loan facility: Available from year {ppf['loan_years'][0]} to year {ppf['loan_years'][1]}, up to "
+            f"{percent(ppf['loan_limit_share'])} of the balance two years earlier",
+            f"  * Partial withdrawal: Allowed from year {ppf['withdrawal_from_year']}, up to "
+            f"{percent(ppf['withdrawal_limit_share'])} of the lower of the balance four years earlier or last year",
+            f"  * Tax status: {ppf.get('tax_status', '')}",
+        ]
+    if "nps" in schemes:
+        nps = schemes["nps"]
+        lines += [
+            f"- {nps['name']}:",
+            f"  * Tier 1 (mandatory): Minimum {rupees(nps['tier1_min_monthly'])} monthly",
+            f"  * Tier 2 (voluntary): Minimum {rupees(nps['tier2_min'])}",
+            f"  * Asset classes: {', '.join(nps.get('asset_classes', []))}",
+            f"  * Withdrawal: {percent(nps['lump_sum_share'])} lump sum (tax-free) at retirement, "
+            f"{percent(nps['annuity_share'])} mandatory annuity",
+            f"  * Additional tax benefit: Up to {rupees(nps['extra_deduction'])} under Section 80CCD(1B)",
+        ]
+    if "vpf" in schemes:
+        lines.append(f"- {schemes['vpf']['name']}: {schemes['vpf']['description']}")
+    if "scss" in schemes:
+        scss = schemes["scss"]
+        lines += [
+            f"- {scss['name']}:",
+            f"  * Eligibility: {scss['min_age']} years and above; maximum investment {rupees(scss['max_investment'])}",
+            f"  * Current interest rate: {percent(scss['interest_rate'])} (paid quarterly)",
+            f"  * Tenure: {scss['tenure_years']} years (extendable by {scss['extension_years']} years)",
+            f"  * Tax benefit: {scss.get('tax_benefit', '')}",
+        ]
+    if "ssy" in schemes:
+        ssy = schemes["ssy"]
+        lines += [
+            f"- {ssy['name']}:",
+            f"  * For girl child below {ssy['max_girl_age']} years",
+            f"  * Current interest rate: {percent(ssy['interest_rate'])} (compounded annually)",
+            f"  * Annual deposit: {rupees(ssy['min_annual'])} to {rupees(ssy['max_annual'])}",
+            f"  * Deposits for {ssy['deposit_years']} years; maturity {ssy['maturity_years']} years from date of opening",
+            f"  * Tax status: {ssy.get('tax_status', '')}",
+        ]
+    return "\n".join(lines)
+
+
+def regulatory_instructions(agent=None) -> str:
+    """Agent ``instructions`` callable, so every run sees the latest loaded rates."""
+    return render_knowledge()
@@ -0,0 +1,310 @@
+import json
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+from rules import CompiledRules, rules_store
+from tax import old_regime_deductions, tax_liability, taxable_income
+
+# Default search grid, in percent: basic of CTC, HRA of basic, employer NPS of basic
+BASIC_PERCENTS = (30, 35, 40, 45, 50)
+HRA_PERCENTS = tuple(range(0, 55, 5))
+NPS_PERCENTS = (0, 2, 4, 6, 8, 10, 12, 14)
+# Extra 80C investment levels are searched in these steps up to the unused 80C room
+EXTRA_80C_STEP = 25_000
+
+
+def evaluate_structures(
+    ctc,
+    basic_share,
+    hra_share,
+    nps_share,
+    epf_capped,
+    extra_80c,
+    rent,
+    metro: bool = True,
+    other_80c: float = 0.0,
+    section_80d: float = 0.0,
+    section_80ccd_1b: float = 0.0,
+    section_24b: float = 0.0,
+    senior_citizen: bool = False,
+    rules: Optional[CompiledRules] = None,
+) -> Dict[str, np.ndarray]:
+    """Annual pay, exemptions and tax of salary structures under every regime, for broadcastable inputs.
+
+    CTC is split into basic, HRA, employer EPF (12% of basic, or of the EPF wage ceiling when
+    ``epf_capped``), employer NPS and a balancing special allowance; structures that do not fit
+    in the CTC are marked infeasible. Employer NPS is deductible under 80CCD(2) up to the
+    regime's share of basic, employer EPF and NPS above the annual limit are taxed as a
+    perquisite, and the HRA exemption and Chapter VI-A deductions (employee EPF counts towards
+    80C) apply in the old regime only. ``extra_80c`` is clipped to the 80C room left after
+    ``other_80c`` and each structure's employee EPF. Arrays come back with a leading regime axis.
+    """
+    rules = rules or rules_store.get()
+    salary, epf = rules.salary, rules.scheme("epf")
+    ctc, basic_share, hra_share, nps_share, epf_capped, extra_80c, rent = np.broadcast_arrays(
+        *(np.asarray(value, dtype=float) for value in (ctc, basic_share, hra_share, nps_share, epf_capped, extra_80c, rent))
+    )
+    basic = ctc * basic_share
+    hra = basic * hra_share
+    epf_wage = np.where(epf_capped > 0, np.minimum(basic, salary["epf_wage_ceiling_monthly"] * 12), basic)
+    employer_epf, employee_epf = epf_wage * epf["employer_rate"], epf_wage * epf["employee_rate"]
+    extra_80c = np.minimum(extra_80c, np.maximum(rules.deduction_limits["section_80c"] - other_80c - employee_epf, 0.0))
+    employer_nps = basic * nps_share
+    special = ctc - basic - hra - employer_epf - employer_nps
+    feasible = special >= -1e-6
+    special = np.maximum(special, 0.0)
+    perquisite = np.maximum(employer_epf + employer_nps - salary["employer_retirement_limit"], 0.0)
+    gross = basic + hra + special + employer_nps + perquisite
+
+    hra_rules = salary["hra_exemption"]
+    city_share = hra_rules["metro_share"] if metro else hra_rules["non_metro_share"]
+    hra_exempt = np.clip(np.minimum(rent - hra_rules["rent_excess_over_basic_share"] * basic, city_share * basic), 0.0, hra)
+    chapter_via = old_regime_deductions(
+        employee_epf + other_80c + extra_80c, section_80d, section_80ccd_1b, section_24b, senior_citizen=senior_citizen, rules=rules
+    )
+
+    results = {key: [] for key in ("hra_exemption", "deductions", "taxable_income", "base_tax", "surcharge", "cess", "total_tax")}
+    for name, regime in rules.regimes.items():
+        nps_deduction = np.minimum(employer_nps, salary["employer_nps_limit"][name] * basic)
+        exemption = hra_exempt if regime.allows_deductions else np.zeros_like(hra_exempt)
+        deductions = (chapter_via if regime.allows_deductions else 0.0) + nps_deduction
+        taxable = np.maximum(taxable_income(gross - exemption, regime, 0.0) - deductions, 0.0)
+        for key, value in tax_liability(taxable, regime).items():
+            results[key].append(value)
+        results["hra_exemption"].append(exemption)
+        results["deductions"].append(np.broadcast_to(deductions, taxable.shape))
+        results["taxable_income"].append(taxable)
+    stacked = {key: np.stack(values) for key, values in results.items()}
+    take_home = basic + hra + special - employee_epf - stacked["total_tax"] - extra_80c
+    return {
+        **stacked,
+        "regimes": np.array(list(rules.regimes)),
+        "feasible": feasible,
+        "basic": basic,
+        "hra": hra,
+        "special_allowance": special,
+        "employer_epf": employer_epf,
+        "employee_epf": employee_epf,
+        "extra_80c": extra_80c,
+        "employer_nps": employer_nps,
+        "taxable_perquisite": perquisite,
+        "gross_salary": gross,
+        "take_home": take_home,
+        "savings": employee_epf + employer_epf + employer_nps + extra_80c,
+    }
+
+
+def optimize_salary(
+    ctc: float,
+    rents: Sequence[float] = (0.0,),
+    metro: bool = True,
+    other_80c: float = 0.0,
+    section_80d: float = 0.0,
+    section_80ccd_1b: float = 0.0,
+    section_24b: float = 0.0,
+    savings_weight: float = 1.0,
+    basic_percents: Sequence[float] = BASIC_PERCENTS,
+    hra_percents: Sequence[float] = HRA_PERCENTS,
+    nps_percents: Sequence[float] = NPS_PERCENTS,
+    current: Optional[Dict[str, float]] = None,
+    senior_citizen: bool = False,
+    fiscal_year: Optional[str] = None,
+) -> Dict:
+    """Best salary structure and regime for every annual rent level, from one vectorized grid evaluation.
+
+    The grid covers basic share, HRA share, employer NPS share, EPF on full basic or on the
+    wage ceiling, and extra 80C investment, crossed with ``rents`` and both regimes. Structures
+    are ranked by take-home pay plus ``savings_weight`` times the money going into EPF, NPS and
+    80C investments (1 values it like cash, 0 maximizes cash in hand only); ties go to more cash.
+    ``current`` ({"basic_percent", "hra_percent", "nps_percent", "epf_capped"}) is evaluated for comparison;
+    an unknown HRA share is taken as the city's exemption share of basic (50% metro, 40% otherwise).
+    """
+    rules = rules_store.get(fiscal_year)
+    hra_rules = rules.salary["hra_exemption"]
+    city_hra_share = hra_rules["metro_share"] if metro else hra_rules["non_metro_share"]
+    room_80c = max(rules.deduction_limits["section_80c"] - other_80c, 0.0)
+    extra_levels = np.append(np.arange(0.0, room_80c, EXTRA_80C_STEP), room_80c)
+    axes = [
+        np.asarray(basic_percents, dtype=float) / 100,
+        np.asarray(hra_percents, dtype=float) / 100,
+        np.asarray(nps_percents, dtype=float) / 100,
+        np.array([0.0, 1.0]),
+        np.unique(extra_levels),
+        np.asarray(rents, dtype=float),
+    ]
+    grid = np.meshgrid(*axes, indexing="ij")
+    options = dict(
+        metro=metro,
+        other_80c=other_80c,
+        section_80d=section_80d,
+        section_80ccd_1b=section_80ccd_1b,
+        section_24b=section_24b,
+        senior_citizen=senior_citizen,
+        rules=rules,
+    )
+    result = evaluate_structures(ctc, *grid, **options)
+    value = result["take_home"] + savings_weight * result["savings"]
+    regimes = result["regimes"]
+    # (regime, structure, rent) layout: the best structure per rent is a search over the first two axes
+    rent_count = len(rents)
+    value = np.where(result["feasible"], value, -np.inf).reshape(len(regimes), -1, rent_count)
+    cash = result["take_home"].reshape(len(regimes), -1, rent_count)
+
+    def pick(name, regime, index, rent):
+        array = result[name]
+        if array.ndim == len(grid) + 1:
+            return float(array.reshape(len(regimes), -1, rent_count)[regime, index, rent])
+        return float(array.reshape(-1, rent_count)[index, rent])
+
+    def describe(regime, index, rent):
+        flat = np.unravel_index(index * rent_count + rent, grid[0].shape)
+        return {
+            "regime": str(regimes[regime]),
+            "basic_percent_of_ctc": round(axes[0][flat[0]] * 100, 1),
+            "hra_percent_of_basic": round(axes[1][flat[1]] * 100, 1),
+            "employer_nps_percent_of_basic": round(axes[2][flat[2]] * 100, 1),
+            "epf_on_wage_ceiling": bool(axes[3][flat[3]]),
+            "extra_80c_investment": round(pick("extra_80c", regime, index, rent), 2),
+            **{
+                name: round(pick(name, regime, index, rent), 2)
+                for name in (
+                    "basic",
+                    "hra",
+                    "special_allowance",
+                    "employer_epf",
+                    "employee_epf",
+                    "employer_nps",
+                    "taxable_perquisite",
+                    "gross_salary",
+                    "hra_exemption",
+                    "deductions",
+                    "taxable_income",
+                    "base_tax",
+                    "surcharge",
+                    "cess",
+                    "total_tax",
+                    "take_home",
+                    "savings",
+                )
+            },
+            "monthly_take_home": round(pick("take_home", regime, index, rent) / 12, 2),
+        }
+
+    per_rent = []
+    for rent in range(rent_count):
+        column, cash_column = value[:, :, rent], cash[:, :, rent]
+        order = np.lexsort((-cash_column.ravel(), -column.ravel()))
+        regime, index = np.unravel_index(order[0], column.shape)
+        entry = {"annual_rent": float(axes[5][rent]), "best": describe(regime, index, rent)}
+        entry["best_by_regime"] = {}
+        for r, name in enumerate(regimes):
+            best = int(np.lexsort((-cash_column[r], -column[r]))[0])
+            entry["best_by_regime"][str(name)] = {
+                "total_tax": round(pick("total_tax", r, best, rent), 2),
+                "monthly_take_home": round(pick("take_home", r, best, rent) / 12, 2),
+                "value": round(float(column[r, best]), 2),
+            }
+        entry["value"] = round(float(column[regime, index]), 2)
+        if current is not None:
+            now = evaluate_structures(
+                ctc,
+                current.get("basic_percent", 40) / 100,
+                current["hra_percent"] / 100 if "hra_percent" in current else city_hra_share,
+                current.get("nps_percent", 0) / 100,
+                float(current.get("epf_capped", False)),
+                0.0,
+                axes[5][rent],
+                **options,
+            )
+            now_value = now["take_home"] + savings_weight * now["savings"]
+            better = int(np.argmax(now_value))
+            entry["current"] = {
+                "regime": str(now["regimes"][better]),
+                "total_tax": round(float(now["total_tax"][better]), 2),
+                "monthly_take_home": round(float(now["take_home"][better]) / 12, 2),
+                "value": round(float(now_value[better]), 2),
+            }
+            entry["annual_gain_vs_current"] = round(entry["value"] - entry["current"]["value"], 2)
+        per_rent.append(entry)
+    return {
+        "fiscal_year": rules.fiscal_year,
+        "ctc": ctc,
+        "metro": metro,
+        "savings_weight": savings_weight,
+        "structures_evaluated": int(result["feasible"].sum()) * len(regimes),
+        "recommended": per_rent[0]["best"],
+        "by_rent": per_rent,
+    }
+
+
+class SalaryTools(Toolkit):
+    def __init__(self, fiscal_year: Optional[str] = None, **kwargs):
+        super().__init__(name="salary_structure", **kwargs)
+        self.fiscal_year = fiscal_year
+        self.register(self.optimize_salary_structure)
+
+    def optimize_salary_structure(
+        self,
+        annual_ctc: float,
+        monthly_rent: float = 0,
+        alternative_monthly_rents: Optional[List[float]] = None,
+        metro_city: bool = True,
+        other_80c: float = 0,
+        section_80d: float = 0,
+        section_80ccd_1b: float = 0,
+        home_loan_interest: float = 0,
+        savings_weight: float = 1,
+        current_basic_percent: float = -1,
+        current_hra_percent: float = -1,
+        current_employer_nps_percent: float = 0,
+        senior_citizen: bool = False,
+    ) -> str:
+        """Find the salary structure (basic, HRA, employer NPS, EPF on full basic or the wage ceiling, extra 80C)
+        and tax regime with the highest take-home for a given CTC, searching every combination under both regimes
+        at once, with the full tax computation. Use this instead of calculator chains for salary restructuring
+        and HRA questions.
+
+        Args:
+            annual_ctc (float): Annual cost to company in rupees.
+            monthly_rent (float): Rent the client pays per month (0 if none).
+            alternative_monthly_rents (List[float]): Other monthly rent levels to compare, e.g. when moving.
+            metro_city (bool): Whether the client lives in Delhi, Mumbai, Kolkata or Chennai (50% HRA rule).
+            other_80c (float): 80C investments besides employee EPF (PPF, ELSS, premiums, home loan principal).
+            section_80d (float): Health insurance premiums under 80D.
+            section_80ccd_1b (float): Own NPS contribution under 80CCD(1B).
+            home_loan_interest (float): Self-occupied home loan interest under Section 24(b).
+            savings_weight (float): How much each rupee into EPF/NPS/80C counts against cash in hand (1 = equal, 0 = cash only).
+            current_basic_percent (float): Current basic as percent of CTC, to compare against; -1 if unknown.
+            current_hra_percent (float): Current HRA as percent of basic; -1 if unknown (the city's usual 50% or 40%).
+            current_employer_nps_percent (float): Current employer NPS as percent of basic.
+            senior_citizen (bool): Whether the 80D senior citizen limit applies.
+
+        Returns:
+            str: JSON string with the recommended structure and regime (components, HRA exemption, deductions,
+            taxable income, tax breakdown, monthly take-home), the best per regime, and results per rent level.
+        """
+        rents = [monthly_rent, *(alternative_monthly_rents or [])]
+        current = None
+        if current_basic_percent >= 0:
+            current = {"basic_percent": current_basic_percent, "nps_percent": current_employer_nps_percent}
+            if current_hra_percent >= 0:
+                current["hra_percent"] = current_hra_percent
+        result = optimize_salary(
+            annual_ctc,
+            rents=[rent * 12 for rent in rents],
+            metro=metro_city,
+            other_80c=other_80c,
+            section_80d=section_80d,
+            section_80ccd_1b=section_80ccd_1b,
+            section_24b=home_loan_interest,
+            savings_weight=savings_weight,
+            current=current,
+            senior_citizen=senior_citizen,
+            fiscal_year=self.fiscal_year,
+        )
+        best = result["recommended"]
+        log_info(f"Evaluated {result['structures_evaluated']} salary structures for CTC {annual_ctc}: {best['regime']} regime best")
+        return json.dumps(result)
@@ -0,0 +1,300 @@
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+from rules import CompiledRules, rules_store
+
+# Monthly contributions credited at month end earn on average 5.5 of 12 months' interest in their year
+MID_YEAR_INTEREST = 5.5 / 12
+
+
+def _batch(*values) -> Tuple[np.ndarray, ...]:
+    return np.broadcast_arrays(*(np.atleast_1d(np.asarray(value, dtype=float)) for value in values))
+
+
+def _grid(years: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Projection years 1..H as a row vector, and the (clients, H) mask of years inside each client's horizon."""
+    t = np.arange(1, int(years.max(initial=0)) + 1)
+    return t, t <= years[:, None]
+
+
+def _accumulate(opening, contributions, rate, contribution_interest=1.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Year-end balances and interest for (clients, years) contributions at annual ``rate``.
+
+    ``contribution_interest`` is the share of a year's interest that year's contributions earn:
+    1 for deposits made at the start of the year, ``MID_YEAR_INTEREST`` for monthly ones.
+    """
+    balance = np.asarray(opening, dtype=float).copy()
+    rate = np.broadcast_to(np.asarray(rate, dtype=float), balance.shape)
+    balances, interest = np.zeros_like(contributions), np.zeros_like(contributions)
+    for year in range(contributions.shape[1]):
+        interest[:, year] = balance * rate + contributions[:, year] * rate * contribution_interest
+        balance = balance + contributions[:, year] + interest[:, year]
+        balances[:, year] = balance
+    return balances, interest
+
+
+def _at_horizon(values: np.ndarray, years: np.ndarray, opening: np.ndarray) -> np.ndarray:
+    index = years.astype(int) - 1
+    picked = np.take_along_axis(values, np.maximum(index, 0)[:, None], axis=1)[:, 0]
+    return np.where(index >= 0, picked, opening)
+
+
+def project_epf(
+    basic_monthly,
+    years,
+    salary_growth=0.0,
+    opening_balance=0.0,
+    vpf_rate=0.0,
+    interest_rate=None,
+    rules: Optional[CompiledRules] = None,
+) -> Dict[str, np.ndarray]:
+    """EPF (plus VPF) balances year by year for a batch of employees.
+
+    The employer's share excludes the EPS pension contribution on wages up to the EPS ceiling.
+    """
+    epf = (rules or rules_store.get()).scheme("epf")
+    basic, years, salary_growth, opening, vpf_rate = _batch(basic_monthly, years, salary_growth, opening_balance, vpf_rate)
+    rate = epf["interest_rate"] if interest_rate is None else interest_rate
+    t, active = _grid(years)
+    wages = basic[:, None] * (1 + salary_growth[:, None]) ** (t - 1)
+    pension = np.minimum(wages, epf["eps_wage_ceiling"]) * epf["eps_rate"] * 12 * active
+    employee = wages * (epf["employee_rate"] + vpf_rate[:, None]) * 12 * active
+    employer = wages * epf["employer_rate"] * 12 * active - pension
+    balance, interest = _accumulate(opening, employee + employer, rate, MID_YEAR_INTEREST)
+    return {
+        "employee": employee,
+        "employer": employer,
+        "pension_scheme": pension,
+        "interest": interest,
+        "balance": balance,
+        "final_balance": _at_horizon(balance, years, opening),
+    }
+
+
+def project_ppf(
+    annual_deposit,
+    years,
+    opening_balance=0.0,
+    years_completed=0,
+    interest_rate=None,
+    rules: Optional[CompiledRules] = None,
+) -> Dict[str, np.ndarray]:
+    """PPF balances with deposit limits, maturity, loan and partial-withdrawal windows.
+
+    Deposits are assumed before the 5th of April so they earn the full year's interest.
+    Beyond the initial tenure the account is assumed extended with contributions.
+    Withdrawal and loan limits use the projected history, with the opening balance
+    standing in for years before the projection starts.
+    """
+    ppf = (rules or rules_store.get()).scheme("ppf")
+    deposit, years, opening, completed = _batch(annual_deposit, years, opening_balance, years_completed)
+    rate = ppf["interest_rate"] if interest_rate is None else interest_rate
+    deposit = np.minimum(deposit, ppf["max_annual"])
+    t, active = _grid(years)
+    balance, interest = _accumulate(opening, deposit[:, None] * active, rate)
+
+    account_year = completed[:, None] + t
+    history = np.concatenate([opening[:, None], balance], axis=1)
+
+    def lag(k: int) -> np.ndarray:
+        return history[:, np.maximum(t - k, 0)]
+
+    loan_from, loan_to = ppf["loan_years"]
+    loan_window = (account_year >= loan_from) & (account_year <= loan_to)
+    withdrawal_window = account_year >= ppf["withdrawal_from_year"]
+    return {
+        "deposit": deposit[:, None] * active,
+        "interest": interest,
+        "balance": balance,
+        "account_year": account_year,
+        "max_loan": np.where(loan_window & active, lag(2) * ppf["loan_limit_share"], 0.0),
+        "max_withdrawal": np.where(
+            withdrawal_window & active, np.minimum(lag(4), lag(1)) * ppf["withdrawal_limit_share"], 0.0
+        ),
+        "matured": account_year >= ppf["tenure_years"],
+        "below_minimum_deposit": (deposit > 0) & (deposit < ppf["min_annual"]),
+        "final_balance": _at_horizon(balance, years, opening),
+    }
+
+
+def project_nps(
+    monthly_contribution,
+    years,
+    expected_return,
+    contribution_growth=0.0,
+    opening_balance=0.0,
+    annuity_rate=0.06,
+    rules: Optional[CompiledRules] = None,
+) -> Dict[str, np.ndarray]:
+    """NPS Tier 1 corpus, the lump-sum/annuity split at exit and the resulting pension."""
+    nps = (rules or rules_store.get()).scheme("nps")
+    monthly, years, expected_return, growth, opening, annuity_rate = _batch(
+        monthly_contribution, years, expected_return, contribution_growth, opening_balance, annuity_rate
+    )
+    t, active = _grid(years)
+    contributions = monthly[:, None] * 12 * (1 + growth[:, None]) ** (t - 1) * active
+    balance, interest = _accumulate(opening, contributions, expected_return, MID_YEAR_INTEREST)
+    corpus = _at_horizon(balance, years, opening)
+    annuity = corpus * nps["annuity_share"]
+    return {
+        "contribution": contributions,
+        "returns": interest,
+        "balance": balance,
+        "final_balance": corpus,
+        "lump_sum": corpus * nps["lump_sum_share"],
+        "annuity_corpus": annuity,
+        "monthly_pension": annuity * annuity_rate / 12,
+        "deduction_80ccd_1b": np.minimum(monthly * 12, nps["extra_deduction"]),
+        "below_minimum_contribution": (monthly > 0) & (monthly < nps["tier1_min_monthly"]),
+    }
+
+
+def project_ssy(
+    annual_deposit,
+    girl_age,
+    years_completed=0,
+    opening_balance=0.0,
+    interest_rate=None,
+    rules: Optional[CompiledRules] = None,
+) -> Dict[str, np.ndarray]:
+    """Sukanya Samriddhi balances from today to maturity; deposits stop after the deposit period."""
+    ssy = (rules or rules_store.get()).scheme("ssy")
+    deposit, age, completed, opening = _batch(annual_deposit, girl_age, years_completed, opening_balance)
+    rate = ssy["interest_rate"] if interest_rate is None else interest_rate
+    deposit = np.minimum(deposit, ssy["max_annual"])
+    years = np.maximum(ssy["maturity_years"] - completed, 0)
+    t, active = _grid(years)
+    account_year = completed[:, None] + t
+    deposits = deposit[:, None] * (active & (account_year <= ssy["deposit_years"]))
+    balance, interest = _accumulate(opening, deposits, rate)
+    return {
+        "deposit": deposits,
+        "interest": interest,
+        "balance": balance,
+        "account_year": account_year,
+        "years_to_maturity": years,
+        "maturity_age": age + years,
+        "eligible": age - completed < ssy["max_girl_age"],
+        "below_minimum_deposit": (deposit > 0) & (deposit < ssy["min_annual"]),
+        "final_balance": _at_horizon(balance, years, opening),
+    }
+
+
+def _milestones(years: int, *events: int) -> List[int]:
+    """Projection years worth reporting: every fifth year, scheme events and the last year."""
+    return sorted({year for year in (*range(5, years + 1, 5), *events, years) if 1 <= year <= years})
+
+
+class SchemeTools(Toolkit):
+    def __init__(self, fiscal_year: Optional[str] = None, **kwargs):
+        super().__init__(name="indian_schemes", **kwargs)
+        self.fiscal_year = fiscal_year
+        self.register(self.project_scheme_balances)
+
+    def project_scheme_balances(
+        self,
+        current_age: int,
+        retirement_age: int,
+        basic_monthly_salary: float = 0,
+        salary_growth_percent: float = 7,
+        epf_balance: float = 0,
+        vpf_percent: float = 0,
+        ppf_annual_deposit: float = 0,
+        ppf_balance: float = 0,
+        ppf_years_completed: int = 0,
+        nps_monthly_contribution: float = 0,
+        nps_balance: float = 0,
+        nps_return_percent: float = 10,
+        annuity_rate_percent: float = 6,
+        ssy_annual_deposit: float = 0,
+        ssy_daughter_age: int = 0,
+        ssy_balance: float = 0,
+        ssy_years_completed: int = 0,
+    ) -> str:
+        """Project EPF/VPF, PPF, NPS and Sukanya Samriddhi balances year by year using the current official rates
+        and scheme rules (contribution caps, EPS split, PPF maturity/loan/withdrawal windows, NPS 60/40 exit,
+        SSY deposit period). Use this for exact retirement-corpus figures from government schemes.
+
+        Args:
+            current_age (int): Client's current age.
+            retirement_age (int): Planned retirement age; EPF, PPF and NPS are projected until then.
+            basic_monthly_salary (float): Monthly Basic + DA for EPF; 0 if not an EPF member.
+            salary_growth_percent (float): Annual growth of Basic + DA and NPS contributions, in percent.
+            epf_balance (float): Current EPF balance.
+            vpf_percent (float): Voluntary PF contribution as a percent of Basic + DA.
+            ppf_annual_deposit (float): Yearly PPF deposit (capped at the PPF limit).
+            ppf_balance (float): Current PPF balance.
+            ppf_years_completed (int): Financial years the PPF account has completed.
+            nps_monthly_contribution (float): Current monthly NPS Tier 1 contribution.
+            nps_balance (float): Current NPS balance.
+            nps_return_percent (float): Expected annual NPS return, in percent.
+            annuity_rate_percent (float): Annuity rate used for the NPS pension, in percent.
+            ssy_annual_deposit (float): Yearly Sukanya Samriddhi deposit; 0 if no SSY account.
+            ssy_daughter_age (int): Daughter's current age.
+            ssy_balance (float): Current SSY balance.
+            ssy_years_completed (int): Years the SSY account has completed.
+
+        Returns:
+            str: JSON string with milestone balances per scheme, values at retirement or maturity, and the total corpus.
+        """
+        rules = rules_store.get(self.fiscal_year)
+        years = retirement_age - current_age
+        growth = salary_growth_percent / 100
+        result = {"fiscal_year": rules.fiscal_year, "years_to_retirement": years}
+        total = 0.0
+
+        def rows(projection: Dict[str, np.ndarray], keys: List[str], *events: int) -> List[Dict]:
+            last = projection["balance"].shape[1]
+            return [
+                {"year": year, "age": current_age + year, **{key: round(float(projection[key][0, year - 1]), 2) for key in keys}}
+                for year in _milestones(last, *events)
+            ]
+
+        if basic_monthly_salary > 0 or epf_balance > 0:
+            epf = project_epf(basic_monthly_salary, years, growth, epf_balance, vpf_percent / 100, rules=rules)
+            result["epf"] = {
+                "balance_at_retirement": round(float(epf["final_balance"][0]), 2),
+                "first_year_contribution": round(float(epf["employee"][0, 0] + epf["employer"][0, 0]), 2),
+                "milestones": rows(epf, ["balance"]),
+            }
+            total += float(epf["final_balance"][0])
+        if ppf_annual_deposit > 0 or ppf_balance > 0:
+            ppf = project_ppf(ppf_annual_deposit, years, ppf_balance, ppf_years_completed, rules=rules)
+            tenure = rules.scheme("ppf")["tenure_years"]
+            result["ppf"] = {
+                "balance_at_retirement": round(float(ppf["final_balance"][0]), 2),
+                "maturity_year": max(tenure - ppf_years_completed, 0),
+                "below_minimum_deposit": bool(ppf["below_minimum_deposit"][0]),
+                "milestones": rows(ppf, ["balance", "max_loan", "max_withdrawal"], tenure - ppf_years_completed),
+            }
+            total += float(ppf["final_balance"][0])
+        if nps_monthly_contribution > 0 or nps_balance > 0:
+            nps = project_nps(
+                nps_monthly_contribution, years, nps_return_percent / 100, growth, nps_balance, annuity_rate_percent / 100, rules=rules
+            )
+            result["nps"] = {
+                key: round(float(nps[key][0]), 2)
+                for key in ("final_balance", "lump_sum", "annuity_corpus", "monthly_pension", "deduction_80ccd_1b")
+            }
+            result["nps"]["milestones"] = rows(nps, ["balance"])
+            total += float(nps["final_balance"][0])
+        if ssy_annual_deposit > 0 or ssy_balance > 0:
+            ssy = project_ssy(ssy_annual_deposit, ssy_daughter_age, ssy_years_completed, ssy_balance, rules=rules)
+            result["ssy"] = {
+                "maturity_value": round(float(ssy["final_balance"][0]), 2),
+                "years_to_maturity": int(ssy["years_to_maturity"][0]),
+                "daughter_age_at_maturity": int(ssy["maturity_age"][0]),
+                "eligible": bool(ssy["eligible"][0]),
+                "milestones": [
+                    {"year": year, "daughter_age": ssy_daughter_age + year, "balance": round(float(ssy["balance"][0, year - 1]), 2)}
+                    for year in _milestones(int(ssy["years_to_maturity"][0]))
+                ],
+            }
+
+        result["retirement_corpus_from_schemes"] = round(total, 2)
+        log_info(f"Projected scheme balances over {years} years: {total:.2f} at retirement")
+        return json.dumps(result)
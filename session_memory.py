@@ -0,0 +1,229 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, Tuple
+
+from profile_parser import FinancialProfile, ProfileItem, label_key, parse_profile
+from reasoning_budget import CHARS_PER_TOKEN, estimate_tokens
+
+WHITESPACE_RE = re.compile(r"\s+")
+HEADING_RE = re.compile(r"^#{1,4}\s*(.+)$")
+KEY_FIGURE_RE = re.compile(r"\*\*[^*]+\*\*:?\s*[^\n]*\d")
+
+
+@dataclass
+class SessionBudget:
+    """Prompt limits for one session. Token counts use the same estimate as the reasoning budget."""
+
+    max_tokens: int = 3000
+    recent_turns: int = 4
+    summary_tokens: int = 800
+    turn_digest_chars: int = 240
+
+    @classmethod
+    def from_env(cls, prefix: str = "SESSION_") -> "SessionBudget":
+        defaults = cls()
+        return cls(
+            max_tokens=int(os.getenv(prefix + "MAX_TOKENS", defaults.max_tokens)),
+            recent_turns=int(os.getenv(prefix + "RECENT_TURNS", defaults.recent_turns)),
+            summary_tokens=int(os.getenv(prefix + "SUMMARY_TOKENS", defaults.summary_tokens)),
+            turn_digest_chars=int(os.getenv(prefix + "TURN_DIGEST_CHARS", defaults.turn_digest_chars)),
+        )
+
+
+@dataclass
+class Turn:
+    role: str
+    content: str
+    tokens: int = 0
+    ts: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        self.tokens = self.tokens or estimate_tokens(self.content)
+
+    def render(self) -> str:
+        return f"{self.role.title()}: {self.content}"
+
+
+def fact_key(item: ProfileItem) -> Tuple[str, str]:
+    """What a fact is about: its kind and normalized label, or the kind's total for a stated total.
+
+    Only an explicit restatement shares a key: "my salary is now" replaces "I earn" (both the
+    unqualified income) and "my rent went up to" replaces "rent", while "spouse earning" or
+    "car payment" and "credit card payment" stay separate facts.
+    """
+    return item.kind, "[total]" if item.is_total else label_key(item.label)
+
+
+def digest(turn: Turn, max_chars: int = 240) -> str:
+    """One-line extractive digest of a turn: the user's opening words, or an answer's headings and key figures."""
+    if turn.role == "user":
+        text = WHITESPACE_RE.sub(" ", turn.content).strip()
+    else:
+        lines = turn.content.splitlines()
+        headings = [match.group(1).strip() for match in map(HEADING_RE.match, lines) if match]
+        figures = [WHITESPACE_RE.sub(" ", line).strip(" -") for line in lines if KEY_FIGURE_RE.search(line)]
+        text = "; ".join(headings[:4] + figures[:4]) or WHITESPACE_RE.sub(" ", turn.content).strip()
+    if len(text) > max_chars:
+        text = text[: max_chars - 3].rstrip() + "..."
+    return f"{turn.role}: {text}"
+
+
+class SessionMemory:
+    """Conversation memory whose prompt size stays bounded as the session grows.
+
+    The last ``recent_turns`` turns are kept verbatim. Older turns are folded, one at a
+    time as they age out, into a rolling extractive summary (oldest lines dropped beyond
+    ``summary_tokens``) and into structured facts parsed with ``profile_parser``, where the
+    latest statement of each fact (see ``fact_key``) wins. Every step is constant work per
+    turn and no model call is involved, so follow-up latency does not grow with the conversation.
+    """
+
+    def __init__(self, session_id: str, budget: Optional[SessionBudget] = None):
+        self.session_id = session_id
+        self.budget = budget or SessionBudget()
+        self.recent: Deque[Turn] = deque()
+        self.summary: Deque[Tuple[str, int]] = deque()
+        self.summary_tokens = 0
+        self.facts: "OrderedDict[Tuple[str, str], ProfileItem]" = OrderedDict()
+        self.age: Optional[int] = None
+        self.retirement_age: Optional[int] = None
+        self.currency: Optional[str] = None
+        self.turns_seen = 0
+        self._lock = threading.Lock()
+
+    def add(self, role: str, content: str) -> None:
+        with self._lock:
+            turn = Turn(role, content or "")
+            if role == "user":
+                self._absorb_facts(turn.content)
+            self.recent.append(turn)
+            self.turns_seen += 1
+            while len(self.recent) > self.budget.recent_turns:
+                self._compact(self.recent.popleft())
+
+    def _absorb_facts(self, text: str) -> None:
+        profile = parse_profile(text)
+        self.age = profile.age or self.age
+        self.retirement_age = profile.retirement_age or self.retirement_age
+        if profile.items:
+            self.currency = profile.currency
+        for item in profile.items:
+            key = fact_key(item)
+            self.facts.pop(key, None)
+            self.facts[key] = item
+
+    def _compact(self, turn: Turn) -> None:
+        line = digest(turn, self.budget.turn_digest_chars)
+        tokens = estimate_tokens(line)
+        self.summary.append((line, tokens))
+        self.summary_tokens += tokens
+        while self.summary_tokens > self.budget.summary_tokens and len(self.summary) > 1:
+            _, dropped = self.summary.popleft()
+            self.summary_tokens -= dropped
+
+    def profile(self) -> FinancialProfile:
+        return FinancialProfile(
+            currency=self.currency or "USD",
+            age=self.age,
+            retirement_age=self.retirement_age,
+            items=list(self.facts.values()),
+        )
+
+    def context(self, user_input: str) -> str:
+        """Prompt for the next request: facts, rolling summary and recent turns, within the token budget.
+
+        When over budget the oldest summary lines go first, then the oldest verbatim turns are
+        reduced to digests, then the least recently stated facts are dropped; the new request is
+        always kept.
+        """
+        with self._lock:
+            profile = self.profile()
+            summary = [line for line, _ in self.summary]
+            recent = list(self.recent)
+
+        facts = profile.summary() if profile.items or profile.age else ""
+        recent_parts = [turn.render() for turn in recent]
+
+        def assemble() -> str:
+            blocks = []
+            if facts:
+                blocks.append(f"Facts from earlier in this conversation (latest statement wins):\n{facts}")
+            if summary:
+                blocks.append("Summary of earlier conversation:\n" + "\n".join(f"- {line}" for line in summary))
+            if recent_parts:
+                blocks.append("Recent conversation:\n" + "\n\n".join(recent_parts))
+            if not blocks:
+                return user_input
+            blocks.append(f"Current request:\n{user_input}")
+            return "\n\n".join(blocks)
+
+        def over() -> int:
+            return estimate_tokens(assemble()) - self.budget.max_tokens
+
+        while summary and over() > 0:
+            summary.pop(0)
+        for i, turn in enumerate(recent[:-1]):
+            if over() <= 0:
+                break
+            recent_parts[i] = digest(turn, self.budget.turn_digest_chars)
+        while profile.items and over() > 0:
+            profile.items.pop(0)
+            facts = profile.summary() if profile.items or profile.age else ""
+        excess = over()
+        if recent_parts and excess > 0:
+            # Last resort: cut the newest turn down to whatever budget remains
+            keep = max(len(recent_parts[-1]) - (excess + 2) * CHARS_PER_TOKEN, 0)
+            recent_parts[-1] = recent_parts[-1][:keep].rstrip() + " [...]"
+        return assemble()
+
+    def stats(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "turns_seen": self.turns_seen,
+            "recent_turns": len(self.recent),
+            "summary_lines": len(self.summary),
+            "facts": len(self.facts),
+        }
+
+
+class SessionStore:
+    """Sessions by id, evicting the least recently used beyond ``max_sessions``."""
+
+    def __init__(self, budget: Optional[SessionBudget] = None, max_sessions: int = 1024):
+        self.budget = budget or SessionBudget.from_env()
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, SessionMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> SessionMemory:
+        with self._lock:
+            memory = self.sessions.get(session_id)
+            if memory is None:
+                memory = self.sessions[session_id] = SessionMemory(session_id, self.budget)
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            return memory
+
+
+session_store = SessionStore()
+
+
+def session_prompt(session_id: Optional[str], user_input: str, prompt: Optional[str] = None) -> str:
+    """Wrap ``prompt`` (default: the raw input) with the session's compacted history and record the user turn."""
+    prompt = user_input if prompt is None else prompt
+    if not session_id:
+        return prompt
+    memory = session_store.get(session_id)
+    context = memory.context(prompt)
+    memory.add("user", user_input)
+    return context
+
+
+def record_reply(session_id: Optional[str], content: Optional[str]) -> None:
+    if session_id and content:
+        session_store.get(session_id).add("assistant", content)
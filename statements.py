@@ -0,0 +1,519 @@
+import codecs
+import csv
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from anomalies import AnomalyDetector, anomaly_detector, monthly_outliers
+from categorizer import CATEGORIES, UNCATEGORIZED, Categorizer, default_categorizer, merchant_key
+from forecast import forecast_categories, forecast_summary
+from profile_parser import CURRENCY_SYMBOLS, format_amount
+from recurring import RecurringDetector
+
+CHUNK_SIZE = 64 * 1024
+# Lines scanned for a header row before giving up on a CSV (bank exports often start with a preamble)
+MAX_PREAMBLE_LINES = 50
+
+DATE_HEADERS = ("transaction date", "txn date", "posting date", "posted date", "value date", "date")
+DESCRIPTION_HEADERS = ("description", "narration", "transaction details", "details", "particulars", "payee", "merchant", "memo", "remarks", "name")
+AMOUNT_HEADERS = ("amount", "transaction amount", "amt")
+DEBIT_HEADERS = ("withdrawal amt.", "withdrawal amount", "withdrawal", "withdrawals", "debit amount", "debit", "dr", "money out", "paid out")
+CREDIT_HEADERS = ("deposit amt.", "deposit amount", "deposit", "deposits", "credit amount", "credit", "cr", "money in", "paid in")
+TYPE_HEADERS = ("type", "transaction type", "dr/cr", "cr/dr", "debit/credit")
+CATEGORY_HEADERS = ("category",)
+
+ISO_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d", "%Y-%m-%dT%H:%M:%S")
+DAY_FIRST_FORMATS = ("%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%m-%y")
+MONTH_FIRST_FORMATS = ("%m/%d/%Y", "%m-%d-%Y", "%m/%d/%y", "%m-%d-%y")
+NAMED_MONTH_FORMATS = ("%d-%b-%Y", "%d %b %Y", "%d-%b-%y", "%d %b %y", "%b %d, %Y", "%d %B %Y", "%B %d, %Y")
+
+# Distinct unmatched merchants whose totals are kept aside so a later model pass can re-bucket them
+MAX_UNMATCHED_MERCHANTS = 500
+
+# Bank-supplied category names that match ours; any other value is re-classified
+BANK_CATEGORIES = {category.lower(): category for category in CATEGORIES}
+
+AMOUNT_RE = re.compile(r"[^\d.\-]")
+OFX_TRANSACTION_RE = re.compile(r"<STMTTRN>(.*?)</STMTTRN>", re.IGNORECASE | re.DOTALL)
+OFX_FIELD_RE = re.compile(r"<(\w+)>([^<\r\n]*)")
+OFX_CURRENCY_RE = re.compile(r"<CURDEF>\s*([A-Za-z]{3})", re.IGNORECASE)
+
+
+@dataclass
+class Transaction:
+    """One statement row; ``amount`` is signed, negative for money leaving the account."""
+
+    date: date
+    description: str
+    amount: float
+    category: Optional[str] = None
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """Parse a statement amount: currency symbols, thousands separators, "(1.00)" and trailing Dr/Cr."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    lowered = text.lower()
+    negative = (lowered.startswith("(") and lowered.endswith(")")) or lowered.endswith("dr")
+    number = AMOUNT_RE.sub("", lowered.removesuffix("dr").removesuffix("cr"))
+    if number in ("", "-", ".", "-."):
+        return None
+    try:
+        value = float(number)
+    except ValueError:
+        return None
+    return -abs(value) if negative else value
+
+
+def detect_currency(text: str) -> Optional[str]:
+    lowered = text.lower()
+    for symbol, currency in CURRENCY_SYMBOLS.items():
+        if len(symbol) == 1 and symbol in lowered:
+            return currency
+    return None
+
+
+class DateParser:
+    """Parse the dates of one statement, which all share a single format.
+
+    Until a date only one format can read (``13/01/2024``, ``2024-01-05``) locks the file's
+    format, ambiguous dates such as ``03/04/2024`` are read day first or month first as
+    ``dayfirst`` says. Once locked, text in any other format is not a date, so the row is
+    skipped instead of silently switching formats mid-file. Statements repeat the same few
+    dates over and over, so parsed values are cached; the cache is bounded and simply reset
+    when full.
+    """
+
+    def __init__(self, dayfirst: bool = True, cache_size: int = 4096):
+        numeric = DAY_FIRST_FORMATS + MONTH_FIRST_FORMATS if dayfirst else MONTH_FIRST_FORMATS + DAY_FIRST_FORMATS
+        self.formats = ISO_FORMATS + numeric + NAMED_MONTH_FORMATS
+        self.format: Optional[str] = None
+        self.cache: Dict[str, Optional[date]] = {}
+        self.cache_size = cache_size
+
+    def __call__(self, text: str) -> Optional[date]:
+        text = (text or "").strip()
+        if text not in self.cache:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[text] = self._parse(text)
+        return self.cache[text]
+
+    def _parse(self, text: str) -> Optional[date]:
+        if self.format is not None:
+            try:
+                return datetime.strptime(text, self.format).date()
+            except ValueError:
+                return None
+        matches = []
+        for fmt in self.formats:
+            try:
+                matches.append((fmt, datetime.strptime(text, fmt).date()))
+            except ValueError:
+                continue
+        if not matches:
+            return None
+        if len(matches) == 1:
+            self.format = matches[0][0]
+            # Dates cached before the lock may have been read in another format
+            self.cache.clear()
+        return matches[0][1]
+
+
+def _find_column(header: List[str], names: Tuple[str, ...]) -> Optional[int]:
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+class CsvStatementParser:
+    """Incremental CSV parser: text goes in as it arrives, complete rows come out as transactions.
+
+    Only the current partial line (or a quoted field spanning lines) is buffered, so memory
+    does not depend on the file size. Columns are found from the header row; a single signed
+    amount column, separate debit/credit columns, and a Dr/Cr type column are all understood.
+    """
+
+    def __init__(self, dayfirst: bool = True):
+        self.parse_date = DateParser(dayfirst)
+        self.pending = ""
+        self.columns: Optional[Dict[str, Optional[int]]] = None
+        self.lines_seen = 0
+        self.skipped = 0
+        self.currency: Optional[str] = None
+
+    def feed(self, text: str) -> Iterator[Transaction]:
+        self.pending += text
+        *lines, self.pending = self.pending.split("\n")
+        yield from self._lines(lines)
+
+    def close(self) -> Iterator[Transaction]:
+        lines, self.pending = [self.pending], ""
+        yield from self._lines(lines)
+        if self.columns is None:
+            raise ValueError("No header row with date and amount columns was found in the CSV statement")
+
+    def _lines(self, lines: List[str]) -> Iterator[Transaction]:
+        record = ""
+        for line in lines:
+            record = f"{record}\n{line}" if record else line
+            # A quoted field containing a newline keeps the record open until its quote closes
+            if record.count('"') % 2:
+                continue
+            row, record = next(csv.reader([record]), []), ""
+            if not any(cell.strip() for cell in row):
+                continue
+            transaction = self._row(row)
+            if transaction is not None:
+                yield transaction
+        if record:
+            self.pending = record + "\n" + self.pending
+
+    def _row(self, row: List[str]) -> Optional[Transaction]:
+        if self.columns is None:
+            self.lines_seen += 1
+            self.columns = self._header(row)
+            if self.columns is None and self.lines_seen >= MAX_PREAMBLE_LINES:
+                raise ValueError("No header row with date and amount columns was found in the CSV statement")
+            return None
+
+        def cell(name: str) -> str:
+            index = self.columns[name]
+            return row[index].strip() if index is not None and index < len(row) else ""
+
+        when = self.parse_date(cell("date"))
+        if self.columns["amount"] is not None:
+            amount = parse_amount(cell("amount"))
+            kind = cell("type").lower()
+            if amount is not None and kind.startswith(("dr", "debit", "withdrawal")):
+                amount = -abs(amount)
+            elif amount is not None and kind.startswith(("cr", "credit", "deposit")):
+                amount = abs(amount)
+        else:
+            debit, credit = parse_amount(cell("debit")), parse_amount(cell("credit"))
+            amount = None if debit is None and credit is None else abs(credit or 0.0) - abs(debit or 0.0)
+        if when is None or amount is None:
+            self.skipped += 1
+            return None
+        if self.currency is None:
+            self.currency = detect_currency(cell("amount") or cell("debit") or cell("credit"))
+        return Transaction(when, cell("description"), amount, cell("category") or None)
+
+    @staticmethod
+    def _header(row: List[str]) -> Optional[Dict[str, Optional[int]]]:
+        header = [cell.strip().lower() for cell in row]
+        columns = {
+            "date": _find_column(header, DATE_HEADERS),
+            "description": _find_column(header, DESCRIPTION_HEADERS),
+            "amount": _find_column(header, AMOUNT_HEADERS),
+            "debit": _find_column(header, DEBIT_HEADERS),
+            "credit": _find_column(header, CREDIT_HEADERS),
+            "type": _find_column(header, TYPE_HEADERS),
+            "category": _find_column(header, CATEGORY_HEADERS),
+        }
+        has_amount = columns["amount"] is not None or columns["debit"] is not None or columns["credit"] is not None
+        return columns if columns["date"] is not None and has_amount else None
+
+
+class OfxStatementParser:
+    """Incremental OFX/QFX parser that emits each ``<STMTTRN>`` block once it has fully arrived.
+
+    Handles both the SGML flavour (unclosed field tags) and XML; only the text after the last
+    complete transaction block is buffered.
+    """
+
+    def __init__(self):
+        self.pending = ""
+        self.skipped = 0
+        self.currency: Optional[str] = None
+
+    def feed(self, text: str) -> Iterator[Transaction]:
+        self.pending += text
+        if self.currency is None:
+            match = OFX_CURRENCY_RE.search(self.pending)
+            self.currency = match.group(1).upper() if match else None
+        end = 0
+        for match in OFX_TRANSACTION_RE.finditer(self.pending):
+            end = match.end()
+            transaction = self._transaction(match.group(1))
+            if transaction is None:
+                self.skipped += 1
+            else:
+                yield transaction
+        if end:
+            self.pending = self.pending[end:]
+        else:
+            # Keep only from the start of an unfinished block (or a possible partial tag) onwards
+            start = self.pending.upper().rfind("<STMTTRN>")
+            self.pending = self.pending[start:] if start >= 0 else self.pending[-len("<STMTTRN>"):]
+
+    def close(self) -> Iterator[Transaction]:
+        self.pending = ""
+        return iter(())
+
+    @staticmethod
+    def _transaction(block: str) -> Optional[Transaction]:
+        fields = {name.upper(): value.strip() for name, value in OFX_FIELD_RE.findall(block)}
+        posted = fields.get("DTPOSTED", "")[:8]
+        amount = parse_amount(fields.get("TRNAMT", ""))
+        try:
+            when = datetime.strptime(posted, "%Y%m%d").date()
+        except ValueError:
+            return None
+        if amount is None:
+            return None
+        description = " ".join(part for part in (fields.get("NAME"), fields.get("MEMO")) if part)
+        return Transaction(when, description or fields.get("TRNTYPE", ""), amount)
+
+
+@dataclass
+class MonthlyTotals:
+    """Running per-month, per-category totals; size grows with months x categories, never with rows."""
+
+    currency: str = "USD"
+    transactions: int = 0
+    skipped: int = 0
+    first_date: Optional[date] = None
+    last_date: Optional[date] = None
+    income: Dict[str, float] = field(default_factory=dict)
+    spending: Dict[str, float] = field(default_factory=dict)
+    categories: Dict[Tuple[str, str], List[float]] = field(default_factory=dict)
+    unmatched: Dict[Tuple[str, str], List[float]] = field(default_factory=dict)
+    unmatched_merchants: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, transaction: Transaction, category: Optional[str]) -> None:
+        """Fold one transaction in; ``None`` means no rule matched and the row is filed under "Other"."""
+        month = transaction.date.strftime("%Y-%m")
+        self.transactions += 1
+        self.first_date = min(self.first_date or transaction.date, transaction.date)
+        self.last_date = max(self.last_date or transaction.date, transaction.date)
+        totals = self.income if transaction.amount > 0 else self.spending
+        totals[month] = totals.get(month, 0.0) + abs(transaction.amount)
+        if category is None:
+            category = UNCATEGORIZED
+            key = merchant_key(transaction.description)
+            if key and (key in self.unmatched_merchants or len(self.unmatched_merchants) < MAX_UNMATCHED_MERCHANTS):
+                self.unmatched_merchants[key] = self.unmatched_merchants.get(key, 0) + 1
+                entry = self.unmatched.setdefault((month, key), [0.0, 0])
+                entry[0] += transaction.amount
+                entry[1] += 1
+        entry = self.categories.setdefault((month, category), [0.0, 0])
+        entry[0] += transaction.amount
+        entry[1] += 1
+
+    def reassign(self, merchants: Dict[str, str]) -> int:
+        """Move the "Other" totals of resolved merchants to their categories; returns the rows moved."""
+        moved = 0
+        for (month, key), (total, count) in list(self.unmatched.items()):
+            category = merchants.get(key)
+            if not category or category == UNCATEGORIZED:
+                continue
+            source = self.categories[(month, UNCATEGORIZED)]
+            source[0] -= total
+            source[1] -= count
+            if not source[1]:
+                del self.categories[(month, UNCATEGORIZED)]
+            target = self.categories.setdefault((month, category), [0.0, 0])
+            target[0] += total
+            target[1] += count
+            del self.unmatched[(month, key)]
+            self.unmatched_merchants.pop(key, None)
+            moved += count
+        return moved
+
+    @property
+    def months(self) -> List[str]:
+        return sorted({month for month, _ in self.categories})
+
+    def category_totals(self) -> Dict[str, Dict[str, float]]:
+        """Net outflow per category per month (refunds reduce spending), income categories excluded."""
+        table: Dict[str, Dict[str, float]] = {}
+        for (month, category), (total, _) in self.categories.items():
+            if category != "Income" and total < 0:
+                table.setdefault(category, {})[month] = -total
+        return table
+
+    def to_dict(self) -> Dict:
+        return {
+            "currency": self.currency,
+            "transactions": self.transactions,
+            "skipped_rows": self.skipped,
+            "unmatched_merchants": len(self.unmatched_merchants),
+            "first_date": self.first_date.isoformat() if self.first_date else None,
+            "last_date": self.last_date.isoformat() if self.last_date else None,
+            "months": [
+                {
+                    "month": month,
+                    "income": round(self.income.get(month, 0.0), 2),
+                    "spending": round(self.spending.get(month, 0.0), 2),
+                }
+                for month in self.months
+            ],
+            "categories": {
+                category: {month: round(value, 2) for month, value in sorted(months.items())}
+                for category, months in sorted(self.category_totals().items())
+            },
+        }
+
+    def summary(self, max_categories: int = 12, recent_months: int = 6) -> str:
+        """Prompt-ready digest of the aggregates; individual transactions never appear in it."""
+        months = self.months
+        if not months:
+            return "Bank statement summary: no transactions could be read from the uploaded file."
+        count = len(months)
+        income = sum(self.income.values()) / count
+        spending = sum(self.spending.values()) / count
+        lines = [
+            f"Bank statement summary ({self.transactions} transactions, {self.first_date} to {self.last_date}, "
+            f"{count} months, amounts in {self.currency}):",
+            f"- Average monthly income {format_amount(income, self.currency)}, spending "
+            f"{format_amount(spending, self.currency)}, net {format_amount(income - spending, self.currency)}",
+        ]
+        table = self.category_totals()
+        ranked = sorted(table.items(), key=lambda item: -sum(item[1].values()))
+        if ranked:
+            lines.append("Spending by category (monthly average, share of spending, latest month):")
+            total_spending = sum(sum(values.values()) for values in table.values()) or 1.0
+            shown = ranked[:max_categories]
+            rest = ranked[max_categories:]
+            if rest:
+                merged: Dict[str, float] = {}
+                for _, values in rest:
+                    for month, value in values.items():
+                        merged[month] = merged.get(month, 0.0) + value
+                shown.append((f"{len(rest)} other categories", merged))
+            for category, values in shown:
+                lines.append(
+                    f"- {category}: {format_amount(sum(values.values()) / count, self.currency)}/mo "
+                    f"({sum(values.values()) / total_spending:.0%}), {months[-1]} "
+                    f"{format_amount(values.get(months[-1], 0.0), self.currency)}"
+                )
+        lines.append("Recent months (income / spending / net):")
+        for month in months[-recent_months:]:
+            month_income, month_spending = self.income.get(month, 0.0), self.spending.get(month, 0.0)
+            lines.append(
+                f"- {month}: {format_amount(month_income, self.currency)} / {format_amount(month_spending, self.currency)}"
+                f" / {format_amount(month_income - month_spending, self.currency)}"
+            )
+        if count < 3:
+            lines.append("Note: fewer than 3 months of history; treat averages as indicative.")
+        return "\n".join(lines)
+
+
+class StatementReader:
+    """Feed raw statement bytes chunk by chunk; aggregates are updated as each row completes.
+
+    The format (CSV or OFX) is sniffed from the first chunk, bytes are decoded incrementally
+    so multi-byte characters split across chunks survive, and each transaction is folded into
+    ``MonthlyTotals``, the ``RecurringDetector`` and the ``AnomalyDetector`` and then
+    discarded. With a ``user_id`` the shared per-user anomaly statistics are updated, but
+    only with rows whose (date, amount, description) fingerprint earlier uploads have not
+    already fed them as often, so uploading the same (or an overlapping) statement again does
+    not count rows twice while a second account or card covering the same dates still counts;
+    anonymous uploads get a detector of their own. A category column from the bank is used
+    only when it names one of ``CATEGORIES``.
+    """
+
+    def __init__(
+        self,
+        filename: str = "",
+        currency: Optional[str] = None,
+        dayfirst: bool = True,
+        categorizer: Optional[Categorizer] = None,
+        user_id: Optional[str] = None,
+    ):
+        self.filename = filename.lower()
+        self.currency = currency
+        self.dayfirst = dayfirst
+        self.categorizer = categorizer or default_categorizer
+        self.user_id = user_id
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self.parser = None
+        self.totals = MonthlyTotals(currency=currency or "USD")
+        self.recurring = RecurringDetector()
+        self.anomalies = anomaly_detector if user_id else AnomalyDetector()
+        self.anomaly_user = user_id or "statement"
+        self.fingerprints: Counter = Counter()
+
+    def _parser_for(self, text: str):
+        head = text.lstrip()[:512].upper()
+        if self.filename.endswith((".ofx", ".qfx")) or head.startswith(("OFXHEADER", "<?XML", "<OFX")) or "<OFX>" in head:
+            return OfxStatementParser()
+        return CsvStatementParser(self.dayfirst)
+
+    def feed(self, chunk: bytes) -> None:
+        self._consume(self.decoder.decode(chunk))
+
+    def close(self, fallback: bool = False) -> MonthlyTotals:
+        """Finish parsing; with ``fallback`` the unmatched merchants are classified by the model in one batch."""
+        self._consume(self.decoder.decode(b"", final=True))
+        if self.parser is not None:
+            self._fold(self.parser.close())
+            self.totals.skipped = self.parser.skipped
+            self.totals.currency = self.currency or self.parser.currency or self.totals.currency
+        if self.fingerprints:
+            self.anomalies.mark_observed(self.anomaly_user, self.fingerprints)
+        if fallback and self.totals.unmatched_merchants:
+            self.totals.reassign(self.categorizer.resolve(self.totals.unmatched_merchants))
+        return self.totals
+
+    def _consume(self, text: str) -> None:
+        if not text:
+            return
+        if self.parser is None:
+            self.parser = self._parser_for(text)
+        self._fold(self.parser.feed(text))
+
+    def _fold(self, transactions: Iterable[Transaction]) -> None:
+        for transaction in transactions:
+            category = BANK_CATEGORIES.get((transaction.category or "").strip().lower()) or self.categorizer.classify(
+                transaction.description, transaction.amount, self.user_id
+            )
+            self.totals.add(transaction, category)
+            self.recurring.add(transaction.date, transaction.description, transaction.amount, category)
+            fingerprint = (transaction.date, round(transaction.amount, 2), " ".join(transaction.description.lower().split()))
+            self.fingerprints[fingerprint] += 1
+            if self.fingerprints[fingerprint] <= self.anomalies.times_observed(self.anomaly_user, fingerprint):
+                continue
+            self.anomalies.observe(
+                self.anomaly_user, category, transaction.date, transaction.amount, transaction.description
+            )
+
+
+def read_statement(
+    chunks: Iterable[bytes],
+    filename: str = "",
+    currency: Optional[str] = None,
+    dayfirst: bool = True,
+    categorizer: Optional[Categorizer] = None,
+    user_id: Optional[str] = None,
+    fallback: bool = False,
+) -> MonthlyTotals:
+    reader = StatementReader(filename, currency, dayfirst, categorizer, user_id)
+    for chunk in chunks:
+        reader.feed(chunk)
+    return reader.close(fallback)
+
+
+def statement_prompt(reader: StatementReader, user_input: str = "") -> str:
+    """Budget-agent prompt built from the reader's aggregates and precomputed flags only."""
+    totals = reader.totals
+    request = user_input or "Analyze my spending from this bank statement and suggest a budget with concrete savings."
+    blocks = [request, totals.summary(), reader.recurring.table(totals.currency)]
+    blocks.append(reader.anomalies.summary(reader.anomaly_user, totals.currency))
+    outliers = monthly_outliers(totals.category_totals())
+    if outliers:
+        blocks.append(
+            "Unusually high category months (vs. the category's median month):\n"
+            + "\n".join(
+                f"- {item['month']} {item['category']}: {format_amount(item['amount'], totals.currency)} "
+                f"(median {format_amount(item['typical'], totals.currency)})"
+                for item in outliers
+            )
+        )
+    blocks.append(forecast_summary(forecast_categories(totals.category_totals()), totals.currency))
+    return "\n\n".join(block for block in blocks if block)
@@ -0,0 +1,276 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+from loans import emi
+from profile_parser import FinancialProfile
+
+HORIZON_MONTHS = 24
+JOB_LOSS_MONTHS = (3, 6, 12)
+# Medical events as multiples of monthly expenses when no amounts are given
+MEDICAL_EXPENSE_MONTHS = (3, 6, 12)
+RATE_HIKES = (0.02, 0.05)
+DRAWDOWNS = (0.20, 0.30, 0.50)
+
+LIQUID_WORDS = ("cash", "saving", "bank", "emergency", "fd", "fixed deposit", "deposit", "liquid", "money market")
+MARKET_WORDS = ("equity", "stock", "share", "mutual fund", "mf", "fund", "portfolio", "investment", "401", "ira", "etf", "brokerage")
+# Retirement balances locked until retirement (NPS, EPF, PPF) cannot fund a shock, whatever else the label says
+LOCKED_WORDS = ("nps", "national pension", "pension", "epf", "ppf", "provident")
+HOME_LOAN_WORDS = ("home", "housing", "mortgage")
+EMI_WORDS = ("emi", "loan", "mortgage")
+
+
+@dataclass(frozen=True)
+class StressProfile:
+    """Cash flows and balances a stress test starts from; rates are decimals, ``None`` when unknown."""
+
+    monthly_income: float
+    monthly_expenses: float
+    liquid_assets: float = 0.0
+    market_assets: float = 0.0
+    monthly_debt_payments: float = 0.0
+    home_loan_balance: float = 0.0
+    home_loan_rate: Optional[float] = None
+    home_loan_months: int = 240
+    floating_rate: bool = True
+    health_cover: float = 0.0
+
+    @classmethod
+    def from_profile(cls, profile: FinancialProfile, **overrides) -> "StressProfile":
+        """Split parsed assets into liquid and market buckets by label and find a home loan; overrides win."""
+
+        def labelled(kind: str, words: Sequence[str]):
+            return [item for item in profile.of_kind(kind) if any(word in item.label.lower() for word in words)]
+
+        locked = labelled("asset", LOCKED_WORDS)
+        liquid = [item for item in labelled("asset", LIQUID_WORDS) if item not in locked]
+        market = [item for item in labelled("asset", MARKET_WORDS) if item not in liquid and item not in locked]
+        # Assets matching neither list (property, gold, vehicles) are not treated as spendable
+        home_loans = labelled("debt", HOME_LOAN_WORDS)
+        rated = [item for item in home_loans if item.rate is not None]
+        values = {
+            "monthly_income": profile.monthly_income,
+            "monthly_expenses": profile.monthly_expenses,
+            "liquid_assets": sum(item.amount for item in liquid),
+            "market_assets": sum(item.amount for item in market),
+            "monthly_debt_payments": sum(item.monthly or 0.0 for item in labelled("expense", EMI_WORDS)),
+            "home_loan_balance": sum(item.amount for item in home_loans),
+            "home_loan_rate": rated[0].rate / 100 if rated else None,
+            "health_cover": sum(item.amount for item in profile.of_kind("cover") if "health" in item.label.lower()),
+        }
+        values.update({key: value for key, value in overrides.items() if value is not None})
+        if not values["monthly_income"] and not values["monthly_expenses"]:
+            raise ValueError("The profile states neither income nor expenses; nothing to stress-test")
+        return cls(**values)
+
+
+@dataclass
+class ShockSet:
+    """Scenarios as arrays: income multiplier and extra monthly outflow per (scenario, month); one-off cost
+    (paid in month 1) and market drawdown per scenario."""
+
+    names: List[str]
+    kinds: List[str]
+    income_factor: np.ndarray
+    extra_outflow: np.ndarray
+    one_off: np.ndarray
+    drawdown: np.ndarray
+    # Shocks that could not be built, and why
+    notes: List[str] = field(default_factory=list)
+
+
+def build_shocks(
+    base: StressProfile,
+    horizon: int = HORIZON_MONTHS,
+    job_loss_months: Sequence[int] = JOB_LOSS_MONTHS,
+    income_loss_share: float = 1.0,
+    medical_costs: Optional[Sequence[float]] = None,
+    rate_hikes: Sequence[float] = RATE_HIKES,
+    drawdowns: Sequence[float] = DRAWDOWNS,
+) -> ShockSet:
+    """The shock library applied to ``base``: baseline, job loss, medical (with/without cover), rate hike,
+    market drawdown, and a combined recession (longest job loss plus the deepest drawdown)."""
+    if medical_costs is None:
+        medical_costs = [base.monthly_expenses * months for months in MEDICAL_EXPENSE_MONTHS]
+    names, kinds, factors, extras, one_offs, drops, notes = [], [], [], [], [], [], []
+
+    def add(name: str, kind: str, factor=1.0, extra: float = 0.0, one_off: float = 0.0, drop: float = 0.0) -> None:
+        names.append(name)
+        kinds.append(kind)
+        factors.append(np.broadcast_to(np.asarray(factor, dtype=float), (horizon,)))
+        extras.append(np.full(horizon, extra))
+        one_offs.append(one_off)
+        drops.append(drop)
+
+    months = np.arange(horizon)
+    add("baseline", "baseline")
+    for duration in job_loss_months:
+        add(f"job loss {duration} months", "job_loss", np.where(months < duration, 1 - income_loss_share, 1.0))
+    for cost in medical_costs:
+        add(f"medical expense {cost:,.0f} uninsured", "medical", one_off=cost)
+        if base.health_cover > 0:
+            add(f"medical expense {cost:,.0f} after cover", "medical", one_off=max(cost - base.health_cover, 0.0))
+    if base.home_loan_balance > 0 and base.floating_rate and rate_hikes and base.home_loan_rate is None:
+        notes.append("Home loan rate unknown: rate-hike shocks were skipped; give the current rate to include them")
+    elif base.home_loan_balance > 0 and base.floating_rate:
+        current = float(emi(base.home_loan_balance, base.home_loan_rate, base.home_loan_months))
+        for hike in rate_hikes:
+            increase = float(emi(base.home_loan_balance, base.home_loan_rate + hike, base.home_loan_months)) - current
+            add(f"home loan rate +{hike:.0%}", "rate_hike", extra=increase)
+    for drop in drawdowns:
+        add(f"market drawdown {drop:.0%}", "drawdown", drop=drop)
+    if job_loss_months and drawdowns:
+        duration, drop = max(job_loss_months), max(drawdowns)
+        add(
+            f"recession: job loss {duration} months + drawdown {drop:.0%}",
+            "combined",
+            np.where(months < duration, 1 - income_loss_share, 1.0),
+            drop=drop,
+        )
+    return ShockSet(names, kinds, np.vstack(factors), np.vstack(extras), np.asarray(one_offs), np.asarray(drops), notes)
+
+
+def _first_month(mask: np.ndarray) -> np.ndarray:
+    """1-based month of the first True in each row, 0 where there is none."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1) + 1, 0)
+
+
+def run_stress_test(base: StressProfile, shocks: ShockSet) -> Dict:
+    """Evaluate every shock over the horizon in one vectorized pass.
+
+    Each month, income (scaled by the shock) minus expenses and any shock outflow is added to
+    liquid savings; once those are used up the deficit is drawn from market assets, valued after
+    the drawdown. Reported per shock: month liquid savings run out, month all spendable assets
+    run out (first failure), runway at the shock's worst monthly deficit, the lowest combined
+    balance and the unfunded shortfall.
+    """
+    income = base.monthly_income * shocks.income_factor
+    net = income - base.monthly_expenses - shocks.extra_outflow
+    cumulative = np.cumsum(net, axis=1) - shocks.one_off[:, None]
+    liquid = base.liquid_assets + cumulative
+    market = base.market_assets * (1 - shocks.drawdown)
+    total = liquid + market[:, None]
+
+    liquid_out = _first_month(liquid < 0)
+    failure = _first_month(total < 0)
+    # Runway: months the spendable assets left after any one-off cost last at the worst monthly deficit
+    deficit = np.maximum(-net.min(axis=1), 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        runway = np.where(deficit > 0, np.maximum(base.liquid_assets + market - shocks.one_off, 0.0) / deficit, np.inf)
+
+    horizon = net.shape[1]
+    results = []
+    for i, name in enumerate(shocks.names):
+        results.append(
+            {
+                "shock": name,
+                "kind": shocks.kinds[i],
+                "liquid_savings_exhausted_month": int(liquid_out[i]) or None,
+                "first_failure_month": int(failure[i]) or None,
+                "survives_horizon": not failure[i],
+                "runway_months": round(float(runway[i]), 1) if np.isfinite(runway[i]) else None,
+                "lowest_balance": round(float(total[i].min()), 2),
+                "shortfall": round(float(max(-total[i].min(), 0.0)), 2),
+                "balance_at_horizon": round(float(total[i, -1]), 2),
+                "market_loss": round(float(base.market_assets * shocks.drawdown[i]), 2),
+                "one_off_cost": round(float(shocks.one_off[i]), 2),
+            }
+        )
+    expenses = max(base.monthly_expenses, 1e-9)
+    return {
+        "profile": asdict(base),
+        "horizon_months": horizon,
+        "indicators": {
+            "basic_survival_ratio_months": round(base.liquid_assets / expenses, 1),
+            "income_replacement_months": round((base.liquid_assets + base.market_assets) / expenses, 1),
+            "debt_service_ratio": round(base.monthly_debt_payments / base.monthly_income, 3) if base.monthly_income else None,
+            "monthly_surplus": round(base.monthly_income - base.monthly_expenses, 2),
+        },
+        "shocks": results,
+        "failing_shocks": [row["shock"] for row in results if not row["survives_horizon"]],
+        "notes": shocks.notes,
+    }
+
+
+class StressTestTools(Toolkit):
+    def __init__(self, **kwargs):
+        super().__init__(name="stress_test", **kwargs)
+        self.register(self.stress_test_finances)
+
+    def stress_test_finances(
+        self,
+        monthly_income: float,
+        monthly_expenses: float,
+        liquid_savings: float,
+        market_investments: float = 0,
+        monthly_debt_payments: float = 0,
+        home_loan_balance: float = 0,
+        home_loan_rate_percent: float = -1,
+        home_loan_years_left: int = 20,
+        floating_rate: bool = True,
+        health_cover: float = 0,
+        job_loss_months: Optional[List[int]] = None,
+        income_loss_percent: float = 100,
+        medical_costs: Optional[List[float]] = None,
+        rate_hike_percents: Optional[List[float]] = None,
+        drawdown_percents: Optional[List[float]] = None,
+        horizon_months: int = HORIZON_MONTHS,
+    ) -> str:
+        """Apply a library of financial shocks (job loss for several durations, medical bills with and without
+        health cover, floating home-loan rate hikes, market drawdowns and a combined recession) to the client's
+        cash flow and balances. Returns the month savings run out, the first failure month and runway per shock.
+
+        Args:
+            monthly_income (float): Take-home income per month.
+            monthly_expenses (float): All monthly outgoings, including current EMIs.
+            liquid_savings (float): Cash, savings accounts, FDs and emergency fund.
+            market_investments (float): Equity, mutual funds and other market-linked investments (not NPS, EPF or PPF).
+            monthly_debt_payments (float): Total EMIs included in monthly_expenses (for the debt service ratio).
+            home_loan_balance (float): Outstanding home loan.
+            home_loan_rate_percent (float): Current home loan rate in percent; -1 if unknown (rate hikes are then skipped).
+            home_loan_years_left (int): Remaining home loan tenure in years.
+            floating_rate (bool): Whether the home loan rate floats (rate hikes only apply if true).
+            health_cover (float): Health insurance sum insured.
+            job_loss_months (List[int]): Durations of income loss to test, e.g. [3, 6, 12].
+            income_loss_percent (float): Share of income lost during a job loss, in percent.
+            medical_costs (List[float]): Medical bills to test; default 3, 6 and 12 months of expenses.
+            rate_hike_percents (List[float]): Home loan rate increases in percentage points, e.g. [2, 5].
+            drawdown_percents (List[float]): Market falls in percent, e.g. [20, 30, 50].
+            horizon_months (int): Months to simulate.
+
+        Returns:
+            str: JSON string with vulnerability indicators and, for every shock, the month liquid savings are
+            exhausted, the first failure month (all spendable assets gone), runway months and shortfall, plus
+            notes on shocks that were skipped.
+        """
+        base = StressProfile(
+            monthly_income=monthly_income,
+            monthly_expenses=monthly_expenses,
+            liquid_assets=liquid_savings,
+            market_assets=market_investments,
+            monthly_debt_payments=monthly_debt_payments,
+            home_loan_balance=home_loan_balance,
+            home_loan_rate=home_loan_rate_percent / 100 if home_loan_rate_percent >= 0 else None,
+            home_loan_months=home_loan_years_left * 12,
+            floating_rate=floating_rate,
+            health_cover=health_cover,
+        )
+        try:
+            shocks = build_shocks(
+                base,
+                horizon_months,
+                JOB_LOSS_MONTHS if job_loss_months is None else job_loss_months,
+                income_loss_percent / 100,
+                medical_costs,
+                RATE_HIKES if rate_hike_percents is None else [percent / 100 for percent in rate_hike_percents],
+                DRAWDOWNS if drawdown_percents is None else [percent / 100 for percent in drawdown_percents],
+            )
+        except ValueError as e:
+            return json.dumps({"error": str(e)})
+        result = run_stress_test(base, shocks)
+        log_info(f"Stress-tested {len(shocks.names)} shocks: {len(result['failing_shocks'])} fail within {horizon_months} months")
+        return json.dumps(result)
@@ -0,0 +1,243 @@
+import json
+from typing import Dict, Optional
+
+import numpy as np
+from agno.tools import Toolkit
+from agno.utils.log import log_info
+
+from rules import CompiledRules, TaxRegime, rules_store
+
+
+def slab_tax(taxable_income, regime: TaxRegime) -> np.ndarray:
+    """Tax before rebate, surcharge and cess for any array of taxable incomes."""
+    income = np.asarray(taxable_income, dtype=float)
+    portions = np.clip(income[..., None] - regime.slab_floors, 0, regime.slab_ceilings - regime.slab_floors)
+    return portions @ regime.slab_rates
+
+
+def tax_liability(taxable_income, regime: TaxRegime) -> Dict[str, np.ndarray]:
+    """Vectorized tax with 87A rebate, surcharge (both with marginal relief) and cess."""
+    income = np.maximum(np.asarray(taxable_income, dtype=float), 0)
+    base = slab_tax(income, regime)
+    base = np.where(income <= regime.rebate_income_limit, np.maximum(base - regime.rebate_max, 0), base)
+    if regime.rebate_marginal_relief:
+        # Just above the rebate limit, tax cannot exceed the income above the limit
+        base = np.where(income > regime.rebate_income_limit, np.minimum(base, income - regime.rebate_income_limit), base)
+
+    # Surcharge applies to income strictly above each threshold
+    bracket = np.searchsorted(regime.surcharge_thresholds, income, side="left") - 1
+    has_surcharge = bracket >= 0
+    safe_bracket = np.maximum(bracket, 0)
+    rate = np.where(has_surcharge, regime.surcharge_rates[safe_bracket], 0.0)
+    with_surcharge = base * (1 + rate)
+
+    # Marginal relief: the extra tax cannot exceed the income above the threshold
+    threshold = regime.surcharge_thresholds[safe_bracket]
+    previous_rate = np.where(bracket >= 1, regime.surcharge_rates[np.maximum(bracket - 1, 0)], 0.0)
+    capped = slab_tax(threshold, regime) * (1 + previous_rate) + (income - threshold)
+    with_surcharge = np.where(has_surcharge, np.minimum(with_surcharge, capped), with_surcharge)
+
+    surcharge = with_surcharge - base
+    cess = with_surcharge * regime.cess_rate
+    return {"base_tax": base, "surcharge": surcharge, "cess": cess, "total_tax": with_surcharge + cess}
+
+
+def old_regime_deductions(
+    section_80c=0.0,
+    section_80d=0.0,
+    section_80ccd_1b=0.0,
+    section_24b=0.0,
+    other_deductions=0.0,
+    senior_citizen: bool = False,
+    rules: Optional[CompiledRules] = None,
+) -> np.ndarray:
+    """Total allowable Chapter VI-A and Section 24(b) deductions, capped per section."""
+    limits = (rules or rules_store.get()).deduction_limits
+    limit_80d = limits["section_80d_senior" if senior_citizen else "section_80d"]
+    return (
+        np.minimum(section_80c, limits["section_80c"])
+        + np.minimum(section_80d, limit_80d)
+        + np.minimum(section_80ccd_1b, limits["section_80ccd_1b"])
+        + np.minimum(section_24b, limits["section_24b"])
+        + np.asarray(other_deductions, dtype=float)
+    )
+
+
+def taxable_income(gross_income, regime: TaxRegime, deductions=0.0) -> np.ndarray:
+    gross = np.asarray(gross_income, dtype=float)
+    if not regime.allows_deductions:
+        deductions = 0.0
+    return np.maximum(gross - regime.standard_deduction - deductions, 0)
+
+
+def compare_regimes(
+    gross_income: float, senior_citizen: bool = False, fiscal_year: Optional[str] = None, **deductions
+) -> Dict:
+    """Tax under both regimes for one salaried taxpayer, with the cheaper regime recommended."""
+    rules = rules_store.get(fiscal_year)
+    allowed = float(old_regime_deductions(senior_citizen=senior_citizen, rules=rules, **deductions))
+    result = {"fiscal_year": rules.fiscal_year, "gross_income": gross_income, "old_regime_deductions": allowed}
+    for name, regime in rules.regimes.items():
+        taxable = taxable_income(gross_income, regime, allowed)
+        breakdown = tax_liability(taxable, regime)
+        result[name] = {"taxable_income": float(taxable), **{key: round(float(value), 2) for key, value in breakdown.items()}}
+    old_tax, new_tax = result["old"]["total_tax"], result["new"]["total_tax"]
+    result["recommended_regime"] = "old" if old_tax < new_tax else "new"
+    result["savings_vs_other_regime"] = round(abs(old_tax - new_tax), 2)
+    return result
+
+
+def optimize_deductions(
+    gross_income: float,
+    investable_budget: Optional[float] = None,
+    current_80c: float = 0.0,
+    current_80d: float = 0.0,
+    current_80ccd_1b: float = 0.0,
+    section_24b: float = 0.0,
+    other_deductions: float = 0.0,
+    senior_citizen: bool = False,
+    step: float = 5_000,
+    fiscal_year: Optional[str] = None,
+) -> Dict:
+    """Find the regime and extra 80C/80D/80CCD(1B) mix with the lowest tax.
+
+    Every combination of top-up levels (in ``step`` increments from the current amount up to
+    each section cap) is evaluated in one NumPy pass. Combinations whose extra outlay
+    exceeds ``investable_budget`` are discarded; ties go to the cheaper mix.
+    """
+    rules = rules_store.get(fiscal_year)
+    limits, old_regime = rules.deduction_limits, rules.regimes["old"]
+    caps = (limits["section_80c"], limits["section_80d_senior" if senior_citizen else "section_80d"], limits["section_80ccd_1b"])
+    currents = [min(current, cap) for current, cap in zip((current_80c, current_80d, current_80ccd_1b), caps)]
+    axes = [np.append(np.arange(current, cap, step), cap) for current, cap in zip(currents, caps)]
+    grid_80c, grid_80d, grid_nps = (axis.ravel() for axis in np.meshgrid(*axes, indexing="ij"))
+    extra_outlay = (grid_80c - currents[0]) + (grid_80d - currents[1]) + (grid_nps - currents[2])
+
+    deductions = old_regime_deductions(
+        grid_80c, grid_80d, grid_nps, section_24b, other_deductions, senior_citizen=senior_citizen, rules=rules
+    )
+    old_tax = tax_liability(taxable_income(gross_income, old_regime, deductions), old_regime)["total_tax"]
+    feasible = np.ones_like(old_tax, dtype=bool) if investable_budget is None else extra_outlay <= investable_budget + 1e-6
+    # Lexicographic (tax, outlay) ordering among feasible combinations
+    order = np.lexsort((extra_outlay, np.where(feasible, old_tax, np.inf)))
+    best = order[0]
+
+    current_old = compare_regimes(
+        gross_income,
+        senior_citizen=senior_citizen,
+        fiscal_year=rules.fiscal_year,
+        section_80c=current_80c,
+        section_80d=current_80d,
+        section_80ccd_1b=current_80ccd_1b,
+        section_24b=section_24b,
+        other_deductions=other_deductions,
+    )
+    new_tax = current_old["new"]["total_tax"]
+    best_old_tax = round(float(old_tax[best]), 2)
+    return {
+        "fiscal_year": rules.fiscal_year,
+        "gross_income": gross_income,
+        "combinations_evaluated": int(old_tax.size),
+        "current": {"old_regime_tax": current_old["old"]["total_tax"], "new_regime_tax": new_tax},
+        "optimal_old_regime_mix": {
+            "section_80c": round(float(grid_80c[best]), 2),
+            "section_80d": round(float(grid_80d[best]), 2),
+            "section_80ccd_1b": round(float(grid_nps[best]), 2),
+            "extra_investment_needed": round(float(extra_outlay[best]), 2),
+            "old_regime_tax": best_old_tax,
+        },
+        "recommended_regime": "old" if best_old_tax < new_tax else "new",
+        "tax_saved_vs_current_best": round(
+            min(current_old["old"]["total_tax"], new_tax) - min(best_old_tax, new_tax), 2
+        ),
+    }
+
+
+class TaxTools(Toolkit):
+    def __init__(self, compare: bool = True, optimize: bool = True, fiscal_year: Optional[str] = None, **kwargs):
+        super().__init__(name="indian_tax", **kwargs)
+        self.fiscal_year = fiscal_year
+
+        if compare:
+            self.register(self.compare_tax_regimes)
+        if optimize:
+            self.register(self.optimize_tax_deductions)
+
+    def compare_tax_regimes(
+        self,
+        gross_income: float,
+        section_80c: float = 0,
+        section_80d: float = 0,
+        section_80ccd_1b: float = 0,
+        home_loan_interest: float = 0,
+        other_deductions: float = 0,
+        senior_citizen: bool = False,
+    ) -> str:
+        """Compute exact income tax for the current fiscal year under the old and new regimes, including standard deduction,
+        87A rebate, surcharge with marginal relief and 4% cess. Use this instead of calculator chains.
+
+        Args:
+            gross_income (float): Annual gross salary income in rupees.
+            section_80c (float): 80C investments (EPF, PPF, ELSS, premiums, principal), capped at ₹1.5 lakh.
+            section_80d (float): Health insurance premiums under 80D.
+            section_80ccd_1b (float): Additional NPS contribution under 80CCD(1B), capped at ₹50,000.
+            home_loan_interest (float): Self-occupied home loan interest under Section 24(b), capped at ₹2 lakh.
+            other_deductions (float): Any other old-regime deductions (80E, 80G, 80TTA, HRA exemption...).
+            senior_citizen (bool): Whether the 80D senior citizen limit applies.
+
+        Returns:
+            str: JSON string with the tax breakdown under both regimes and the recommended regime.
+        """
+        result = compare_regimes(
+            gross_income,
+            senior_citizen=senior_citizen,
+            fiscal_year=self.fiscal_year,
+            section_80c=section_80c,
+            section_80d=section_80d,
+            section_80ccd_1b=section_80ccd_1b,
+            section_24b=home_loan_interest,
+            other_deductions=other_deductions,
+        )
+        log_info(f"Compared tax regimes for income {gross_income}: {result['recommended_regime']} regime is cheaper")
+        return json.dumps(result)
+
+    def optimize_tax_deductions(
+        self,
+        gross_income: float,
+        investable_budget: float = -1,
+        current_80c: float = 0,
+        current_80d: float = 0,
+        current_80ccd_1b: float = 0,
+        home_loan_interest: float = 0,
+        other_deductions: float = 0,
+        senior_citizen: bool = False,
+    ) -> str:
+        """Search all combinations of extra 80C, 80D and 80CCD(1B) investments at once and return the
+        tax-minimizing mix and regime, given how much extra the client can invest this year.
+
+        Args:
+            gross_income (float): Annual gross salary income in rupees.
+            investable_budget (float): Extra money available for tax-saving investments this year; -1 for no limit.
+            current_80c (float): 80C investments already made.
+            current_80d (float): 80D premiums already paid.
+            current_80ccd_1b (float): NPS 80CCD(1B) contributions already made.
+            home_loan_interest (float): Section 24(b) home loan interest.
+            other_deductions (float): Any other old-regime deductions.
+            senior_citizen (bool): Whether the 80D senior citizen limit applies.
+
+        Returns:
+            str: JSON string with the optimal deduction mix, its tax, and the recommended regime.
+        """
+        result = optimize_deductions(
+            gross_income,
+            investable_budget=None if investable_budget < 0 else investable_budget,
+            current_80c=current_80c,
+            current_80d=current_80d,
+            current_80ccd_1b=current_80ccd_1b,
+            section_24b=home_loan_interest,
+            other_deductions=other_deductions,
+            senior_citizen=senior_citizen,
+            fiscal_year=self.fiscal_year,
+        )
+        log_info(f"Evaluated {result['combinations_evaluated']} deduction combinations for income {gross_income}")
+        return json.dumps(result)
@@ -4,10 +4,27 @@ from textwrap import dedent
 from agno.agent import Agent
 from agno.models.anthropic import Claude
 from agno.tools.calculator import CalculatorTools
-from agno.tools.reasoning import ReasoningTools
+from capital_gains import CapitalGainsTools
+from decision_tree import DecisionTreeTools
+from goals import GoalTools
+from income_buffer import IncomeBufferTools
+from insurance import InsuranceTools
+from loans import LoanTools
+from profile_parser import with_profile
+from reasoning_budget import BudgetedReasoningTools, ReasoningBudget
+from retirement import RetirementTools
+from returns import ReturnsTools
+from rules import regulatory_instructions
+from salary import SalaryTools
+from schemes import SchemeTools
+from stress_test import StressTestTools
+from tax import TaxTools
 
 today = datetime.now().strftime("%Y-%m-%d")
 
+# Bounds the think/analyze loop so complex plans cannot stall before writing an answer
+reasoning_tools = BudgetedReasoningTools(add_instructions=True, budget=ReasoningBudget.from_env())
+
 
 
 # More flexible approach that focuses on thinking frameworks rather than rigid templates
@@ -75,7 +92,8 @@ Calculate and track these vulnerability indicators:
 - Income Replacement Timeline: Assets ÷ Monthly expenses (in months)
 
 ### 3. Financial Resilience Stress Testing
-Evaluate ability to withstand financial shocks:
+Evaluate ability to withstand financial shocks (run `stress_test_finances` for exact runway months and
+first-failure points instead of estimating them):
 - Income Disruption (3, 6, 12 months)
 - Major Medical Event (with and without insurance)
 - Property Loss or Damage
@@ -100,7 +118,8 @@ For each major decision, develop three scenarios:
 - Aggressive Scenario: Emphasizing opportunity and growth
 
 ### 2. Decision Tree Analysis
-For complex decisions with multiple outcomes:
+For complex decisions with multiple outcomes (run `evaluate_decision_tree` for NPV, expected value and
+downside risk of every path instead of calculating them by hand):
 - Map out decision points and possible outcomes
 - Assign probabilities to each outcome
 - Calculate expected value of different paths
@@ -151,82 +170,13 @@ Instead of rigidly following a template, adapt your response structure based on:
 Remember to match the structure and approach to the specific client and situation rather than forcing every response into the same template. Use your reasoning tools to decide which frameworks are most appropriate for each unique financial situation.
 """
 
-# The knowledge base can be stored in a separate file and imported
-# For demonstration, it's included here
+# Tax slabs, deduction limits and scheme rates live in the versioned rules store (rules/) and
+# are rendered into the instructions on every run, so rate updates need no code change
 
 INDIAN_FINANCIAL_KNOWLEDGE = """
 # Indian Financial Planning Knowledge Base
 
-## Tax Structure
-- Income Tax Slabs (FY 2024-25, Old Regime):
-  * Up to ₹2.5 lakhs: Nil
-  * ₹2.5-5 lakhs: 5%
-  * ₹5-10 lakhs: 20%
-  * Above ₹10 lakhs: 30%
-  * Surcharge: 10% (income > ₹50 lakhs), 15% (> ₹1 crore), 25% (> ₹2 crores), 37% (> ₹5 crores)
-  * Cess: 4% Health and Education Cess on total tax liability
-
-- Income Tax Slabs (FY 2024-25, New Regime):
-  * Up to ₹3 lakhs: Nil
-  * ₹3-6 lakhs: 5%
-  * ₹6-9 lakhs: 10%
-  * ₹9-12 lakhs: 15%
-  * ₹12-15 lakhs: 20%
-  * Above ₹15 lakhs: 30%
-
-## Tax Deductions & Exemptions
-- Section 80C: Up to ₹1.5 lakhs (EPF, PPF, ELSS, Insurance premium, etc.)
-- Section 80D: Health Insurance (up to ₹25,000 for self/family, ₹50,000 for senior citizens)
-- Section 80CCD(1B): Additional ₹50,000 for NPS contributions
-- Section 80EEA: Additional ₹1.5 lakhs for first-time home buyers (loan interest)
-- Section 80TTA: Interest on savings account up to ₹10,000
-- Section 80TTB: For senior citizens, interest income up to ₹50,000
-- Section 80G: Donations to specified charities (50-100% deduction)
-- Section 24: Home loan interest deduction up to ₹2 lakhs for self-occupied property
-
-## Retirement Planning Vehicles
-- Employees' Provident Fund (EPF):
-  * Employee contribution: 12% of Basic + DA
-  * Employer contribution: 12% of Basic + DA
-  * Current interest rate: 8.15% (2023-24)
-  * Tax status: EEE (Exempt-Exempt-Exempt)
-
-- Public Provident Fund (PPF):
-  * Minimum annual contribution: ₹500
-  * Maximum annual contribution: ₹1.5 lakhs
-  * Current interest rate: 7.1% (compounded annually)
-  * Tenure: 15 years (extendable)
-  * Loan facility: Available from 3rd to 6th year
-  * Partial withdrawal: Allowed from 7th year
-
-- National Pension System (NPS):
-  * Tier 1 (mandatory): Minimum ₹500 monthly
-  * Tier 2 (voluntary): Minimum ₹1,000
-  * Asset classes: Equity (E), Corporate Bonds (C), Government Securities (G), Alternative Investment (A)
-  * Withdrawal: 60% lump sum (tax-free) at retirement, 40% mandatory annuity
-  * Additional tax benefit: Up to ₹50,000 under Section 80CCD(1B)
-
-- Voluntary Provident Fund (VPF):
-  * Extension of EPF with same interest rate
-  * No upper limit on contribution
-  * Same tax benefits as EPF
-
-- Senior Citizen Saving Scheme (SCSS):
-  * Eligibility: 60 years and above
-  * Maximum investment: ₹30 lakhs
-  * Current interest rate: 8.2% (paid quarterly)
-  * Tenure: 5 years (extendable by 3 years)
-  * Tax benefit: Under Section 80C
-
 ## Education Planning
-- Sukanya Samriddhi Yojana (SSY):
-  * For girl child below 10 years
-  * Current interest rate: 8.2% (compounded annually)
-  * Minimum annual deposit: ₹250
-  * Maximum annual deposit: ₹1.5 lakhs
-  * Maturity: 21 years from date of opening
-  * Tax status: EEE (fully tax-exempt)
-
 - Education Loan:
   * Interest rates: 8.35% - 11.25% (domestic education)
   * Interest rates: 9.60% - 12.50% (foreign education)
@@ -528,7 +478,7 @@ financial professionals before implementation.
 agent = Agent(
     model=Claude(id="claude-3-7-sonnet-latest"),
     tools=[
-        ReasoningTools(add_instructions=True),  # Add reasoning capabilities
+        reasoning_tools,  # Add reasoning capabilities
          CalculatorTools(
             add=True,
             subtract=True,
@@ -538,7 +488,20 @@ agent = Agent(
             factorial=True,
             is_prime=True,
             square_root=True,
-        )],
+        ),
+        TaxTools(),
+        GoalTools(),
+        LoanTools(),
+        RetirementTools(),
+        SchemeTools(),
+        IncomeBufferTools(),
+        StressTestTools(),
+        DecisionTreeTools(),
+        ReturnsTools(),
+        CapitalGainsTools(),
+        SalaryTools(),
+        InsuranceTools(),
+    ],
     description=dedent(f"""\
         You are the Indian Financial Planning Agent, a specialized AI that focuses exclusively on 
         developing comprehensive, long-term financial plans aligned with life goals and changing 
@@ -569,6 +532,8 @@ agent = Agent(
            - Establish timeframes for short, medium, and long-term goals
            - Create financial milestones aligned with life stages in Indian society
            - Balance competing priorities across different life domains
+           - Use `plan_goal_funding` to get the monthly saving each goal needs and how the available
+             surplus covers them by priority, instead of computing each goal with the calculator
            - Document values-based objectives that drive financial decisions
 
         2. Perform comprehensive financial situation analysis:
@@ -576,14 +541,19 @@ agent = Agent(
            - Determine current savings rate and cash flow position
            - Project income growth trajectory based on career path and Indian salary trends
            - Map current financial assets to future goals
+           - Use `calculate_returns` for the exact XIRR, CAGR and real return of existing SIPs, mutual funds,
+             FDs and EPF/PPF balances instead of estimating them
            - Identify potential financial vulnerabilities and risks in Indian context
            - Evaluate current insurance coverage against protection needs
 
         3. Develop retirement planning strategy:
            - Calculate projected retirement needs based on desired lifestyle in Indian context
            - Determine optimal savings rates using EPF, PPF, NPS and other instruments
+           - Use `project_scheme_balances` for exact EPF/VPF, PPF, NPS and SSY balances at current official rates
            - Recommend retirement account allocation strategies with tax considerations
            - Project retirement income from various sources including government schemes
+           - Run `simulate_retirement` to get the probability the corpus lasts and percentile bands,
+             and report the gap/surplus from its median rather than a single fixed-return projection
            - Create withdrawal strategy recommendations for retirement phase
            - Suggest phased retirement options if appropriate
 
@@ -609,15 +579,22 @@ agent = Agent(
            - Develop financial independence timelines and milestones
 
         7. Implement tax optimization strategies:
-           - Analyze current tax situation under old vs. new regime
+           - Analyze current tax situation under old vs. new regime (use `compare_tax_regimes` and
+             `optimize_tax_deductions` for exact figures rather than step-by-step calculator calls)
            - Identify unused tax deductions and exemptions under Indian tax code
+           - For salary restructuring (basic, HRA, employer NPS, EPF wage ceiling) run `optimize_salary_structure`
+             once; it searches every split and rent level under both regimes with the full tax computation
            - Recommend tax-efficient investment vehicles
+           - Use `calculate_capital_gains` for STCG/LTCG on shares, funds and gold sold (FIFO lots, set-off
+             and the Section 112A exemption), including tax-loss or tax-gain harvesting comparisons
            - Structure investments and insurance for optimal tax treatment
            - Consider tax implications during different life phases
 
         8. Design protection planning strategy:
            - Calculate appropriate life insurance coverage for Indian family needs
            - Evaluate health insurance adequacy with public and private options
+           - Use `analyze_insurance_needs` for human life value, needs-based term cover and health cover gaps
+             by city tier and family size in one call
            - Recommend disability and critical illness protection
            - Assess need for property and liability insurance
            - Integrate government schemes with private insurance products
@@ -680,6 +657,7 @@ agent = Agent(
            - Established private company: Low to Moderate
            - Startup/small business: Moderate to High
            - Freelance/variable income: High
+             (size the buffer for variable income with `simulate_income_buffer`)
         
         2. Life Stage Risk: Age-related financial vulnerabilities
            - Early career (22-30): Moderate (low assets, high human capital)
@@ -964,6 +942,7 @@ agent = Agent(
         When creating financial plans, remember that while numbers and strategies form the foundation, truly impactful financial planning connects deeply with clients' lives, values, and aspirations. Each recommendation should feel not just financially sound but personally meaningful and culturally appropriate within the Indian context.
    
     """),
+    instructions=regulatory_instructions,
     markdown=True,
     show_tool_calls=True,
     add_datetime_to_instructions=True,
@@ -973,7 +952,7 @@ agent = Agent(
 if __name__ == "__main__":
     # Generate a personalized financial plan for an Indian client
     agent.print_response(
-        """
+        with_profile("""
         I need help creating a comprehensive financial plan. Here's my current situation:
         
         Personal Information:
@@ -1005,7 +984,7 @@ if __name__ == "__main__":
         5. Create a basic estate plan and improve insurance coverage
         
         Can you help me develop a comprehensive financial plan that addresses these goals and provides a clear roadmap for the next 5-10 years? Please include specific recommendations for Indian tax planning and investment vehicles.
-        """, 
+        """), 
         stream=True
     )
 
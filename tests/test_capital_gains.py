@@ -0,0 +1,27 @@
+from capital_gains import CapitalGainsEngine, TradeCsvReader, chronological, gains_summary
+
+NEWEST_FIRST = b"""Trade Date,Symbol,Trade Type,Quantity,Price
+2024-09-10,INFY,sell,10,1900
+2024-05-02,INFY,buy,10,1500
+"""
+
+
+def _report(csv_bytes, sort=True):
+    reader, engine = TradeCsvReader(dayfirst=False), CapitalGainsEngine()
+    trades = list(reader.feed(csv_bytes)) + list(reader.close())
+    for _ in engine.process(chronological(trades) if sort else trades):
+        pass
+    return engine.report()
+
+
+def test_newest_first_tradebook_is_matched_oldest_first():
+    report = _report(NEWEST_FIRST)
+    assert report["out_of_order_trades"] == 0
+    assert report["unmatched_sells"] == {}
+    assert [(row["term"], row["net"]) for row in report["rows"]] == [("short", 4_000)]
+
+
+def test_summary_reports_unmatched_and_out_of_order_trades_without_gains():
+    summary = gains_summary(_report(NEWEST_FIRST, sort=False))
+    assert "1 trades were out of date order" in summary
+    assert "INFY" in summary
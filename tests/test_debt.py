@@ -0,0 +1,15 @@
+import json
+
+import pytest
+
+from debt import DebtTools, simulate_payoff
+
+
+def test_simulate_rejects_lists_of_different_lengths():
+    with pytest.raises(ValueError):
+        simulate_payoff([5_000, 18_000], [0.1899], [150, 400])
+
+
+def test_tool_returns_an_error_for_lists_of_different_lengths():
+    result = json.loads(DebtTools().plan_debt_payoff(["Card", "Car"], [5_000, 18_000], [18.99, 6.5], [150]))
+    assert "one entry per debt" in result["error"]
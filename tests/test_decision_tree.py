@@ -0,0 +1,36 @@
+from decision_tree import DecisionTree
+
+SELL_LATER = {"type": "decision", "name": "sell later?"}
+TREE = {
+    "type": "decision",
+    "name": "buy?",
+    "options": [
+        {
+            "name": "buy",
+            "cash_flows": [-100],
+            "next": {
+                "type": "chance",
+                "name": "market",
+                "outcomes": [
+                    {"name": "boom", "probability": 0.5, "cash_flows": [0], "next": {**SELL_LATER, "options": [
+                        {"name": "sell", "cash_flows": [200]}, {"name": "hold", "cash_flows": [150]}]}},
+                    {"name": "bust", "probability": 0.5, "cash_flows": [0], "next": {**SELL_LATER, "options": [
+                        {"name": "sell", "cash_flows": [50]}, {"name": "hold", "cash_flows": [90]}]}},
+                ],
+            },
+        },
+        {"name": "wait", "cash_flows": [0]},
+    ],
+}
+
+
+def test_plan_keeps_a_choice_per_chance_outcome():
+    result = DecisionTree(TREE, discount_rate=0.0).compare()
+    buy = next(option for option in result["options"] if option["option"] == "buy")
+    assert buy["plan"] == {"market=boom/sell later?": "sell", "market=bust/sell later?": "hold"}
+
+
+def test_expected_loss_is_never_negative_zero():
+    result = DecisionTree(TREE, discount_rate=0.0).compare()
+    wait = next(option for option in result["options"] if option["option"] == "wait")
+    assert str(wait["expected_loss"]) == "0.0"
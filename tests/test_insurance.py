@@ -0,0 +1,19 @@
+from insurance import life_cover_needs
+
+
+def test_no_income_needs_no_cover_without_liabilities_or_goals():
+    for age, income in ((35, 0), (60, 1_200_000)):
+        needs = life_cover_needs(age, income, 600_000, retirement_age=60)
+        assert needs["needs_based_cover"][0] == 0
+        assert needs["recommended_cover"][0] == 0
+
+
+def test_no_income_still_covers_liabilities():
+    needs = life_cover_needs(35, 0, 600_000, liabilities=2_000_000)
+    assert needs["needs_based_cover"][0] == 2_000_000
+
+
+def test_spouse_income_reduces_income_replacement():
+    alone = life_cover_needs(35, 1_800_000, 1_000_000)
+    shared = life_cover_needs(35, 1_800_000, 1_000_000, spouse_income=480_000)
+    assert shared["income_replacement"][0] < alone["income_replacement"][0]
@@ -0,0 +1,43 @@
+from profile_parser import parse_profile
+from replanning import build_plan_graph, changes_from_text, merge_profile, profile_inputs
+
+PROFILE = (
+    "I'm 35 and want to retire at 60. I earn $9,000 a month and spend $7,200 a month. I have $40,000 in savings. "
+    "I owe $5,000 on my credit card and $18,000 on my car loan."
+)
+
+
+def _update(text):
+    graph = build_plan_graph()
+    profile = parse_profile(PROFILE)
+    values = graph.evaluate(profile_inputs(profile))
+    changes = changes_from_text(text, profile)
+    _, _, sections = graph.propagate(values, changes)
+    return profile_inputs(merge_profile(profile, text)), changes, sections
+
+
+def test_restated_debt_replaces_only_that_debt():
+    inputs, changes, sections = _update("My credit card debt is now $2,000")
+    assert inputs["total_debt"] == 20_000
+    assert changes == {"total_debt": 20_000}
+    assert sections == ["Financial Situation Analysis", "Basic Estate Considerations", "Financial Roadmap Implementation"]
+
+
+def test_new_expense_is_added_to_the_existing_ones():
+    inputs, changes, _ = _update("I now spend $500 a month on daycare")
+    assert inputs["monthly_expenses"] == 7_700
+    assert changes == {"monthly_expenses": 7_700}
+
+
+def test_paid_off_debt_is_removed():
+    inputs, changes, sections = _update("I paid off my car loan")
+    assert inputs["total_debt"] == 5_000
+    assert changes == {"total_debt": 5_000}
+    assert "Retirement Planning Strategy" not in sections
+
+
+def test_income_change_skips_sections_that_do_not_quote_income():
+    _, _, sections = _update("My income rose to $9,500 a month")
+    assert "Basic Estate Considerations" not in sections
+    assert "Financial Roadmap Implementation" not in sections
+    assert "Life Transition Planning" not in sections
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+from rules import rules_store
+from salary import SalaryTools, evaluate_structures, optimize_salary
+
+
+def test_extra_80c_is_clipped_by_employee_epf():
+    limit = rules_store.get().deduction_limits["section_80c"]
+    result = evaluate_structures(2_000_000, 0.5, 0.5, 0.0, 0.0, limit, 0.0)
+    assert result["employee_epf"] > 0
+    assert result["extra_80c"] == pytest.approx(max(limit - result["employee_epf"], 0.0))
+
+
+def test_recommended_extra_80c_fits_the_remaining_room():
+    limit = rules_store.get().deduction_limits["section_80c"]
+    best = optimize_salary(1_500_000, rents=(300_000,), fiscal_year=None)["recommended"]
+    assert best["extra_80c_investment"] + best["employee_epf"] <= limit + 1e-6
+
+
+def test_unknown_current_hra_uses_the_city_share_not_zero():
+    tools = SalaryTools()
+    unknown = json.loads(tools.optimize_salary_structure(1_500_000, 25_000, current_basic_percent=40))
+    stated = json.loads(tools.optimize_salary_structure(1_500_000, 25_000, current_basic_percent=40, current_hra_percent=50))
+    assert unknown["by_rent"][0]["current"] == stated["by_rent"][0]["current"]
@@ -0,0 +1,32 @@
+from session_memory import SessionMemory
+
+
+def _facts(*turns):
+    memory = SessionMemory("test")
+    for turn in turns:
+        memory.add("user", turn)
+    return memory.profile()
+
+
+def test_restated_income_replaces_the_earlier_statement():
+    profile = _facts("I earn $8,000 a month.", "Actually my salary is now $5,000 per month.")
+    assert profile.monthly_income == 5_000
+
+
+def test_multiple_incomes_are_kept():
+    profile = _facts(
+        "Working as an IT professional with ₹18 lakhs annual income.",
+        "Spouse works part-time earning ₹4.8 lakhs annually.",
+    )
+    assert len(profile.of_kind("income")) == 2
+    assert profile.monthly_income == 150_000 + 40_000
+
+
+def test_multiple_debt_payments_are_kept():
+    profile = _facts("Car payment: $375 a month", "Credit card payment: $200 a month", "Student loan: $320 a month")
+    assert profile.monthly_expenses == 375 + 200 + 320
+
+
+def test_restated_expense_replaces_only_that_expense():
+    profile = _facts("Rent: $1,650 a month. Groceries: $550 a month.", "My rent went up to $1,800 a month.")
+    assert profile.monthly_expenses == 1_800 + 550
@@ -0,0 +1,40 @@
+from anomalies import AnomalyDetector
+from statements import StatementReader
+
+CHECKING = b"""Date,Description,Amount,Category
+2024-03-01,GROCERY MART,-80.00,Groceries
+2024-03-05,NETFLIX,-15.99,Streaming stuff
+"""
+CARD = b"""Date,Description,Amount
+2024-02-20,CITY FUEL,-40.00
+2024-03-02,CAFE ROMA,-12.50
+"""
+
+
+def _upload(detector, data, monkeypatch):
+    monkeypatch.setattr("statements.anomaly_detector", detector)
+    reader = StatementReader("statement.csv", "USD", dayfirst=False, user_id="u1")
+    reader.feed(data)
+    reader.close()
+    return reader
+
+
+def test_second_account_rows_are_not_skipped(monkeypatch):
+    detector = AnomalyDetector()
+    _upload(detector, CHECKING, monkeypatch)
+    _upload(detector, CARD, monkeypatch)
+    assert sum(stats.count for stats in detector.stats.values()) == 4
+
+
+def test_reuploaded_statement_is_not_counted_twice(monkeypatch):
+    detector = AnomalyDetector()
+    _upload(detector, CHECKING, monkeypatch)
+    _upload(detector, CHECKING, monkeypatch)
+    assert sum(stats.count for stats in detector.stats.values()) == 2
+
+
+def test_unknown_bank_category_is_reclassified(monkeypatch):
+    reader = _upload(AnomalyDetector(), CHECKING, monkeypatch)
+    categories = {category for _, category in reader.totals.categories}
+    assert "Groceries" in categories
+    assert "Streaming stuff" not in categories
@@ -0,0 +1,32 @@
+from profile_parser import parse_profile
+from timeline import TOTAL_LABEL, TimelineStore
+
+EXPENSES = "My monthly expenses are $4,500. Rent is $1,800 and groceries are $600."
+
+
+def _latest(store, category):
+    return {event.label: event.value for event in store.latest("u1")[category]}
+
+
+def test_partial_update_shifts_the_stated_total(tmp_path):
+    store = TimelineStore(tmp_path / "timeline.db")
+    store.record_profile("u1", parse_profile(EXPENSES), ts=1_000)
+    store.record_profile("u1", parse_profile("My rent went up to $2,100 a month"), ts=2_000)
+
+    latest = _latest(store, "expense")
+    assert latest[TOTAL_LABEL] == 4_800
+    assert latest["My rent went up to"] == 2_100
+    assert latest["groceries are"] == 600
+    assert "Rent is" not in latest
+    summary = store.summary("u1")
+    assert "total $4,800" in summary and "groceries are $600" in summary
+
+
+def test_items_without_a_stated_total_write_no_total(tmp_path):
+    store = TimelineStore(tmp_path / "timeline.db")
+    store.record_profile("u1", parse_profile("Rent: $1,650 a month. Groceries: $550 a month."), ts=1_000)
+    store.record_profile("u1", parse_profile("Car payment: $375 a month"), ts=2_000)
+
+    latest = _latest(store, "expense")
+    assert TOTAL_LABEL not in latest
+    assert sum(latest.values()) == 1_650 + 550 + 375
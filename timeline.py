@@ -0,0 +1,410 @@
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from agno.utils.log import log_info
+
+from profile_parser import FinancialProfile, format_amount, label_key, parse_profile
+
+TIMELINE_DB = Path(os.getenv("TIMELINE_DB", Path(__file__).parent / "data" / "timeline.db"))
+# Categories whose values are flows (compared on their monthly equivalent) rather than balances
+FLOW_CATEGORIES = ("income", "expense", "saving")
+TOTAL_LABEL = "total"
+SNAPSHOT_CATEGORIES = ("profile", "income", "expense", "saving", "asset", "debt", "cover", "goal")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    label TEXT NOT NULL,
+    label_key TEXT NOT NULL,
+    ts REAL NOT NULL,
+    amount REAL,
+    monthly REAL,
+    period TEXT,
+    currency TEXT,
+    note TEXT,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_category ON events (user_id, category, ts);
+CREATE INDEX IF NOT EXISTS events_by_label ON events (user_id, label_key, ts);
+CREATE INDEX IF NOT EXISTS events_by_recorded ON events (user_id, recorded_at);
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS served (
+    user_id TEXT PRIMARY KEY,
+    last_event_id INTEGER NOT NULL,
+    served_at REAL NOT NULL
+);
+"""
+
+When = Union[datetime, date, float, int, None]
+
+
+def _epoch(value: When) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+@dataclass
+class TimelineEvent:
+    """One dated fact about a user's finances; the timeline only ever appends these."""
+
+    category: str
+    label: str
+    ts: float
+    amount: Optional[float] = None
+    monthly: Optional[float] = None
+    period: Optional[str] = None
+    currency: Optional[str] = None
+    note: Optional[str] = None
+    recorded_at: Optional[float] = None
+    id: Optional[int] = None
+
+    @property
+    def value(self) -> Optional[float]:
+        return self.monthly if self.category in FLOW_CATEGORIES and self.monthly is not None else self.amount
+
+    def describe(self) -> str:
+        currency = self.currency or "USD"
+        if self.category == "profile":
+            return f"{self.label} {self.amount:g}"
+        text = f"{self.label} {format_amount(self.value or 0, currency)}"
+        return text + "/mo" if self.category in FLOW_CATEGORIES else text
+
+
+def events_from_profile(profile: FinancialProfile, ts: When = None) -> List[TimelineEvent]:
+    """Events for the figures in one message.
+
+    A category total is written only when the message states one ("Total expenses: $4,500");
+    other items update just their own label, so a partial message does not replace the total.
+    """
+    ts = _epoch(ts) or time.time()
+    events = [
+        TimelineEvent("profile", label, ts, amount=float(value))
+        for label, value in (("age", profile.age), ("retirement_age", profile.retirement_age))
+        if value is not None
+    ]
+    for item in profile.items:
+        if item.is_total:
+            if not any(event.category == item.kind and event.label == TOTAL_LABEL for event in events):
+                events.append(
+                    TimelineEvent(
+                        item.kind, TOTAL_LABEL, ts, amount=item.amount, monthly=item.monthly, currency=item.currency, note=item.source
+                    )
+                )
+            continue
+        events.append(
+            TimelineEvent(
+                item.kind,
+                item.label,
+                ts,
+                amount=item.amount,
+                monthly=item.monthly,
+                period=item.period,
+                currency=item.currency,
+                note=item.source,
+            )
+        )
+    return events
+
+
+class TimelineStore:
+    """Append-only, per-user financial timeline in SQLite.
+
+    Events are indexed by (user, category, time) and (user, label, time), so range queries
+    and "latest value of every label" lookups touch only the user's own rows. A session
+    table remembers when each user was last seen, and a served table the last event id
+    included in the snapshot each user was last shown, which is what ``context`` diffs against.
+    """
+
+    def __init__(self, path: Union[str, Path] = TIMELINE_DB):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def append(self, user_id: str, events: Iterable[TimelineEvent]) -> int:
+        now = time.time()
+        rows = [
+            (
+                user_id,
+                event.category,
+                event.label,
+                label_key(event.label),
+                event.ts,
+                event.amount,
+                event.monthly,
+                event.period,
+                event.currency,
+                event.note,
+                event.recorded_at or now,
+            )
+            for event in events
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO events (user_id, category, label, label_key, ts, amount, monthly, period, currency, note, "
+                "recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def record_profile(self, user_id: str, profile: FinancialProfile, ts: When = None) -> int:
+        ts = _epoch(ts) or time.time()
+        events = events_from_profile(profile, ts)
+        return self.append(user_id, events + self._shifted_totals(user_id, events, ts))
+
+    def _shifted_totals(self, user_id: str, events: List[TimelineEvent], ts: float) -> List[TimelineEvent]:
+        """Stored totals moved by the change in the items a message updates without restating the total.
+
+        "My rent went up to $2,100" after $4,500 of expenses with $1,800 rent makes the total $4,800.
+        """
+        stated = {event.category for event in events if event.label == TOTAL_LABEL}
+        snapshot = self.latest(user_id)
+        shifted = []
+        for category in SNAPSHOT_CATEGORIES:
+            total = next((event for event in snapshot.get(category, []) if event.label == TOTAL_LABEL), None)
+            updates = [event for event in events if event.category == category]
+            if total is None or category in stated or not updates:
+                continue
+            previous = {label_key(event.label): event for event in snapshot[category]}
+            before = [previous.get(label_key(event.label)) for event in updates]
+            delta = sum((event.value or 0.0) - (old.value or 0.0 if old else 0.0) for event, old in zip(updates, before))
+            if not delta:
+                continue
+            monthly = (total.monthly or 0.0) + delta if category in FLOW_CATEGORIES else None
+            shifted.append(
+                TimelineEvent(
+                    category, TOTAL_LABEL, ts, amount=(total.amount or 0.0) + delta, monthly=monthly, currency=total.currency, note=total.note
+                )
+            )
+        return shifted
+
+    def _query(self, sql: str, params: Sequence) -> List[TimelineEvent]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            TimelineEvent(
+                row["category"],
+                row["label"],
+                row["ts"],
+                row["amount"],
+                row["monthly"],
+                row["period"],
+                row["currency"],
+                row["note"],
+                row["recorded_at"],
+                row["id"],
+            )
+            for row in rows
+        ]
+
+    def range(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        start: When = None,
+        end: When = None,
+        label: Optional[str] = None,
+    ) -> List[TimelineEvent]:
+        """Events for a user in [start, end), oldest first, optionally for one category or label."""
+        clauses, params = ["user_id = ?"], [user_id]
+        for clause, value in (
+            ("category = ?", category),
+            ("label_key = ?", label_key(label) if label else None),
+            ("ts >= ?", _epoch(start)),
+            ("ts < ?", _epoch(end)),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return self._query(f"SELECT * FROM events WHERE {' AND '.join(clauses)} ORDER BY ts, id", params)
+
+    def series(self, user_id: str, category: str, label: Optional[str] = None, start: When = None, end: When = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Timestamps and values (monthly for flows) as arrays for longitudinal analysis."""
+        events = self.range(user_id, category, start, end, label)
+        return (
+            np.array([event.ts for event in events], dtype=float),
+            np.array([np.nan if event.value is None else event.value for event in events], dtype=float),
+        )
+
+    def latest(self, user_id: str, as_of: When = None) -> Dict[str, List[TimelineEvent]]:
+        """The most recent event of every label, grouped by category."""
+        as_of = _epoch(as_of) or float("inf")
+        events = self._query(
+            "SELECT * FROM ("
+            " SELECT *, ROW_NUMBER() OVER (PARTITION BY category, label_key ORDER BY ts DESC, id DESC) AS position"
+            " FROM events WHERE user_id = ? AND ts <= ?"
+            ") WHERE position = 1 ORDER BY category, ts",
+            (user_id, as_of),
+        )
+        snapshot: Dict[str, List[TimelineEvent]] = {}
+        for event in events:
+            snapshot.setdefault(event.category, []).append(event)
+        return snapshot
+
+    def changes_since(self, user_id: str, since: When) -> List[Tuple[Optional[TimelineEvent], TimelineEvent]]:
+        """(previous, new) pairs for every value recorded after ``since`` that differs from what was known before."""
+        return self._changes(user_id, "recorded_at", _epoch(since) or 0.0)
+
+    def changes_after(self, user_id: str, event_id: int) -> List[Tuple[Optional[TimelineEvent], TimelineEvent]]:
+        """Like ``changes_since``, for the events appended after event ``event_id``."""
+        return self._changes(user_id, "id", event_id)
+
+    def _changes(self, user_id: str, column: str, bound: float) -> List[Tuple[Optional[TimelineEvent], TimelineEvent]]:
+        recent = self._query(
+            f"SELECT * FROM events WHERE user_id = ? AND {column} > ? ORDER BY ts, id", (user_id, bound)
+        )
+        if not recent:
+            return []
+        previous = {
+            (event.category, label_key(event.label)): event
+            for event in self._query(
+                "SELECT * FROM ("
+                " SELECT *, ROW_NUMBER() OVER (PARTITION BY category, label_key ORDER BY ts DESC, id DESC) AS position"
+                f" FROM events WHERE user_id = ? AND {column} <= ?"
+                ") WHERE position = 1",
+                (user_id, bound),
+            )
+        }
+        # Collapse several updates of the same value into one (first known -> latest) change
+        changes: Dict[Tuple[str, str], Tuple[Optional[TimelineEvent], TimelineEvent]] = {}
+        for event in recent:
+            key = (event.category, label_key(event.label))
+            before = changes[key][0] if key in changes else previous.get(key)
+            changes[key] = (before, event)
+        return [(before, after) for before, after in changes.values() if before is None or before.value != after.value]
+
+    def last_event_id(self, user_id: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) AS id FROM events WHERE user_id = ?", (user_id,)).fetchone()
+        return row["id"] or 0
+
+    def last_served(self, user_id: str) -> Optional[Tuple[int, float]]:
+        """Last event id in the snapshot the user was last shown, and when it was shown."""
+        with self._lock:
+            row = self._conn.execute("SELECT last_event_id, served_at FROM served WHERE user_id = ?", (user_id,)).fetchone()
+        return (row["last_event_id"], row["served_at"]) if row else None
+
+    def mark_served(self, user_id: str, event_id: int, when: When = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO served (user_id, last_event_id, served_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET last_event_id = excluded.last_event_id, served_at = excluded.served_at",
+                (user_id, event_id, _epoch(when) or time.time()),
+            )
+
+    def last_seen(self, user_id: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute("SELECT last_seen FROM sessions WHERE user_id = ?", (user_id,)).fetchone()
+        return row["last_seen"] if row else None
+
+    def touch(self, user_id: str, when: When = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (user_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (user_id, _epoch(when) or time.time()),
+            )
+
+    def summary(self, user_id: str, since: When = None, max_changes: int = 20, after_id: Optional[int] = None) -> str:
+        """Compact, prompt-ready snapshot of the user's latest figures plus what changed since ``since``.
+
+        With ``after_id`` the changes are the events appended after that event, and ``since``
+        only dates the heading.
+        """
+        snapshot = self.latest(user_id)
+        if not snapshot:
+            return ""
+        lines = ["Stored financial timeline (latest known values):"]
+        for category in SNAPSHOT_CATEGORIES:
+            events = snapshot.get(category)
+            if not events:
+                continue
+            total = next((event for event in events if event.label == TOTAL_LABEL), None)
+            items = [event for event in events if event.label != TOTAL_LABEL]
+            parts = [f"{event.describe()}" for event in items]
+            if total is not None:
+                parts.insert(0, total.describe())
+            elif category != "profile" and len(items) > 1:
+                currency = items[-1].currency
+                value = sum(event.value or 0.0 for event in items)
+                monthly = value if category in FLOW_CATEGORIES else None
+                parts.insert(0, TimelineEvent(category, TOTAL_LABEL, items[-1].ts, amount=value, monthly=monthly, currency=currency).describe())
+            lines.append(f"- {category.title()} (as of {_day(max(event.ts for event in events))}): " + "; ".join(parts))
+        if since is not None:
+            changes = self.changes_since(user_id, since) if after_id is None else self.changes_after(user_id, after_id)
+            if changes:
+                lines.append(f"Changes since last session ({_day(_epoch(since))}):")
+                for before, after in changes[-max_changes:]:
+                    was = f"was {before.describe()}" if before else "new"
+                    lines.append(f"- {after.category}: {after.describe()} ({was}, as of {_day(after.ts)})")
+        return "\n".join(lines)
+
+    def context(self, user_id: str, user_input: str) -> str:
+        """Prompt block for a returning user: stored snapshot and changes since their last session.
+
+        Changes are diffed against the snapshot served last time, by event id. The figures in
+        ``user_input`` are then appended to the timeline, after the served snapshot is recorded,
+        so the next request reports them (and anything else appended meanwhile) as changes.
+        """
+        served = self.last_served(user_id)
+        latest = self.last_event_id(user_id)
+        if served is None:
+            block = self.summary(user_id)
+        else:
+            block = self.summary(user_id, since=served[1], after_id=served[0])
+        self.mark_served(user_id, latest)
+        recorded = self.record_profile(user_id, parse_profile(user_input))
+        self.touch(user_id)
+        log_info(f"Timeline for {user_id}: recorded {recorded} events")
+        return block
+
+
+_store: Optional[TimelineStore] = None
+_store_lock = threading.Lock()
+
+
+def get_timeline_store() -> TimelineStore:
+    """The shared store, opened on first use so importing this module does not create the database."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TimelineStore()
+        return _store
+
+
+def with_timeline(user_id: Optional[str], user_input: str, prompt: Optional[str] = None) -> str:
+    """Prefix ``prompt`` (default: the raw input) with the user's stored timeline summary.
+
+    Without a user id this is a no-op, so anonymous requests behave as before.
+    """
+    prompt = user_input if prompt is None else prompt
+    if not user_id:
+        return prompt
+    block = get_timeline_store().context(user_id, user_input)
+    return f"{block}\n\n{prompt}" if block else prompt
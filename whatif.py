@@ -0,0 +1,175 @@
+import json
+from dataclasses import asdict, dataclass
+from textwrap import dedent
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from agno.agent import Agent
+from agno.models.anthropic import Claude
+
+from goals import sip_factor
+from loans import emi
+from profile_parser import FinancialProfile
+
+# Parameters a what-if grid can vary, all in engine units (rates as decimals)
+GRID_PARAMETERS = ("retirement_age", "monthly_contribution", "expected_return", "inflation", "purchase_price")
+MAX_GRID_POINTS = 50_000
+
+
+@dataclass(frozen=True)
+class WhatIfBase:
+    """Baseline assumptions that every grid point starts from."""
+
+    current_age: int
+    retirement_age: int = 60
+    life_expectancy: int = 85
+    current_savings: float = 0.0
+    monthly_contribution: float = 0.0
+    contribution_growth: float = 0.05
+    annual_spending: float = 0.0
+    monthly_income: float = 0.0
+    expected_return: float = 0.10
+    post_retirement_return: float = 0.07
+    inflation: float = 0.06
+    purchase_price: float = 0.0
+    down_payment_ratio: float = 0.2
+    loan_rate: float = 0.085
+    loan_years: int = 20
+
+    @classmethod
+    def from_profile(cls, profile: FinancialProfile, **overrides) -> "WhatIfBase":
+        """Baseline from a parsed profile; explicit overrides (not None) win over parsed values."""
+        parsed = {
+            "current_age": profile.age,
+            "retirement_age": profile.retirement_age,
+            "current_savings": profile.total_assets,
+            "monthly_contribution": profile.monthly_savings or max(profile.net_monthly_cash_flow, 0.0),
+            "annual_spending": profile.monthly_expenses * 12,
+            "monthly_income": profile.monthly_income,
+        }
+        values = {key: value for key, value in parsed.items() if value is not None}
+        values.update({key: value for key, value in overrides.items() if value is not None})
+        if values.get("current_age") is None:
+            raise ValueError("The profile does not state an age; pass current_age explicitly")
+        return cls(**values)
+
+
+def outcomes(base: WhatIfBase, grid: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Retirement and home-purchase outcomes for every grid point in one vectorized pass."""
+    p = {name: np.asarray(grid.get(name, getattr(base, name)), dtype=float) for name in GRID_PARAMETERS}
+    p = dict(zip(p, np.broadcast_arrays(*p.values())))
+    years_to_retire = np.maximum(p["retirement_age"] - base.current_age, 0)
+    months = years_to_retire * 12
+    monthly_rate = p["expected_return"] / 12
+
+    factor = sip_factor(months, p["expected_return"], base.contribution_growth)
+    savings_value = base.current_savings * (1 + monthly_rate) ** months
+    corpus = savings_value + p["monthly_contribution"] * factor
+
+    # Spending is inflated to the retirement date, then funded as an inflation-linked annuity
+    # discounted at the real post-retirement return
+    spending_at_retirement = base.annual_spending * (1 + p["inflation"]) ** years_to_retire
+    retirement_years = np.maximum(base.life_expectancy - p["retirement_age"], 0)
+    real_rate = (1 + base.post_retirement_return) / (1 + p["inflation"]) - 1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(
+            np.abs(real_rate) > 1e-9,
+            (1 - (1 + real_rate) ** -retirement_years) / real_rate * (1 + real_rate),
+            retirement_years,
+        )
+        required_corpus = spending_at_retirement * annuity
+        required_monthly = np.where(factor > 0, np.maximum(required_corpus - savings_value, 0) / factor, np.inf)
+
+    loan = p["purchase_price"] * (1 - base.down_payment_ratio)
+    home_emi = np.where(loan > 0, emi(loan, base.loan_rate, base.loan_years * 12), 0.0)
+    return {
+        "corpus_at_retirement": corpus,
+        "required_corpus": required_corpus,
+        "retirement_gap": corpus - required_corpus,
+        "funded_ratio": np.where(required_corpus > 0, corpus / np.maximum(required_corpus, 1e-9), 1.0),
+        "required_monthly_contribution": required_monthly,
+        "corpus_at_retirement_today": corpus / (1 + p["inflation"]) ** years_to_retire,
+        "home_emi": home_emi,
+        "emi_to_income": np.where(base.monthly_income > 0, home_emi / max(base.monthly_income, 1e-9), np.nan),
+        "down_payment": p["purchase_price"] * base.down_payment_ratio,
+    }
+
+
+def sensitivity_grid(base: WhatIfBase, ranges: Dict[str, Sequence[float]]) -> Dict:
+    """Evaluate every combination of the given parameter values against the baseline.
+
+    The grid is returned column-wise: each varied parameter and each outcome is a flat list,
+    index ``i`` of every list describing the same grid point.
+    """
+    unknown = sorted(set(ranges) - set(GRID_PARAMETERS))
+    if unknown:
+        raise ValueError(f"Unknown what-if parameters: {unknown}; choose from {list(GRID_PARAMETERS)}")
+    axes = {name: np.asarray(values, dtype=float) for name, values in ranges.items() if len(values)}
+    size = int(np.prod([axis.size for axis in axes.values()])) if axes else 1
+    if size > MAX_GRID_POINTS:
+        raise ValueError(f"Grid has {size} points; the limit is {MAX_GRID_POINTS}")
+
+    mesh = np.meshgrid(*axes.values(), indexing="ij") if axes else []
+    grid = {name: values.ravel() for name, values in zip(axes, mesh)}
+    results = outcomes(base, grid)
+    return {
+        "base": asdict(base),
+        "baseline": {key: _clean(value)[0] for key, value in outcomes(base, {}).items()},
+        "axes": {name: axis.tolist() for name, axis in axes.items()},
+        "points": size,
+        "grid": {
+            **{name: values.tolist() for name, values in grid.items()},
+            **{key: _clean(np.broadcast_to(values, (size,))) for key, values in results.items()},
+        },
+    }
+
+
+def _clean(values) -> List[Optional[float]]:
+    """Round for output; infinities and NaNs (e.g. no income given) become nulls."""
+    values = np.atleast_1d(np.asarray(values, dtype=float))
+    return [value if np.isfinite(value) else None for value in np.round(values, 2).tolist()]
+
+
+def grid_highlights(result: Dict) -> Dict:
+    """Compact digest of a grid for the narrative: baseline, extremes and the cheapest fully funded point."""
+    grid = result["grid"]
+    gap = np.array([np.nan if value is None else value for value in grid["retirement_gap"]])
+    funded = np.array([(value or 0) >= 1 for value in grid["funded_ratio"]])
+
+    def point(i: int) -> Dict:
+        return {key: values[i] for key, values in grid.items()}
+
+    highlights = {
+        "baseline": result["baseline"],
+        "axes": result["axes"],
+        "points": result["points"],
+        "fully_funded_points": int(funded.sum()),
+        "best_point": point(int(np.nanargmax(gap))),
+        "worst_point": point(int(np.nanargmin(gap))),
+    }
+    if funded.any() and "monthly_contribution" in grid:
+        contributions = np.where(funded, grid["monthly_contribution"], np.inf)
+        highlights["lowest_contribution_fully_funded"] = point(int(np.argmin(contributions)))
+    return highlights
+
+
+narrative_agent = Agent(
+    model=Claude(id="claude-3-5-sonnet-20240620"),
+    description=dedent("""\
+        You are the What-If Narrator. You receive a precomputed sensitivity grid digest for a
+        client's retirement and home-purchase plan and explain, in plain language, which levers
+        (retirement age, monthly contribution, returns, inflation, purchase price) matter most
+        and what trade-offs the numbers show. All figures are already computed: never recompute,
+        only quote the numbers given.\
+    """),
+    markdown=True,
+)
+
+
+def narrate(result: Dict, question: str = "") -> str:
+    """Ask the model to explain a grid; only the compact digest is sent, never the full grid."""
+    prompt = f"Sensitivity grid digest:\n{json.dumps(grid_highlights(result))}"
+    if question:
+        prompt = f"Client question: {question}\n\n{prompt}"
+    return narrative_agent.run(prompt).content
+